@@ -48,8 +48,18 @@ from google.adk.apps import App
 from app.app_utils.telemetry import setup_telemetry
 from app.app_utils.typing import Feedback
 from app.app_utils.logging_config import configure_logging
-from app.coco_agent.agents.monitor import monitor_agent
-from app.services.monitoring_service import get_monitoring_service
+from app.coco_agent.agents.monitor import monitor_agent, move_camera, notify_frame_upload
+from app.services.monitoring_service import (
+    get_analysis_pool,
+    get_monitoring_service,
+    list_monitoring_services,
+    start_monitoring_services,
+    stop_monitoring_services,
+)
+from app.services.model_cascade import get_detection_cascade
+from app.services.context_cache import get_agent_context_cache_config
+from app.services.gemini_limiter import get_gemini_limiter
+from app.services.metrics import CONTENT_TYPE_LATEST, get_metrics_registry
 
 # =================================================================
 # 4. Global State & App Wrapper Definitions
@@ -169,7 +179,11 @@ class AgentEngineApp(AdkApp):
         return operations
 
 # Global App Wrappers
-monitor_app = App(root_agent=monitor_agent, name="monitor_agent")
+monitor_app = App(
+    root_agent=monitor_agent,
+    name="monitor_agent",
+    context_cache_config=get_agent_context_cache_config(),
+)
 
 try:
     agent_engine = AgentEngineApp(
@@ -194,6 +208,10 @@ def create_a2a_app():
         POST /api/suspend  - 監視の一時停止
         POST /api/resume   - 監視の再開
         GET  /api/status   - 監視ステータス確認
+        POST /api/rotate   - カメラの回転（Explorer の回転もこのプロセスのモーターキュー・FrameBarrier を通す）
+        POST /api/frames   - 画像アップロード完了通知（GCS finalize の Pub/Sub push / Eventarc）
+        GET  /metrics      - Prometheus 形式のメトリクス（スイープ・Gemini・Firestore・キャッシュ・キュー）
+        （いずれも device_id でカメラを指定可能。省略時はメインのカメラ）
 
     起動:
         MONITOR_A2A_MODE=1 uvicorn app.agent_monitor:a2a_starlette_app --host 0.0.0.0 --port 8001
@@ -201,7 +219,7 @@ def create_a2a_app():
     try:
         from google.adk.a2a.utils.agent_to_a2a import to_a2a
         from starlette.requests import Request
-        from starlette.responses import JSONResponse
+        from starlette.responses import JSONResponse, Response
         from starlette.routing import Route
 
         host = os.environ.get("MONITOR_A2A_HOST", "0.0.0.0")
@@ -216,7 +234,15 @@ def create_a2a_app():
         )
 
         # --- REST API エンドポイントを追加 ---
-        service = get_monitoring_service()
+        # device_id（body またはクエリ）でカメラを指定する。省略時はメインのカメラ
+
+        def _service_or_error(device_id):
+            services = list_monitoring_services()
+            if device_id and device_id not in services:
+                return None, JSONResponse(
+                    {"status": "error", "message": f"Unknown camera '{device_id}'."}, status_code=404
+                )
+            return get_monitoring_service(device_id or None), None
 
         async def api_suspend(request: Request) -> JSONResponse:
             """POST /api/suspend - 監視を一時停止"""
@@ -224,6 +250,9 @@ def create_a2a_app():
                 body = await request.json()
             except Exception:
                 body = {}
+            service, error = _service_or_error(body.get("device_id") or request.query_params.get("device_id"))
+            if error:
+                return error
             reason = body.get("reason", "explorer_request")
             duration = body.get("duration", 300)
             result = service.suspend(reason=reason, duration=duration)
@@ -231,19 +260,70 @@ def create_a2a_app():
 
         async def api_resume(request: Request) -> JSONResponse:
             """POST /api/resume - 監視を再開"""
+            try:
+                body = await request.json()
+            except Exception:
+                body = {}
+            service, error = _service_or_error(body.get("device_id") or request.query_params.get("device_id"))
+            if error:
+                return error
             result = service.resume()
             return JSONResponse(result)
 
         async def api_status(request: Request) -> JSONResponse:
-            """GET /api/status - 監視ステータス取得"""
+            """GET /api/status - 監視ステータス取得（devices に全カメラの状態を含む）"""
+            service, error = _service_or_error(request.query_params.get("device_id"))
+            if error:
+                return error
             result = service.get_status()
+            result["devices"] = {
+                device_id: device_service.get_status()
+                for device_id, device_service in list_monitoring_services().items()
+            }
+            result["analysis_pool"] = get_analysis_pool().get_status()
+            result["model_cascade"] = get_detection_cascade().get_stats()
+            result["gemini_limiter"] = get_gemini_limiter().get_status()
             return JSONResponse(result)
 
+        async def api_rotate(request: Request) -> JSONResponse:
+            """POST /api/rotate - カメラを回転し、回転の完了を待って結果を返す"""
+            try:
+                body = await request.json()
+            except Exception:
+                body = {}
+            service, error = _service_or_error(body.get("device_id") or request.query_params.get("device_id"))
+            if error:
+                return error
+            try:
+                angle = int(body["angle"])
+            except (KeyError, TypeError, ValueError):
+                return JSONResponse({"status": "error", "message": "Expected an integer 'angle'."}, status_code=400)
+            angle = service.motion_planner.servo.clamp(angle)
+            result = await move_camera(angle, device_id=service.device_id, lane=body.get("reason", "api_rotate"))
+            return JSONResponse(result)
+
+        async def api_frames(request: Request) -> JSONResponse:
+            """POST /api/frames - アップロード完了を通知し、回転後のフレームを待つ処理を起こす"""
+            try:
+                body = await request.json()
+            except Exception:
+                return JSONResponse({"status": "error", "message": "Expected a JSON body."}, status_code=400)
+            device_id = notify_frame_upload(body if isinstance(body, dict) else {})
+            # 対象外のオブジェクトでも 2xx を返す（Pub/Sub の再送を避ける）
+            return JSONResponse({"status": "accepted" if device_id else "ignored", "device_id": device_id})
+
+        async def metrics(request: Request) -> Response:
+            """GET /metrics - プロセス内レジストリのメトリクスを Prometheus のテキスト形式で返す"""
+            return Response(get_metrics_registry().render(), media_type=CONTENT_TYPE_LATEST)
+
         # Starlette アプリにルートを追加
         starlette_app.routes.extend([
             Route("/api/suspend", api_suspend, methods=["POST"]),
             Route("/api/resume", api_resume, methods=["POST"]),
             Route("/api/status", api_status, methods=["GET"]),
+            Route("/api/rotate", api_rotate, methods=["POST"]),
+            Route("/api/frames", api_frames, methods=["POST"]),
+            Route("/metrics", metrics, methods=["GET"]),
         ])
 
         # 【追加】起動時に監視ループを開始する
@@ -251,13 +331,13 @@ def create_a2a_app():
         async def startup_event():
             logger.info("Starting Monitoring Loop via A2A App Startup...")
             # 非同期タスクとして監視サービスを開始
-            asyncio.create_task(service.start())
+            asyncio.create_task(start_monitoring_services())
 
         # 【追加】終了時に停止する
         @starlette_app.on_event("shutdown")
         async def shutdown_event():
             logger.info("Stopping Monitoring Loop...")
-            await service.stop()
+            await stop_monitoring_services()
 
         logging.getLogger(__name__).info(
             f"A2A + REST app created for Monitor Agent at {protocol}://{host}:{port}"
@@ -307,7 +387,8 @@ if __name__ == "__main__":
 
             local_app = App(
                 name="monitor_agent",
-                root_agent=monitor_agent
+                root_agent=monitor_agent,
+                context_cache_config=get_agent_context_cache_config(),
             )
 
             runner = InMemoryRunner(
@@ -324,8 +405,7 @@ if __name__ == "__main__":
             user_id = session.user_id
             
             # Start Monitoring Loop Service
-            monitoring_service = get_monitoring_service()
-            await monitoring_service.start()
+            await start_monitoring_services()
             print("[OK] Monitoring Service started.")
 
             print(f"[OK] Session created: {session_id}")
@@ -370,7 +450,7 @@ if __name__ == "__main__":
                 except Exception as e:
                     print(f"\n[ERROR] Error: {e}")
             
-            await monitoring_service.stop()
+            await stop_monitoring_services()
 
         asyncio.run(main())
 
@@ -1,6 +1,7 @@
 import logging
 import os
-from typing import Any
+import threading
+from typing import Any, AsyncIterator
 
 import vertexai
 from dotenv import load_dotenv
@@ -8,10 +9,14 @@ from google.adk.artifacts import GcsArtifactService, InMemoryArtifactService
 from google.cloud import logging as google_cloud_logging
 from vertexai.agent_engines.templates.adk import AdkApp
 
-from app.app_utils.telemetry import setup_telemetry
+from app.app_utils.telemetry import setup_telemetry, telemetry_enabled
 from app.app_utils.typing import Feedback
 from app.app_utils.logging_config import configure_logging
+from app.app_utils.speech_pipeline import get_speech_pipeline
+from app.app_utils.tts import AUDIO_MIME_TYPES, decoded_size, get_tts_client, negotiate_encoding
+from app.coco_settings import get_coco_settings
 from app.coco_agent.agents.orchestrator import orchestrator_agent
+from app.services.context_cache import get_agent_context_cache_config
 from google.adk.apps import App
 
 # Load environment variables from .env file at runtime
@@ -40,6 +45,30 @@ class AgentEngineApp(AdkApp):
         self.cloud_logger = logging_client.logger(__name__)
         if gemini_location:
             os.environ["GOOGLE_CLOUD_LOCATION"] = gemini_location
+        self._prewarm_tts_cache()
+
+    def _prewarm_tts_cache(self) -> None:
+        """Synthesizes common phrases into the TTS cache in the background, in
+        every encoding clients negotiate (the cache key includes the encoding)."""
+        settings = get_coco_settings()
+        phrases = [p.strip() for p in settings.TTS_PREWARM_PHRASES.split(",") if p.strip()]
+        encodings = {self._negotiate_encoding(e) for e in settings.TTS_PREWARM_ENCODINGS.split(",") if e.strip()}
+        if not phrases:
+            return
+
+        def _prewarm() -> None:
+            client = get_tts_client()
+            for encoding in sorted(encodings or {client.default_encoding}):
+                client.prewarm(phrases, encoding=encoding)
+
+        threading.Thread(target=_prewarm, name="tts-prewarm", daemon=True).start()
+
+    @staticmethod
+    def _negotiate_encoding(audio_encoding: str | None) -> str:
+        """Picks the reply encoding. LINEAR16 (WAV) is refused while telemetry is
+        on: multi-megabyte payloads crashed the OTel exporter."""
+        excluded = ("LINEAR16",) if telemetry_enabled() else ()
+        return negotiate_encoding(audio_encoding, default=get_tts_client().default_encoding, excluded=excluded)
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
         """Collect and log feedback."""
@@ -54,15 +83,13 @@ class AgentEngineApp(AdkApp):
         """Registers the operations of the Agent."""
         operations = super().register_operations()
         operations[""] = operations.get("", []) + ["register_feedback", "chat"]
+        operations["async_stream"] = operations.get("async_stream", []) + ["stream_chat"]
         return operations
 
-    async def chat(self, session_id: str, user_input: str, user_id: str = "default-user") -> dict[str, Any]:
-        """Chats with the agent using platform session service.
+    async def _run_agent(self, session_id: str, user_input: str, user_id: str) -> dict[str, Any]:
+        """Runs the orchestrator for one user turn.
 
-        Args:
-            session_id: The session ID.
-            user_input: The user input.
-            user_id: The user ID.
+        Returns {"output", "speech_text"} or {"error"}.
         """
         print(f"DEBUG: chat called with session_id={session_id}, user_input={user_input}, user_id={user_id}")
 
@@ -139,25 +166,80 @@ class AgentEngineApp(AdkApp):
             self.logger.error(f"ERROR during agent run: {e}", exc_info=True)
             return {"error": f"Agent execution failed: {str(e)}"}
 
-        # Determine final audio content
+        # Determine the text to speak
         # Priority: 
         # 1. Text from `generate_speech` tool call (if present)
         # 2. Accumulated text response (fallback)
-        
         final_text = "".join(response_text)
-        text_to_speak = speech_text_from_tool if speech_text_from_tool else final_text
-        audio_content = ""
+        return {"output": final_text, "speech_text": speech_text_from_tool or final_text}
+
+    async def chat(
+        self,
+        session_id: str,
+        user_input: str,
+        user_id: str = "default-user",
+        audio_encoding: str | None = None,
+    ) -> dict[str, Any]:
+        """Chats with the agent using platform session service.
+
+        The reply is synthesized sentence by sentence (in parallel); audio_chunks
+        holds the audio of each sentence in order and audio_content the first one.
 
-        if text_to_speak:
-            from app.app_utils.tts import synthesize_text_async
+        Args:
+            session_id: The session ID.
+            user_input: The user input.
+            user_id: The user ID.
+            audio_encoding: Encodings or MIME types the client can play, most
+                preferred first (e.g. "OGG_OPUS,MP3"). Defaults to TTS_AUDIO_ENCODING.
+        """
+        result = await self._run_agent(session_id, user_input, user_id)
+        if "error" in result:
+            return result
+
+        encoding = self._negotiate_encoding(audio_encoding)
+        audio_chunks: list[str] = []
+        if result["speech_text"]:
             try:
-                # Use the selected text for speech, with a 60s timeout for Leda model
-                audio_content = await synthesize_text_async(text_to_speak, timeout=60.0)
+                chunks = await get_speech_pipeline().synthesize(result["speech_text"], encoding)
+                audio_chunks = [chunk["audio_content"] for chunk in chunks if chunk["audio_content"]]
             except Exception as e:
-                # This catch is for any non-timeout errors in the await itself
                 self.logger.error(f"TTS synthesis failed (critical): {e}")
 
-        return {"output": final_text, "audio_content": audio_content}
+        audio_bytes = sum(decoded_size(chunk) for chunk in audio_chunks)
+        self.logger.info(f"Reply audio: {len(audio_chunks)} chunks, {audio_bytes} bytes ({encoding})")
+        return {
+            "output": result["output"],
+            "audio_content": audio_chunks[0] if audio_chunks else "",
+            "audio_chunks": audio_chunks,
+            "audio_encoding": encoding,
+            "audio_mime_type": AUDIO_MIME_TYPES[encoding],
+            "audio_bytes": audio_bytes,
+        }
+
+    async def stream_chat(
+        self,
+        session_id: str,
+        user_input: str,
+        user_id: str = "default-user",
+        audio_encoding: str | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Like chat, but streams the reply: first {"output", "audio_encoding",
+        "audio_mime_type"}, then one {"index", "text", "audio_content", "audio_bytes"}
+        per sentence as soon as it (and every sentence before it) has been synthesized.
+        """
+        result = await self._run_agent(session_id, user_input, user_id)
+        if "error" in result:
+            yield result
+            return
+        encoding = self._negotiate_encoding(audio_encoding)
+        yield {
+            "output": result["output"],
+            "audio_encoding": encoding,
+            "audio_mime_type": AUDIO_MIME_TYPES[encoding],
+        }
+        if result["speech_text"]:
+            async for chunk in get_speech_pipeline().stream(result["speech_text"], encoding):
+                yield {**chunk, "audio_bytes": decoded_size(chunk["audio_content"])}
 
 
 
@@ -170,7 +252,8 @@ logs_bucket_name = os.environ.get("LOGS_BUCKET_NAME")
 # Platform provides session management via VertexAiSessionService automatically
 orchestrator_app = App(
     root_agent=orchestrator_agent,
-    name="orchestrator_agent"
+    name="orchestrator_agent",
+    context_cache_config=get_agent_context_cache_config(),
 )
 
 agent_engine = AgentEngineApp(
@@ -193,7 +276,8 @@ if __name__ == "__main__":
 
         local_app = App(
             name="orchestrator_agent",
-            root_agent=orchestrator_agent
+            root_agent=orchestrator_agent,
+            context_cache_config=get_agent_context_cache_config(),
         )
 
         runner = InMemoryRunner(
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from typing import Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Keeps close tasks referenced until they finish (the loop only holds weak references)
+_closing: Set[asyncio.Task] = set()
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"Closing a stale HTTP client failed: {e}")
+
+
+def retire_async_client(client: Optional[httpx.AsyncClient], loop: Optional[asyncio.AbstractEventLoop]):
+    """
+    Closes an httpx.AsyncClient that belongs to another event loop, without blocking.
+    Call from the loop that replaces it. The close runs on the owning loop if that
+    loop is still running; otherwise it runs on the current loop (best effort).
+    """
+    if client is None or client.is_closed:
+        return
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
@@ -0,0 +1,46 @@
+import io
+import logging
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; callers fall back to timers
+    Image = None
+
+# Small grayscale thumbnail used for cheap frame comparisons.
+THUMBNAIL_SIZE = (32, 24)
+
+
+def is_available() -> bool:
+    """Returns True if frame comparison is supported (Pillow installed)."""
+    return Image is not None
+
+
+def downsample_gray(image_bytes: bytes, size: tuple[int, int] = THUMBNAIL_SIZE) -> Optional[list[int]]:
+    """
+    Decodes an image and returns a downsampled grayscale thumbnail as a flat list
+    of 0-255 values, or None if the image cannot be decoded.
+    """
+    if Image is None or not image_bytes:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # draft() lets the JPEG decoder skip most of the full-resolution work
+            img.draft("L", (size[0] * 4, size[1] * 4))
+            thumb = img.convert("L").resize(size, Image.BILINEAR)
+            return list(thumb.getdata())
+    except Exception as e:
+        logger.warning(f"Failed to downsample frame: {e}")
+        return None
+
+
+def frame_difference(a: Sequence[int], b: Sequence[int]) -> float:
+    """
+    Mean absolute pixel difference between two thumbnails, normalized to 0.0-1.0.
+    Thumbnails of different sizes are treated as completely different.
+    """
+    if not a or not b or len(a) != len(b):
+        return 1.0
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255.0 * len(a))
@@ -1,41 +1,186 @@
+import asyncio
 import logging
+import threading
 import time
 import os
-import requests
-from typing import Optional
+import httpx
+from typing import Any, Dict, Optional
+
+from app.app_utils.async_clients import retire_async_client
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TIMEOUT_SECONDS = 5.0
+
+
 class ObnizController:
-    def __init__(self, obniz_id: Optional[str] = None):
+    """
+    Drives the camera servo through the obniz webhook.
+
+    HTTP connections are kept alive between commands (one sync client for worker
+    threads, one async client per event loop). The controller tracks the last
+    commanded angle and the last angle acknowledged by the webhook, so callers can
+    read `current_angle` without talking to the device.
+
+    `transport` replaces the async client's network transport (e.g. the in-process
+    obniz simulator). `position_url` is an optional endpoint that reports the servo
+    position as {"angle": N}; the stock obniz webhook has none, the simulator does.
+    """
+
+    def __init__(
+        self,
+        obniz_id: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        position_url: Optional[str] = None,
+    ):
         self.obniz_id = obniz_id
-        self.webhook_url = os.environ.get("OBNIZ_WEBHOOK_URL")
+        self.webhook_url = webhook_url or os.environ.get("OBNIZ_WEBHOOK_URL")
+        self.position_url = position_url or os.environ.get("OBNIZ_POSITION_URL")
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport
+
+        self.commanded_angle: Optional[int] = None
+        self.acknowledged_angle: Optional[int] = None
+        self._acknowledged_at: Optional[float] = None
+        self._last_latency: Optional[float] = None
+        self._failures = 0
+        self._state_lock = threading.Lock()
+
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
 
         if not self.webhook_url:
             logger.warning("OBNIZ_WEBHOOK_URL is not set. ObnizController will run in MOCK mode.")
         else:
             logger.info(f"Initialized ObnizController with Webhook URL: {self.webhook_url[:20]}...")
 
+    @property
+    def current_angle(self) -> int:
+        """
+        The last angle the device acknowledged (0 before the first rotation).
+        While a rotation is in flight this is still the previous position.
+        """
+        return self.acknowledged_angle if self.acknowledged_angle is not None else 0
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout_seconds)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's pooled connections belong to the loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # Release the previous loop's pooled connections instead of leaking them
+            retire_async_client(self._async_client, self._async_client_loop)
+            self._async_client = httpx.AsyncClient(timeout=self.timeout_seconds, transport=self._transport)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def _command(self, angle: int):
+        with self._state_lock:
+            self.commanded_angle = angle
+
+    def _acknowledge(self, angle: int, response: Optional[httpx.Response], started: float):
+        """Records the position reported by the webhook (or the commanded angle if it reports none)."""
+        reported = angle
+        if response is not None:
+            try:
+                body = response.json()
+                if isinstance(body, dict) and isinstance(body.get("angle"), (int, float)):
+                    reported = int(body["angle"])
+            except ValueError:
+                pass
+        with self._state_lock:
+            self.acknowledged_angle = reported
+            self._acknowledged_at = time.time()
+            self._last_latency = time.monotonic() - started
+            self._failures = 0
+
+    def _fail(self, angle: int, error: Exception):
+        with self._state_lock:
+            self._failures += 1
+        logger.error(f"[Obniz] Webhook failed for angle {angle}: {error!r}")
+
     def rotate(self, angle: int) -> bool:
         """
         Rotates the motor to the specified absolute angle (0-180).
-        Sends a POST request to the obniz Webhook.
+        Sends a POST request to the obniz Webhook (blocking; for worker threads).
         """
         logger.info(f"[Obniz] Rotating motor to angle: {angle}")
+        self._command(angle)
+        started = time.monotonic()
 
         if not self.webhook_url:
             logger.info("[Obniz] Mock rotation (no webhook url).")
+            self._acknowledge(angle, None, started)
             return True
 
         try:
-            payload = {"angle": angle}
-            response = requests.post(self.webhook_url, json=payload, timeout=5)
+            response = self._get_client().post(self.webhook_url, json={"angle": angle})
             response.raise_for_status()
             logger.info(f"[Obniz] Webhook success: {response.text}")
+        except Exception as e:
+            self._fail(angle, e)
+            return False
+        self._acknowledge(angle, response, started)
+        return True
+
+    async def rotate_async(self, angle: int, timeout: Optional[float] = None) -> bool:
+        """
+        Rotates the motor without blocking the event loop.
+        Returns False if the webhook fails or does not answer within `timeout` seconds.
+        """
+        logger.info(f"[Obniz] Rotating motor to angle: {angle}")
+        self._command(angle)
+        started = time.monotonic()
+
+        if not self.webhook_url:
+            logger.info("[Obniz] Mock rotation (no webhook url).")
+            self._acknowledge(angle, None, started)
             return True
+
+        try:
+            response = await asyncio.wait_for(
+                self._get_async_client().post(self.webhook_url, json={"angle": angle}),
+                timeout=timeout or self.timeout_seconds,
+            )
+            response.raise_for_status()
+            logger.info(f"[Obniz] Webhook success: {response.text}")
         except Exception as e:
-            logger.error(f"[Obniz] Webhook failed: {e}")
+            self._fail(angle, e)
             return False
+        self._acknowledge(angle, response, started)
+        return True
+
+    async def query_position_async(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Asks the device for its actual position (requires `position_url`).
+        Returns None if no position endpoint is configured or the query fails.
+        """
+        if not self.position_url:
+            return None
+        try:
+            response = await asyncio.wait_for(
+                self._get_async_client().get(self.position_url), timeout=timeout or self.timeout_seconds
+            )
+            response.raise_for_status()
+            return float(response.json()["angle"])
+        except Exception as e:
+            logger.warning(f"[Obniz] Position query failed: {e!r}")
+            return None
+
+    async def aclose(self):
+        """Closes the pooled HTTP connections."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
     def scan_surroundings(self) -> str:
         """
@@ -51,8 +196,18 @@ class ObnizController:
 
     def get_current_angle(self) -> int:
         """
-        Returns the current estimated motor angle.
+        Returns the last acknowledged motor angle.
         """
-        # Without bi-directional comms, we can't easily get the real angle.
-        # We might track it locally if needed.
-        return 0
+        return self.current_angle
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._state_lock:
+            return {
+                "mock": not self.webhook_url,
+                "commanded_angle": self.commanded_angle,
+                "acknowledged_angle": self.acknowledged_angle,
+                "unacknowledged": self.commanded_angle is not None and self.commanded_angle != self.acknowledged_angle,
+                "acknowledged_at": self._acknowledged_at,
+                "last_latency_seconds": round(self._last_latency, 3) if self._last_latency is not None else None,
+                "consecutive_failures": self._failures,
+            }
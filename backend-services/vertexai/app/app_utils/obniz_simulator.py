@@ -0,0 +1,179 @@
+"""
+Local simulator of the obniz servo webhook.
+
+It answers the same POST the real webhook receives ({"angle": N}) and models a
+servo that moves at a configurable speed, with webhook latency, jitter and a
+failure rate, plus a position query (GET /position). Point ObnizController at it
+with OBNIZ_WEBHOOK_URL, or use it in-process for deterministic timing tests:
+
+    simulator = ObnizSimulator(speed_degrees_per_second=60, seed=1)
+    controller = ObnizController(webhook_url="http://obniz-sim/", transport=simulator.transport())
+    service.set_settle_detector(simulator.settle_detector(settle_seconds=0.5))
+
+Run standalone:
+
+    uv run python -m app.app_utils.obniz_simulator --port 8765 --speed 60 --failure-rate 0.05
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+
+class ObnizSimulator:
+    """A servo that moves linearly towards its latest target."""
+
+    def __init__(
+        self,
+        speed_degrees_per_second: float = 120.0,
+        latency_seconds: float = 0.05,
+        jitter_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        min_angle: int = 0,
+        max_angle: int = 180,
+        initial_angle: float = 0.0,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.speed = max(1e-6, speed_degrees_per_second)
+        self.latency = latency_seconds
+        self.jitter = jitter_seconds
+        self.failure_rate = failure_rate
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self._clock = clock
+        self._random = random.Random(seed)
+        self._origin = float(initial_angle)
+        self._target = float(initial_angle)
+        self._moved_at = clock()
+        # Every accepted command as (angle, time received), for ordering assertions
+        self.commands: List[Dict[str, float]] = []
+        self.failures = 0
+
+    def position(self) -> float:
+        """Current servo angle, interpolated along the move in progress."""
+        travelled = (self._clock() - self._moved_at) * self.speed
+        distance = self._target - self._origin
+        if travelled >= abs(distance):
+            return self._target
+        return self._origin + travelled * (1 if distance > 0 else -1)
+
+    def is_moving(self) -> bool:
+        return self.position() != self._target
+
+    def seconds_until_stopped(self) -> float:
+        return abs(self._target - self.position()) / self.speed
+
+    def command(self, angle: float) -> float:
+        """Starts moving to angle (clamped to the servo range) and returns the target."""
+        target = float(max(self.min_angle, min(self.max_angle, angle)))
+        self._origin = self.position()
+        self._target = target
+        self._moved_at = self._clock()
+        self.commands.append({"angle": target, "at": self._moved_at})
+        return target
+
+    async def _network_delay(self):
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def handle_webhook(self, request: Request) -> JSONResponse:
+        await self._network_delay()
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            return JSONResponse({"status": "error", "message": "simulated failure"}, status_code=503)
+        try:
+            body = await request.json()
+            angle = float(body["angle"])
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"status": "error", "message": "expected {\"angle\": number}"}, status_code=400)
+        target = self.command(angle)
+        return JSONResponse({"status": "ok", "angle": target, "position": self.position()})
+
+    async def handle_position(self, request: Request) -> JSONResponse:
+        await self._network_delay()
+        return JSONResponse(self.get_status())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "angle": self.position(),
+            "target": self._target,
+            "moving": self.is_moving(),
+            "commands": len(self.commands),
+            "failures": self.failures,
+        }
+
+    def create_app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/", self.handle_webhook, methods=["POST"]),
+            Route("/position", self.handle_position, methods=["GET"]),
+        ])
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """An in-process transport for ObnizController (no sockets, no server)."""
+        return httpx.ASGITransport(app=self.create_app())
+
+    def settle_detector(self, settle_seconds: float = 0.0) -> "SimulatedSettleDetector":
+        return SimulatedSettleDetector(self, settle_seconds)
+
+
+class SimulatedSettleDetector:
+    """
+    Settle detector for MonitoringLoopService backed by the simulator: the view is
+    settled once the servo has stopped and `settle_seconds` have passed.
+    """
+
+    def __init__(self, simulator: ObnizSimulator, settle_seconds: float = 0.0):
+        self._simulator = simulator
+        self._settle_seconds = settle_seconds
+
+    async def wait_until_settled(self, commanded_at: float, max_wait_seconds: Optional[float] = None) -> Dict[str, Any]:
+        start = time.monotonic()
+        wait = self._simulator.seconds_until_stopped() + self._settle_seconds
+        settled = max_wait_seconds is None or wait <= max_wait_seconds
+        await asyncio.sleep(wait if settled else max_wait_seconds)
+        return {
+            "settled": settled,
+            "method": "simulator" if settled else "timeout",
+            "elapsed": time.monotonic() - start,
+            "frames": 0,
+            "frame": None,
+        }
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Host to bind.")
+@click.option("--port", default=8765, type=int, help="Port to bind.")
+@click.option("--speed", default=120.0, type=float, help="Servo speed in degrees per second.")
+@click.option("--latency", default=0.05, type=float, help="Webhook latency in seconds.")
+@click.option("--jitter", default=0.0, type=float, help="Uniform latency jitter (+/- seconds).")
+@click.option("--failure-rate", default=0.0, type=float, help="Fraction of webhook calls that fail with 503.")
+@click.option("--seed", default=None, type=int, help="Random seed for jitter and failures.")
+def main(host: str, port: int, speed: float, latency: float, jitter: float, failure_rate: float, seed: Optional[int]):
+    import uvicorn
+
+    simulator = ObnizSimulator(
+        speed_degrees_per_second=speed,
+        latency_seconds=latency,
+        jitter_seconds=jitter,
+        failure_rate=failure_rate,
+        seed=seed,
+    )
+    click.echo(f"obniz simulator on http://{host}:{port}/ (set OBNIZ_WEBHOOK_URL to this URL)")
+    uvicorn.run(simulator.create_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.app_utils.tts import synthesize_text_async
+from app.coco_settings import get_coco_settings
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: Japanese full stops/marks, ASCII marks followed by whitespace, newlines
+_SENTENCE_END = re.compile(r"(?<=[。！？!?])|(?<=[.!?])\s+|\n+")
+# Where an overly long sentence may be cut
+_CLAUSE_END = re.compile(r"(?<=[、，,;；])")
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces: List[str] = []
+    current = ""
+    for clause in _CLAUSE_END.split(sentence):
+        if current and len(current) + len(clause) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += clause
+        while len(current) > max_chars:
+            pieces.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _join(first: str, second: str) -> str:
+    # English sentences lost their separating whitespace in the split
+    if first and second and first[-1].isascii() and second[0].isascii():
+        return f"{first} {second}"
+    return first + second
+
+
+def split_sentences(text: str, max_chars: int = 200, min_chars: int = 8) -> List[str]:
+    """
+    Splits text into chunks at sentence boundaries for speech synthesis.
+    Sentences longer than max_chars are cut at clause boundaries; fragments
+    shorter than min_chars (e.g. "はい。") are merged into the next sentence so
+    they do not cost a request of their own.
+    """
+    sentences = [s.strip() for s in _SENTENCE_END.split(text or "") if s and s.strip()]
+    chunks: List[str] = []
+    carry = ""
+    for sentence in sentences:
+        for piece in _split_long(_join(carry, sentence), max_chars):
+            chunks.append(piece)
+        carry = ""
+        if len(chunks[-1]) < min_chars:
+            carry = chunks.pop()
+    if carry:
+        if chunks and len(chunks[-1]) + len(carry) <= max_chars:
+            chunks[-1] = _join(chunks[-1], carry)
+        else:
+            chunks.append(carry)
+    return chunks
+
+
+class SpeechPipeline:
+    """
+    Synthesizes a reply sentence by sentence: chunks are synthesized concurrently
+    (at most `max_parallel` requests at once) and delivered in order, so the first
+    sentence can play while the rest is still being synthesized.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[..., Awaitable[str]] = synthesize_text_async,
+        max_parallel: int = 3,
+        chunk_timeout_seconds: float = 30.0,
+        max_chunk_chars: int = 200,
+    ):
+        self._synthesize = synthesize
+        self._max_parallel = max(1, max_parallel)
+        self._chunk_timeout = chunk_timeout_seconds
+        self._max_chunk_chars = max_chunk_chars
+
+    async def stream(self, text: str, encoding: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields {"index", "text", "audio_content"} per chunk, in order. A chunk whose
+        synthesis failed or timed out has an empty audio_content. Every chunk is a
+        complete audio file in `encoding` (the TTS default if omitted).
+        """
+        chunks = split_sentences(text, max_chars=self._max_chunk_chars)
+        if not chunks:
+            return
+        semaphore = asyncio.Semaphore(self._max_parallel)
+
+        async def _synthesize(chunk: str) -> str:
+            async with semaphore:
+                return await self._synthesize(chunk, timeout=self._chunk_timeout, encoding=encoding)
+
+        # Tasks start in order, so the semaphore admits earlier chunks first.
+        tasks = [asyncio.create_task(_synthesize(chunk)) for chunk in chunks]
+        try:
+            for index, (chunk, task) in enumerate(zip(chunks, tasks)):
+                try:
+                    audio = await task
+                except Exception as e:
+                    logger.error(f"TTS failed for chunk {index}: {e}")
+                    audio = ""
+                yield {"index": index, "text": chunk, "audio_content": audio}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def synthesize(self, text: str, encoding: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Synthesizes every chunk and returns them in order."""
+        return [chunk async for chunk in self.stream(text, encoding)]
+
+
+def get_speech_pipeline(max_parallel: Optional[int] = None) -> SpeechPipeline:
+    """Returns a pipeline configured from the settings."""
+    settings = get_coco_settings()
+    return SpeechPipeline(
+        max_parallel=max_parallel or settings.TTS_MAX_PARALLEL,
+        chunk_timeout_seconds=settings.TTS_CHUNK_TIMEOUT_SECONDS,
+        max_chunk_chars=settings.TTS_CHUNK_MAX_CHARS,
+    )
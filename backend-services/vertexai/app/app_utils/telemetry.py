@@ -16,13 +16,21 @@ import logging
 import os
 
 
+def telemetry_enabled() -> bool:
+    """Whether Agent Engine telemetry is on (set by setup_telemetry)."""
+    return os.environ.get("GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY", "").lower() == "true"
+
+
 def setup_telemetry() -> str | None:
     """Configure OpenTelemetry and GenAI telemetry with GCS upload."""
-    # Force DISABLE telemetry to prevent OTel from crashing on large audio payloads
-    # TODO: This is a high priority technical debt. Disabling telemetry hides important observability data.
-    # Needs investigation into OTel exporter TypeError with large payloads.
-    os.environ["GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY"] = "false"
-    # os.environ.setdefault("GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY", "true")
+    # Multi-megabyte LINEAR16 (WAV) replies crashed the OTel exporter. Replies are
+    # compressed (MP3 / OGG_OPUS) by default now, so telemetry stays on unless
+    # TTS_AUDIO_ENCODING is set back to LINEAR16. While it is on, clients cannot
+    # negotiate LINEAR16 either (see AgentEngineApp._negotiate_encoding).
+    if os.environ.get("TTS_AUDIO_ENCODING", "MP3").upper() == "LINEAR16":
+        os.environ["GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY"] = "false"
+    else:
+        os.environ.setdefault("GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY", "true")
 
     bucket = os.environ.get("LOGS_BUCKET_NAME")
     # FORCE DISABLE content capture to verify if it fixes the TypeError in OTel exporter
@@ -1,12 +1,41 @@
+import asyncio
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+import requests
 from google.auth import default
 from google.auth.transport.requests import Request
-import requests
-import base64
-import logging
-import json
+from requests.adapters import HTTPAdapter
+
+from app.app_utils.async_clients import retire_async_client
+from app.coco_settings import get_coco_settings
+from app.services.tts_cache import TTSCache, create_tts_cache, tts_cache_key
 
 logger = logging.getLogger(__name__)
 
+_TTS_URL = "https://texttospeech.googleapis.com/v1beta1/text:synthesize"
+_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+_MODEL_NAME = "gemini-2.5-pro-tts"
+_VOICE_NAME = "Leda"
+# Audio encodings the API can return, with their MIME types. LINEAR16 is WAV;
+# MP3 and OGG_OPUS are an order of magnitude smaller for speech.
+AUDIO_MIME_TYPES = {
+    "MP3": "audio/mpeg",
+    "OGG_OPUS": "audio/ogg",
+    "LINEAR16": "audio/wav",
+}
+_MIME_ENCODINGS = {
+    "audio/mpeg": "MP3",
+    "audio/mp3": "MP3",
+    "audio/ogg": "OGG_OPUS",
+    "audio/opus": "OGG_OPUS",
+    "audio/wav": "LINEAR16",
+    "audio/x-wav": "LINEAR16",
+}
+
 _TTS_SYSTEM_PROMPT = (
     "声はアニメキャラクターのようで暖かく、落ち着いた親しみやすいキャラクターをイメージしてください。"
     "また、サポートAIなので、語尾などもユーザに寄り添ったものとしてください。\n"
@@ -15,81 +44,309 @@ _TTS_SYSTEM_PROMPT = (
     "また、人が話す際に読み上げないもの（・や＊など）は読み上げないようお願いします。"
 )
 
-def synthesize_text(text: str, language_code: str = "ja-jp") -> str:
+DEFAULT_TIMEOUT_SECONDS = 60.0
+# Refresh the access token when it expires within this margin
+REFRESH_MARGIN_SECONDS = 300.0
+
+
+def negotiate_encoding(accepted: Optional[str] = None, default: str = "MP3", excluded: Iterable[str] = ()) -> str:
     """
-    Synthesizes speech from text using Google Cloud Text-to-Speech (Gemini TTS model).
-    Returns the audio content as a base64 encoded string.
+    Picks the audio encoding for a client. `accepted` lists what the client can
+    play, most preferred first, as encodings or MIME types separated by commas
+    (e.g. "OGG_OPUS,MP3" or "audio/ogg, audio/mpeg"). Encodings in `excluded`
+    are never picked. Falls back to `default`.
     """
-    if not text:
-        return ""
+    for item in (accepted or "").split(","):
+        item = item.split(";")[0].strip()
+        encoding = _MIME_ENCODINGS.get(item.lower(), item.upper())
+        if encoding in AUDIO_MIME_TYPES and encoding not in excluded:
+            return encoding
+    return default
 
-    try:
-        # Get credentials and refresh token
-        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
-        credentials, project = default(scopes=scopes)
-        auth_request = Request()
-        credentials.refresh(auth_request)
 
-        url = "https://texttospeech.googleapis.com/v1beta1/text:synthesize"
+def decoded_size(audio_b64: str) -> int:
+    """Size in bytes of base64 encoded audio (without decoding it)."""
+    return len(audio_b64) * 3 // 4 - audio_b64[-2:].count("=") if audio_b64 else 0
+
+
+class TTSClient:
+    """
+    Google Cloud Text-to-Speech client (Gemini TTS model).
+
+    Application default credentials are resolved once and the access token is
+    refreshed only when it is missing or about to expire. HTTP connections are
+    kept alive: a pooled requests.Session for blocking calls and one
+    httpx.AsyncClient per event loop for `synthesize_async`.
+    With a `cache` (TTSCache), identical requests (same text, voice, model,
+    prompt and encoding) are answered from the cache without calling the API.
+    `credentials`, `session` and `transport` can be injected (e.g. for tests).
+    """
+
+    def __init__(
+        self,
+        url: str = _TTS_URL,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        refresh_margin_seconds: float = REFRESH_MARGIN_SECONDS,
+        credentials: Any = None,
+        project: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        pool_size: int = 8,
+        cache: Optional[TTSCache] = None,
+        default_encoding: str = "MP3",
+    ):
+        self.url = url
+        self.timeout_seconds = timeout_seconds
+        self._refresh_margin = datetime.timedelta(seconds=refresh_margin_seconds)
+        self._credentials = credentials
+        self._project = project
+        self._credentials_lock = threading.Lock()
+        self._auth_request: Optional[Request] = None
+        self._refreshes = 0
+
+        self._pool_size = pool_size
+        self._session = session
+        self._transport = transport
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache = cache
+        self.default_encoding = negotiate_encoding(default_encoding)
+
+    # --- credentials ---
 
+    def _needs_refresh(self) -> bool:
+        credentials = self._credentials
+        if not getattr(credentials, "token", None):
+            return True
+        expiry = getattr(credentials, "expiry", None)
+        if expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return expiry - now <= self._refresh_margin
+
+    def _auth_headers(self) -> Dict[str, str]:
+        """Returns request headers with a valid access token (blocking when a refresh is due)."""
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials, default_project = default(scopes=_SCOPES)
+                self._project = self._project or default_project
+            if self._needs_refresh():
+                if self._auth_request is None:
+                    self._auth_request = Request(session=self._get_session())
+                self._credentials.refresh(self._auth_request)
+                self._refreshes += 1
+                logger.info("TTS access token refreshed.")
+            return self._headers()
+
+    def _headers(self) -> Dict[str, str]:
         headers = {
-            "Authorization": f"Bearer {credentials.token}",
+            "Authorization": f"Bearer {self._credentials.token}",
             "Content-Type": "application/json; charset=utf-8",
-            "x-goog-user-project": project
         }
+        if self._project:
+            headers["x-goog-user-project"] = self._project
+        return headers
+
+    async def _auth_headers_async(self) -> Dict[str, str]:
+        # Token refreshes are rare (about once an hour); only then leave the event loop.
+        if self._credentials is not None and not self._needs_refresh():
+            return self._headers()
+        return await asyncio.to_thread(self._auth_headers)
 
-        # User specified prompt
-        system_prompt = _TTS_SYSTEM_PROMPT
+    # --- HTTP clients ---
 
-        data = {
+    def _get_session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's pooled connections belong to the loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # Release the previous loop's pooled connections instead of leaking them
+            retire_async_client(self._async_client, self._async_client_loop)
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                transport=self._transport,
+                limits=httpx.Limits(max_keepalive_connections=self._pool_size),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    # --- synthesis ---
+
+    @staticmethod
+    def build_request(text: str, language_code: str = "ja-jp", encoding: str = "MP3") -> Dict[str, Any]:
+        return {
             "audioConfig": {
-                "audioEncoding": "LINEAR16",
+                "audioEncoding": encoding,
                 "pitch": 0,
                 "speakingRate": 1
             },
             "input": {
-                "prompt": system_prompt,
+                "prompt": _TTS_SYSTEM_PROMPT,
                 "text": text
             },
             "voice": {
                 "languageCode": language_code,
-                "modelName": "gemini-2.5-pro-tts",
-                "name": "Leda"
+                "modelName": _MODEL_NAME,
+                "name": _VOICE_NAME
             }
         }
 
-        response = requests.post(url, headers=headers, json=data)
+    @staticmethod
+    def cache_key(text: str, language_code: str = "ja-jp", encoding: str = "MP3") -> str:
+        return tts_cache_key(text, _VOICE_NAME, _MODEL_NAME, _TTS_SYSTEM_PROMPT, encoding, language_code)
 
-        if response.status_code != 200:
-            logger.error(f"TTS API request failed with status {response.status_code}: {response.text}")
+    @staticmethod
+    def _parse_response(status_code: int, body_text: str, body: Optional[Dict[str, Any]]) -> str:
+        if status_code != 200:
+            logger.error(f"TTS API request failed with status {status_code}: {body_text}")
             return ""
+        if not body or "audioContent" not in body:
+            logger.error(f"TTS API response did not contain audioContent: {body}")
+            return ""
+        # The API returns base64 encoded audio content
+        return body["audioContent"]
 
-        response_json = response.json()
+    def synthesize(self, text: str, language_code: str = "ja-jp", encoding: Optional[str] = None) -> str:
+        """
+        Returns the audio content as a base64 encoded string ("" on failure). Blocking.
+        `encoding` is one of AUDIO_MIME_TYPES (the configured default if omitted).
+        """
+        if not text:
+            return ""
+        encoding = encoding or self.default_encoding
+        key = self.cache_key(text, language_code, encoding)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached:
+                return cached
+        try:
+            response = self._get_session().post(
+                self.url,
+                headers=self._auth_headers(),
+                json=self.build_request(text, language_code, encoding),
+                timeout=self.timeout_seconds,
+            )
+            body = response.json() if response.status_code == 200 else None
+            audio = self._parse_response(response.status_code, response.text, body)
+        except Exception as e:
+            logger.error(f"TTS synthesis failed: {e}")
+            return ""
+        if audio and self.cache is not None:
+            self.cache.put(key, audio)
+        return audio
 
-        if "audioContent" not in response_json:
-            logger.error(f"TTS API response did not contain audioContent: {response_json}")
+    async def synthesize_async(
+        self,
+        text: str,
+        language_code: str = "ja-jp",
+        timeout: Optional[float] = None,
+        encoding: Optional[str] = None,
+    ) -> str:
+        """Like `synthesize`, on the async HTTP client. Returns "" on failure or timeout."""
+        if not text:
+            return ""
+        timeout = timeout or self.timeout_seconds
+        encoding = encoding or self.default_encoding
+        key = self.cache_key(text, language_code, encoding)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached:
+                return cached
+        try:
+            headers = await self._auth_headers_async()
+            response = await self._get_async_client().post(
+                self.url, headers=headers, json=self.build_request(text, language_code, encoding), timeout=timeout
+            )
+            body = response.json() if response.status_code == 200 else None
+            audio = self._parse_response(response.status_code, response.text, body)
+        except httpx.TimeoutException:
+            logger.error(f"TTS synthesis timed out after {timeout} seconds")
+            return ""
+        except Exception as e:
+            logger.error(f"Async TTS synthesis failed: {e}")
             return ""
+        if audio and self.cache is not None:
+            await self.cache.aput(key, audio)
+        return audio
 
-        # The API returns base64 encoded audio content
-        # We need to ensure it's returned as a clean string
-        return response_json["audioContent"]
+    def prewarm(self, phrases: Iterable[str], language_code: str = "ja-jp", encoding: Optional[str] = None) -> int:
+        """
+        Synthesizes the phrases that are not cached yet (blocking; run it off the
+        request path). Returns the number of phrases synthesized.
+        """
+        if self.cache is None:
+            return 0
+        encoding = encoding or self.default_encoding
+        synthesized = 0
+        for phrase in phrases:
+            key = self.cache_key(phrase, language_code, encoding)
+            if self.cache.get(key) is None and self.synthesize(phrase, language_code, encoding):
+                synthesized += 1
+        logger.info(f"TTS cache pre-warmed ({synthesized} phrases synthesized).")
+        return synthesized
 
-    except Exception as e:
-        logger.error(f"TTS synthesis failed: {e}")
-        return ""
+    async def aclose(self):
+        """Closes the pooled HTTP connections."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+            self._auth_request = None
+
+    def get_status(self) -> Dict[str, Any]:
+        expiry = getattr(self._credentials, "expiry", None)
+        return {
+            "credentials_loaded": self._credentials is not None,
+            "token_expiry": expiry.isoformat() if expiry else None,
+            "token_refreshes": self._refreshes,
+            "default_encoding": self.default_encoding,
+            "cache": self.cache.get_status() if self.cache is not None else None,
+        }
+
+
+# Global singleton instance
+_tts_client: Optional[TTSClient] = None
+
+
+def get_tts_client() -> TTSClient:
+    """Returns the process-wide TTS client."""
+    global _tts_client
+    if _tts_client is None:
+        settings = get_coco_settings()
+        _tts_client = TTSClient(cache=create_tts_cache(settings), default_encoding=settings.TTS_AUDIO_ENCODING)
+    return _tts_client
+
+
+def synthesize_text(text: str, language_code: str = "ja-jp", encoding: Optional[str] = None) -> str:
+    """
+    Synthesizes speech from text using Google Cloud Text-to-Speech (Gemini TTS model).
+    Returns the audio content (TTS_AUDIO_ENCODING unless `encoding` is given) as a
+    base64 encoded string.
+    """
+    return get_tts_client().synthesize(text, language_code, encoding)
 
-import asyncio
-from typing import Optional
 
-async def synthesize_text_async(text: str, language_code: str = "ja-jp", timeout: Optional[float] = 60.0) -> str:
+async def synthesize_text_async(
+    text: str, language_code: str = "ja-jp", timeout: Optional[float] = 60.0, encoding: Optional[str] = None
+) -> str:
     """
-    Asynchronous wrapper for synthesize_text using asyncio.to_thread.
+    Asynchronous synthesize_text on the shared async HTTP client.
     Includes a timeout to prevent blocking indefinitely.
     """
     try:
-        # Run blocking sync function in a separate thread
         return await asyncio.wait_for(
-            asyncio.to_thread(synthesize_text, text, language_code),
+            get_tts_client().synthesize_async(text, language_code, timeout=timeout, encoding=encoding),
             timeout=timeout
         )
     except asyncio.TimeoutError:
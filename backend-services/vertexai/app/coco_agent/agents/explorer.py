@@ -1,11 +1,48 @@
+import logging
+import os
+from typing import Any, Dict
+
+import httpx
+
 from google.adk.agents import Agent
-from google.adk.models import Gemini
-from google.genai import types
+from app.coco_agent.models import gemini_model
 from app.coco_agent.prompts.loader import load_prompt
 from app.coco_agent.tools.firestore_tools import search_logs
-from app.app_utils.obniz import ObnizController
+from app.coco_settings import get_coco_settings
+from app.services.motion_planner import ServoModel
+
+logger = logging.getLogger(__name__)
+
+_settings = get_coco_settings()
+MONITOR_AGENT_ENDPOINT = os.environ.get("MONITOR_AGENT_ENDPOINT", "")
+# Rotation requests wait for the monitor's motion queue (webhook plus any queued target)
+ROTATE_TIMEOUT_SECONDS = 30.0
+servo = ServoModel(
+    min_angle=_settings.SERVO_MIN_ANGLE,
+    max_angle=_settings.SERVO_MAX_ANGLE,
+    speed_degrees_per_second=_settings.SERVO_SPEED_DEGREES_PER_SECOND,
+)
+
+async def _move_camera(angle: int) -> Dict[str, Any]:
+    """
+    Rotates the camera through the monitor, which owns its motion queue and frame
+    barrier: the no-op check then sees the sweep's moves, and detect_objects (which
+    runs in the monitor) waits for the first frame after this rotation.
+    """
+    if MONITOR_AGENT_ENDPOINT:
+        # A2A mode: the monitor runs in another process; rotate through its REST API
+        try:
+            url = MONITOR_AGENT_ENDPOINT.rstrip("/") + "/api/rotate"
+            async with httpx.AsyncClient(timeout=ROTATE_TIMEOUT_SECONDS) as client:
+                resp = await client.post(url, json={"angle": angle, "reason": "explorer_rotate"})
+                resp.raise_for_status()
+                return resp.json()
+        except Exception as e:
+            logger.error(f"Failed to rotate the camera via REST: {e}")
+            return {"status": "failed", "angle": angle}
 
-obniz = ObnizController()
+    from app.coco_agent.agents.monitor import move_camera
+    return await move_camera(angle, lane="explorer_rotate")
 
 from google.adk.tools import ToolContext
 from app.services.state_service import set_agent_moving
@@ -20,23 +57,21 @@ async def rotate_to_target(angle: int, tool_context: ToolContext = None) -> str:
     session_id = tool_context.session.id if tool_context and tool_context.session else "default"
     await set_agent_moving(session_id, "explorer_agent", f"Rotating camera to {angle}...")
 
-    # Quantize to nearest 30 degrees as requested
-    quantized_angle = round(angle / 30) * 30
-    # Clamp to 0-180 range
-    quantized_angle = max(0, min(180, quantized_angle))
+    # Quantize to nearest 30 degrees as requested, within the servo range
+    quantized_angle = servo.clamp(round(angle / 30) * 30)
 
-    success = obniz.rotate(quantized_angle)
-    if success:
-        return f"Successfully rotated camera to target angle: {quantized_angle} (Input: {angle})"
+    # Pauses any background sweep while the explorer moves the camera.
+    result = await _move_camera(quantized_angle)
+    if result["status"] == "skipped":
+        return f"Camera is already at target angle: {quantized_angle} (Input: {angle}). No rotation needed."
+    if result["status"] == "moved":
+        return f"Successfully rotated camera to target angle: {result['angle']} (Input: {angle})"
     else:
         return f"Failed to rotate camera to angle: {quantized_angle}. Check connection or logs."
 
 explorer_agent = Agent(
     name="explorer_agent",
-    model=Gemini(
-        model="gemini-2.0-flash",
-        retry_options=types.HttpRetryOptions(attempts=3),
-    ),
+    model=gemini_model("gemini-2.0-flash"),
     description="Agent for physically searching for objects and controlling the camera.",
     instruction=load_prompt("explorer"),
     tools=[search_logs, rotate_to_target],
@@ -1,17 +1,47 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import json
 import os
 import logging
 import asyncio
+import functools
 import time
 import requests
 from google.adk.agents import Agent
-from google.adk.models import Gemini
+from app.coco_agent.models import gemini_model
 from app.coco_agent.prompts.loader import load_prompt
-from app.coco_agent.tools.storage_tools import get_image_uri_from_storage, get_latest_image_uri, get_storage_client
-from app.coco_agent.tools.firestore_tools import save_monitoring_log
-from app.services.monitoring_service import get_monitoring_service
+from app.coco_agent.tools.storage_tools import (
+    download_frame_bytes,
+    get_image_uri_from_storage,
+    get_latest_frame,
+)
+from app.coco_agent.tools.firestore_tools import (
+    find_detection_for_image,
+    get_db,
+    get_monitoring_logs_since,
+    save_monitoring_log,
+)
+from app.coco_agent.tools.label_matcher import match_query_to_objects
+from app.coco_settings import get_coco_settings
+from app.services.monitoring_service import (
+    CACHE_REQUESTS,
+    DEFAULT_DEVICE_ID,
+    get_current_device_id,
+    get_current_sweep_id,
+    get_monitoring_service,
+)
+from app.services.settle_detector import SettleDetector
+from app.services.frame_barrier import frame_from_storage_event, frame_ref, get_frame_barrier, split_frame_ref
+from app.services.sweep_planner import SweepPlanner
+from app.services.scan_cadence import ScanCadence
+from app.services.sweep_checkpoint import SweepCheckpointStore
+from app.services.monitor_lease import LeaseStore, MonitorLease
+from app.services.model_cascade import ModelTier, get_detection_cascade
+from app.services.genai_replay import BACKEND_REPLAY, get_genai_backend, wrap_genai_client
+from app.services.gemini_limiter import Priority, gemini_priority, get_current_priority, get_gemini_limiter
+from app.app_utils import image_diff
 from app.app_utils.obniz import ObnizController
+from app.services.motion_queue import MotionCommandQueue
+from app.services.motion_planner import MotionPlanner, ServoModel
 from google import genai
 from google.genai import types
 
@@ -24,12 +54,81 @@ def parse_gcs_uri(gs_uri: str) -> tuple[str, str]:
         return path_parts[0], path_parts[1]
     return "", ""
 
-obniz_controller = ObnizController()
+def _load_device_configs() -> List[Dict[str, Any]]:
+    """
+    Parses MONITOR_DEVICES. Without it, a single camera is configured from
+    OBNIZ_WEBHOOK_URL and FIREBASE_STORAGE_BUCKET as before.
+    """
+    raw = get_coco_settings().MONITOR_DEVICES
+    if raw:
+        try:
+            devices = [d for d in json.loads(raw) if isinstance(d, dict) and d.get("device_id")]
+            if devices:
+                return devices
+            logger.warning("MONITOR_DEVICES has no valid entries. Using the default camera.")
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid MONITOR_DEVICES ({e}). Using the default camera.")
+    return [{"device_id": DEFAULT_DEVICE_ID}]
+
+_device_configs = _load_device_configs()
+obniz_controllers: Dict[str, ObnizController] = {
+    device["device_id"]: ObnizController(
+        webhook_url=device.get("obniz_webhook_url"), position_url=device.get("obniz_position_url")
+    )
+    for device in _device_configs
+}
+# The first configured camera is the primary one used by interactive tools
+PRIMARY_DEVICE_ID = _device_configs[0]["device_id"]
+obniz_controller = obniz_controllers[PRIMARY_DEVICE_ID]
+# Per-camera motion command queues (filled in by _configure_device)
+motion_queues: Dict[str, MotionCommandQueue] = {}
+
+def _service_for(device_id: Optional[str]):
+    """Returns the monitoring service of a configured camera (primary if omitted), or None."""
+    device_id = device_id or PRIMARY_DEVICE_ID
+    if device_id not in obniz_controllers:
+        return None
+    return get_monitoring_service(device_id)
+
+def _device_config(device_id: str) -> Dict[str, Any]:
+    return next((d for d in _device_configs if d["device_id"] == device_id), {})
+
+def _frame_source_for(device_id: str) -> Callable[[], Optional[Dict[str, Any]]]:
+    """Returns a function that fetches the camera's latest uploaded frame."""
+    device = _device_config(device_id)
+    return functools.partial(get_latest_frame, device.get("bucket"), device.get("prefix"))
+
+def notify_frame_upload(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Feeds a GCS upload-finalize notification to the frame barrier. The object is
+    assigned to the camera whose bucket/prefix matches it (longest prefix wins).
+    Returns the device id, or None if the event is not a frame of a configured camera.
+    """
+    frame = frame_from_storage_event(payload)
+    if frame is None:
+        return None
+    bucket, name = parse_gcs_uri(frame["uri"])
+    candidates = [
+        device for device in _device_configs
+        if device.get("bucket") in (None, bucket) and name.startswith(device.get("prefix") or "")
+    ]
+    if not candidates:
+        return None
+    device = max(candidates, key=lambda d: len(d.get("prefix") or ""))
+    get_frame_barrier().notify(device["device_id"], frame)
+    return device["device_id"]
+
+def _unknown_device(device_id: str) -> str:
+    return json.dumps({
+        "status": "error",
+        "message": f"Unknown camera '{device_id}'. Available: {sorted(obniz_controllers)}",
+    }, ensure_ascii=False)
 
 _BASE_SCHEMA = """
     Output JSON:
     {
         "found": boolean,
+        "confidence": float (0.0-1.0) or null (for the target object),
         "box_2d": [ymin, xmin, ymax, xmax] or null (for the target object),
         "label": "target object name" or "Multiple Objects" if generic,
         "all_objects": [
@@ -48,10 +147,23 @@ _BASE_SCHEMA = """
     }
     """
 
+# Static prefix of every detect_objects request, sent as the system instruction.
+# It is far below the 1024-token minimum of an explicit context cache.
+_DETECTION_INSTRUCTION = f"""
+    You are the object detector of a home monitoring camera.
+    Always answer with a single JSON object that follows this schema exactly.
+    {_BASE_SCHEMA}
+    """
+
 from google.adk.tools import ToolContext
 from app.services.state_service import update_agent_state
 
-async def suspend_monitoring(reason: str = "explorer_request", duration: int = 300, tool_context: ToolContext = None) -> str:
+async def suspend_monitoring(
+    reason: str = "explorer_request",
+    duration: int = 300,
+    device_id: Optional[str] = None,
+    tool_context: ToolContext = None,
+) -> str:
     """
     Monitor Agent の自動監視ループを一時停止します。
     Explorer Agent にタスクを委譲する前に必ず呼び出してください。
@@ -59,6 +171,7 @@ async def suspend_monitoring(reason: str = "explorer_request", duration: int = 3
     Args:
         reason: 一時停止の理由 (例: "explorer_request")
         duration: 停止する秒数 (デフォルト 300秒)
+        device_id: 対象カメラの ID（省略時はメインのカメラ）
         tool_context: ToolContext (Injected by ADK)
 
     Returns:
@@ -74,15 +187,19 @@ async def suspend_monitoring(reason: str = "explorer_request", duration: int = 3
          mode="Inference"
     )
 
-    result = get_monitoring_service().suspend(reason=reason, duration=duration)
+    service = _service_for(device_id)
+    if service is None:
+        return _unknown_device(device_id)
+    result = service.suspend(reason=reason, duration=duration)
     return json.dumps(result, ensure_ascii=False)
 
 
-async def resume_monitoring(tool_context: ToolContext = None) -> str:
+async def resume_monitoring(device_id: Optional[str] = None, tool_context: ToolContext = None) -> str:
     """
     一時停止中の監視を再開します。Explorer Agent の操作完了後に必ず呼び出してください。
 
     Args:
+        device_id: 対象カメラの ID（省略時はメインのカメラ）
         tool_context: ToolContext (Injected by ADK)
 
     Returns:
@@ -98,19 +215,31 @@ async def resume_monitoring(tool_context: ToolContext = None) -> str:
          mode="Monitoring"
     )
 
-    result = get_monitoring_service().resume()
+    service = _service_for(device_id)
+    if service is None:
+        return _unknown_device(device_id)
+    result = service.resume()
     return json.dumps(result, ensure_ascii=False)
 
 
-def get_monitoring_status() -> str:
+def get_monitoring_status(device_id: Optional[str] = None) -> str:
     """
     現在の監視ステータスを取得します（一時停止中か、誰が停止したか等）。
 
+    Args:
+        device_id: 対象カメラの ID（省略時はメインのカメラ）
+
     Returns:
         監視ステータスの JSON 文字列。
     """
-    service = get_monitoring_service()
+    service = _service_for(device_id)
+    if service is None:
+        return _unknown_device(device_id)
     result = service.get_status()
+    result["cameras"] = sorted(obniz_controllers)
+    result["motor"] = obniz_controllers[service.device_id].get_status()
+    if service.device_id in motion_queues:
+        result["motion_queue"] = motion_queues[service.device_id].get_status()
     return json.dumps(result, ensure_ascii=False)
 
 
@@ -145,6 +274,9 @@ def get_genai_client():
                     http_options={'api_version': 'v1beta'}
                 )
                 logger.info("GenAI client initialized with API Key (Forced AI Studio mode)")
+            elif get_genai_backend() == BACKEND_REPLAY:
+                # Replay mode answers from recorded fixtures; no real client (or network) needed
+                _genai_client = None
             else:
                 # Use default (Vertex AI mode)
                 _genai_client = genai.Client(
@@ -152,6 +284,8 @@ def get_genai_client():
                     project=os.environ.get("GOOGLE_CLOUD_PROJECT")
                 )
                 logger.info("GenAI client initialized with Vertex AI mode")
+            # Record/replay fixtures for offline benchmarking (no-op in live mode)
+            _genai_client = wrap_genai_client(_genai_client)
         except Exception as e:
             logger.warning(f"GenAI Client initialization failed: {e}")
             _genai_client = None
@@ -160,25 +294,154 @@ def get_genai_client():
 from google.adk.tools import ToolContext
 from app.services.state_service import set_agent_moving
 
+async def move_camera(angle: int, device_id: Optional[str] = None, lane: str = "rotate_to_target") -> Dict[str, Any]:
+    """
+    Interactive rotation through the camera's motion queue. Every rotation of the
+    camera goes through this process (the explorer's too, via POST /api/rotate in
+    A2A mode), so the no-op check sees all moves and the frame barrier records the
+    rotation that detect_objects waits on. Returns the queue's result dict.
+    """
+    device_id = device_id or PRIMARY_DEVICE_ID
+    service = get_monitoring_service(device_id)
+    service.update_activity()
+    # Takes the camera from any running sweep; the sweep resumes afterwards.
+    with service.interactive_lane(lane):
+        return await motion_queues[device_id].move_to(angle)
+
 async def rotate_to_target(angle: int, tool_context: ToolContext = None) -> str:
     """
     Rotates the camera to the specified angle to search for an object.
 
     Args:
-        angle: Target angle (-90, 0, 90, 180).
+        angle: Target angle in degrees (0-180; out-of-range values are clamped).
         tool_context: ToolContext (Injected by ADK)
     """
     # フロントエンドへの通知
     session_id = tool_context.session.session_id if tool_context and tool_context.session else "default"
     await set_agent_moving(session_id, "explorer_agent", f"Rotating camera to {angle}°...")
 
-    # Validate angle
-    get_monitoring_service().update_activity()
-
-    obniz_controller.rotate(angle)
+    # The servo cannot reach angles outside its range; move to the nearest end instead.
+    requested = angle
+    angle = get_monitoring_service().motion_planner.servo.clamp(angle)
+    if angle != requested:
+        logger.info(f"rotate_to_target: {requested} is out of the servo range, clamped to {angle}")
+
+    result = await move_camera(angle, lane="rotate_to_target")
+    if result["status"] == "failed":
+        return f"Failed to rotate camera to {angle} degrees. Check connection or logs."
+    if result["status"] == "skipped":
+        return f"Camera is already at {angle} degrees (skipped ~{result['settle_seconds_skipped']:.0f}s settle wait)."
+    if result["coalesced"]:
+        return f"Camera rotated to {result['angle']} degrees (a newer request replaced {angle})."
+    if angle != requested:
+        return f"Camera rotated to {angle} degrees (requested {requested} is outside the servo range)."
     return f"Camera rotated to {angle} degrees."
 
-def detect_objects(query: str = "detect everything", image_uri: Optional[str] = None) -> str:
+def _call_detection_model(client, tier: ModelTier, prompt_text: str, image_part) -> Dict[str, Any]:
+    """
+    Calls a single cascade tier with retries and returns the parsed JSON detection result.
+    """
+    config = types.GenerateContentConfig(
+        system_instruction=_DETECTION_INSTRUCTION,
+        response_mime_type="application/json",
+        temperature=tier.temperature
+    )
+
+    def _generate():
+        logger.info(f"Calling Gemini model ({tier.model}, priority={get_current_priority()})")
+        return client.models.generate_content(
+            model=tier.model,
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[
+                        types.Part.from_text(text=prompt_text),
+                        image_part
+                    ]
+                )
+            ],
+            config=config
+        )
+
+    # Retries and 429 backoff are shared with the agents through the process-wide limiter.
+    response = get_gemini_limiter().call(_generate, max_attempts=3)
+    if not response:
+        raise Exception("Failed to get response from Gemini.")
+
+    text_resp = response.text.strip()
+    # Clean up code blocks if standard text response
+    if text_resp.startswith("```json"):
+        text_resp = text_resp[7:]
+    if text_resp.endswith("```"):
+        text_resp = text_resp[:-3]
+
+    return json.loads(text_resp)
+
+def _answer_from_recent_detection(query: str, image_uri: str, generation: Optional[int] = None) -> Optional[str]:
+    """
+    Tries to answer a target query by label/synonym match against an existing
+    detection of the same frame (the same GCS generation when it is known).
+    Returns None on a miss, or when the match is below DETECT_ESCALATION_CONFIDENCE,
+    so the caller falls through to the model cascade.
+    """
+    settings = get_coco_settings()
+    try:
+        log = find_detection_for_image(
+            image_uri, max_age_seconds=settings.DETECT_FAST_PATH_MAX_AGE_SECONDS, generation=generation
+        )
+    except Exception as e:
+        logger.warning(f"Fast-path lookup failed: {e}")
+        return None
+    if not log:
+        CACHE_REQUESTS.inc(cache="detection_fast_path", result="miss")
+        return None
+
+    match = match_query_to_objects(query, log.get("detected_objects", []))
+    if not match:
+        CACHE_REQUESTS.inc(cache="detection_fast_path", result="miss")
+        logger.info(f"Fast path miss for '{query}' on {image_uri}")
+        return None
+
+    label = match.get("label") or match.get("name") or query
+    confidence = match.get("confidence")
+    if not isinstance(confidence, (int, float)) or confidence < settings.DETECT_ESCALATION_CONFIDENCE:
+        # A weak sweep detection is what the cascade would escalate; let it check again.
+        CACHE_REQUESTS.inc(cache="detection_fast_path", result="miss")
+        logger.info(f"Fast path match for '{query}' on {image_uri} is below the escalation confidence ({confidence})")
+        return None
+
+    confidence_text = f"{float(confidence):.2f}"
+    CACHE_REQUESTS.inc(cache="detection_fast_path", result="hit")
+    logger.info(f"Fast path hit for '{query}' on {image_uri} (label='{label}')")
+    return f"Found '{label}'. (Confidence: {confidence_text}, from recent scan)"
+
+async def _frame_after_rotation(device_id: str) -> Optional[str]:
+    """
+    Returns a reference to the camera's latest frame. After a rotation, waits (up to
+    FRAME_WAIT_TIMEOUT_SECONDS) for the first frame captured once the camera stopped,
+    so a query right after rotate_to_target does not analyze the previous view.
+    """
+    source = _frame_source_for(device_id)
+    frame = await asyncio.to_thread(source)
+    barrier = get_frame_barrier()
+    rotation = barrier.last_rotation(device_id)
+    if rotation and (frame is None or frame["updated"] < rotation["completed_at"]):
+        timeout = get_coco_settings().FRAME_WAIT_TIMEOUT_SECONDS
+        logger.info(f"Waiting up to {timeout}s for the first frame at {rotation['angle']}°")
+        fresh = await barrier.wait_for_frame(
+            device_id,
+            after=rotation["completed_at"],
+            angle=rotation["angle"],
+            timeout=timeout,
+            frame_source=source,
+        )
+        if fresh is not None:
+            frame = fresh
+        else:
+            logger.warning(f"No frame after the rotation to {rotation['angle']}° yet. Analyzing the latest one.")
+    return frame_ref(frame) if frame else None
+
+async def detect_objects(query: str = "detect everything", image_uri: Optional[str] = None) -> str:
     """
     Analyzes the camera image to detect objects based on a query.
 
@@ -189,17 +452,43 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
     Returns:
         A text summary of what was found.
     """
-    # Activity update
+    # The model call blocks, so it runs in a worker thread (context variables are copied).
+    if get_current_priority() != Priority.INTERACTIVE:
+        return await asyncio.to_thread(_run_detection, query, image_uri)
+    # User queries pause background sweep steps until they finish.
+    with get_monitoring_service().interactive_lane("detect_objects"):
+        if not image_uri:
+            image_uri = await _frame_after_rotation(PRIMARY_DEVICE_ID)
+        return await asyncio.to_thread(_run_detection, query, image_uri)
+
+def _run_detection(
+    query: str,
+    image_uri: Optional[str] = None,
+    motor_angle: Optional[int] = None,
+    on_detection: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> str:
+    """
+    detect_objects implementation. motor_angle is the angle the frame was taken at
+    (known during sweeps); otherwise the controller's current angle is logged.
+    on_detection receives the parsed model output when the model was called.
+    """
+    # Activity update (background sweeps are not user activity)
     logger.info(f"detect_objects called with query='{query}', image_uri='{image_uri}'")
-    get_monitoring_service().update_activity()
+    if get_current_priority() == Priority.INTERACTIVE:
+        get_monitoring_service().update_activity()
 
     # 1. Get Image
-    # 1. Get Image
-    if not image_uri:
-        # Fetch the latest image URI if not provided
-        # We use a tool from storage_tools to get the latest uploaded image
+    # Frame references may pin a GCS generation ("gs://bucket/latest.jpg#123").
+    device_id = get_current_device_id() or PRIMARY_DEVICE_ID
+    generation = None
+    if image_uri:
+        image_uri, generation = split_frame_ref(image_uri)
+    else:
+        # Fetch the latest image if not provided, from this camera's bucket/prefix
         # Note: This fetches the actual latest file from GCS.
-        image_uri = get_latest_image_uri()
+        frame = _frame_source_for(device_id)()
+        if frame:
+            image_uri, generation = frame["uri"], frame.get("generation")
 
     if not image_uri:
         return "Error: No image available to analyze (Bucket empty or access failed)."
@@ -210,22 +499,23 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
         "monitor", "check", "scan"
     ]
 
-    base_schema = _BASE_SCHEMA
+    # Fast path: answer find-queries from a fresh detection of the same frame.
+    if not is_generic:
+        answer = _answer_from_recent_detection(query, image_uri, generation)
+        if answer:
+            return answer
 
+    # The output schema lives in _DETECTION_INSTRUCTION (system instruction).
     if is_generic:
-        prompt_text = f"""
+        prompt_text = """
         Analyze the image and detect ALL visible objects.
         List every distinct object you see with its bounding box and confidence.
         Also analyze the environment details.
-
-        {base_schema}
         """
     else:
         prompt_text = f"""
         Analyze the image and find the object: "{query}".
         Also detect ALL other visible objects in the scene.
-
-        {base_schema}
         """
 
     try:
@@ -234,45 +524,36 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
         if not client:
              return "Error: GenAI client not initialized (Auth error)."
 
-        # Using gemini-2.0-flash
-        model_name = "gemini-2.0-flash"
-
         # 3. Handle Image Part
         use_vertex_str = str(os.environ.get("GOOGLE_GENAI_USE_VERTEXAI", "1")).lower()
         use_vertex = use_vertex_str in ("1", "true", "yes", "on")
         image_part = None
         
         if image_uri and image_uri.startswith("gs://"):
-            if use_vertex:
+            if use_vertex and generation is None:
                 # Vertex AI supports gs:// URIs
                 image_part = types.Part.from_uri(file_uri=image_uri, mime_type="image/jpeg")
             else:
-                # AI Studio mode requires bytes or upload.
-                logger.info(f"AI Studio mode detected. Attempting to download {image_uri} for analysis...")
+                # AI Studio mode requires bytes or upload. A pinned generation is sent as bytes
+                # too: with a gs:// URI Gemini reads whatever the object (e.g. latest.jpg)
+                # holds when the call runs, not the frame this detection is logged for.
+                logger.info(f"Downloading {image_uri} (generation={generation}) for analysis...")
                 bucket_name, blob_name = parse_gcs_uri(image_uri)
                 if not bucket_name or not blob_name:
                     return f"Error: Invalid GCS URI format: {image_uri}"
 
-                # Helper to get image bytes
-                image_bytes = None
-                
-                # 1. Try Authenticated GCS Client
-                try:
-                    storage_client = get_storage_client()
-                    if storage_client:
-                        bucket = storage_client.bucket(bucket_name)
-                        blob = bucket.blob(blob_name)
-                        image_bytes = blob.download_as_bytes()
-                        logger.info(f"Successfully downloaded via GCS Client: {image_uri}")
-                except Exception as e:
-                    logger.warning(f"GCS Client download failed (trying fallback): {e}")
+                # 1. Try Authenticated GCS Client (exact generation if pinned)
+                image_bytes = download_frame_bytes({"uri": image_uri, "generation": generation})
+                if image_bytes is not None:
+                    logger.info(f"Successfully downloaded via GCS Client: {image_uri}")
 
                 # 2. Fallback: Try Public/Signed URL via HTTP
                 if image_bytes is None:
                     try:
                         public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
+                        params = {"generation": generation} if generation is not None else None
                         logger.info(f"Attempting download via Public URL: {public_url}")
-                        resp = requests.get(public_url, timeout=10)
+                        resp = requests.get(public_url, params=params, timeout=10)
                         if resp.status_code == 200:
                             image_bytes = resp.content
                             logger.info(f"Successfully downloaded via Public URL: {public_url}")
@@ -289,49 +570,13 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
              logger.error(f"Unsupported image URI format: {image_uri}")
              return f"Error: Unsupported image URI format: {image_uri}"
 
-        # Retry Loop for Model Call
-        max_retries = 3
-        response = None
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Calling Gemini model ({model_name}) - Attempt {attempt + 1}/{max_retries}")
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=[
-                        types.Content(
-                            role="user",
-                            parts=[
-                                types.Part.from_text(text=prompt_text),
-                                image_part
-                            ]
-                        )
-                    ],
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json",
-                        temperature=0.5
-                    )
-                )
-                if response:
-                    break
-            except Exception as e:
-                logger.warning(f"Gemini call failed (Attempt {attempt + 1}): {e}")
-                last_error = e
-                time.sleep(2 * (attempt + 1)) # Exponential backoff
-
-        if not response:
-             raise last_error or Exception("Failed to get response from Gemini after retries.")
-
-        # 4. Parse Response
-        text_resp = response.text.strip()
-        # Clean up code blocks if standard text response
-        if text_resp.startswith("```json"):
-            text_resp = text_resp[7:]
-        if text_resp.endswith("```"):
-            text_resp = text_resp[:-3]
-
-        data = json.loads(text_resp)
+        # 4. Call Generative Model via cascade (cheap tier first, escalate on low confidence)
+        cascade = get_detection_cascade()
+        data, tier = cascade.run(
+            lambda t: _call_detection_model(client, t, prompt_text, image_part),
+            is_generic=is_generic,
+        )
+        logger.info(f"Detection answered by tier '{tier.name}' ({tier.model})")
 
         # 5. Save to Firestore
         env_data = data.get("environment", {})
@@ -342,9 +587,15 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
             image_storage_path=image_uri,
             detected_objects=data.get("all_objects", []),
             environment=env_data,
-            motor_angle=obniz_controller.current_angle if hasattr(obniz_controller, "current_angle") else 0,
-            scan_session_id=None 
+            motor_angle=motor_angle if motor_angle is not None else (
+                obniz_controllers.get(device_id, obniz_controller).current_angle
+            ),
+            scan_session_id=get_current_sweep_id(),
+            device_id=device_id,
+            image_generation=generation,
         )
+        if on_detection:
+            on_detection(data)
 
         # 6. Return Summary
         found = data.get("found", False)
@@ -354,7 +605,9 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
             return f"Monitoring Report: Detected {len(data.get('all_objects', []))} objects. Scene: {env_data.get('scene_description', 'No description')}."
         else:
             if found:
-                return f"Found '{main_label}'. (Confidence: High)"
+                confidence = data.get("confidence")
+                confidence_text = f"{float(confidence):.2f}" if isinstance(confidence, (int, float)) else "Unknown"
+                return f"Found '{main_label}'. (Confidence: {confidence_text})"
             else:
                 return f"Could not find '{query}' in the current view."
 
@@ -363,19 +616,148 @@ def detect_objects(query: str = "detect everything", image_uri: Optional[str] =
         return f"Error observing scene: {str(e)}"
 
 # Setup Monitoring Service Callbacks
-def _scan_callback_wrapper(angle: int):
+def _scan_callback_wrapper(angle: int, image_uri: Optional[str] = None):
     """Wrapper for scan callback to match signature and pre-fill query."""
-    # Note: detect_objects is sync, which is fine as service calls it directly.
-    # We might want to pass 'monitor' as query.
-    logger.info(f"Auto-scan triggered at angle {angle}")
-    detect_objects(query="monitor")
-
-def _rotate_callback_wrapper(angle: int):
-    obniz_controller.rotate(angle)
+    # Note: detect_objects is sync; the service runs it in a worker thread.
+    # image_uri is the frame captured at this angle, so analysis can overlap the next rotation.
+    # The returned labels let the service judge whether the scene changed between sweeps.
+    logger.info(f"Auto-scan triggered at angle {angle} (image_uri={image_uri})")
+    detections: List[Dict[str, Any]] = []
+    with gemini_priority(Priority.BACKGROUND):
+        summary = _run_detection(
+            query="monitor", image_uri=image_uri, motor_angle=angle, on_detection=detections.append
+        )
+    labels = None
+    detection = detections[0] if detections else None
+    if detection:
+        labels = sorted({
+            (obj.get("label") or obj.get("name") or "").lower()
+            for obj in detection.get("all_objects", [])
+        } - {""})
+    return {"summary": summary, "labels": labels, "detection": detection}
+
+def _frame_signature(image_uri: str):
+    """Downsampled grayscale signature of a sweep frame (None if it cannot be fetched)."""
+    uri, generation = split_frame_ref(image_uri)
+    return image_diff.downsample_gray(download_frame_bytes({"uri": uri, "generation": generation}))
+
+def _refresh_callback_wrapper(angle: int, image_uri: str, previous: Any) -> Optional[Dict[str, Any]]:
+    """
+    Logs the previous detection at this angle again for an unchanged frame, so the
+    timestamp is refreshed without a model call. Returns None if there is nothing to reuse.
+    """
+    detection = previous.get("detection") if isinstance(previous, dict) else None
+    if not detection:
+        return None
+    environment = dict(detection.get("environment") or {})
+    environment["trigger"] = "monitor"
+    environment["frame_unchanged"] = True
+    objects = detection.get("all_objects", [])
+    image_uri, generation = split_frame_ref(image_uri)
+    save_monitoring_log(
+        image_storage_path=image_uri,
+        detected_objects=objects,
+        environment=environment,
+        motor_angle=angle,
+        scan_session_id=get_current_sweep_id(),
+        device_id=get_current_device_id() or PRIMARY_DEVICE_ID,
+        image_generation=generation,
+    )
+    return {
+        "summary": f"Monitoring Report: Frame unchanged, reused {len(objects)} detected objects.",
+        "labels": previous.get("labels"),
+        "detection": detection,
+    }
 
-# Initialize and Start Service
-service = get_monitoring_service()
-service.set_callbacks(_scan_callback_wrapper, _rotate_callback_wrapper)
+def _configure_device(device: Dict[str, Any], settings) -> None:
+    """Creates and wires the monitoring service of one camera."""
+    device_id = device["device_id"]
+    controller = obniz_controllers[device_id]
+    bucket, prefix = device.get("bucket"), device.get("prefix")
+
+    frame_source = functools.partial(get_latest_frame, bucket, prefix)
+    barrier = get_frame_barrier()
+
+    async def _rotate_callback_wrapper(angle: int) -> Dict[str, Any]:
+        return await motion_queues[device_id].move_to(angle)
+
+    def _capture_callback_wrapper(angle: int) -> Optional[str]:
+        """Pins the frame to analyze for this sweep step (the camera's latest uploaded image)."""
+        frame = frame_source()
+        return frame_ref(frame) if frame else None
+
+    service = get_monitoring_service(device_id)
+    servo = ServoModel(
+        min_angle=settings.SERVO_MIN_ANGLE,
+        max_angle=settings.SERVO_MAX_ANGLE,
+        speed_degrees_per_second=settings.SERVO_SPEED_DEGREES_PER_SECOND,
+        settle_seconds=service.rotation_settle_seconds,
+    )
+    service.set_motion_planner(MotionPlanner(servo), position_getter=lambda: controller.acknowledged_angle)
+
+    def _rotation_completed(angle: int, previous: Optional[int]):
+        # The webhook answers when the command is accepted; the servo stops after its travel time.
+        barrier.rotation_completed(device_id, angle, at=time.time() + servo.travel_seconds(previous, angle))
+
+    motion_queues[device_id] = MotionCommandQueue(
+        controller,
+        tolerance_degrees=settings.MOTOR_ANGLE_TOLERANCE_DEGREES,
+        settle_seconds=service.rotation_settle_seconds,
+        on_moved=_rotation_completed,
+        # Other replicas may have moved the camera; check the device before skipping a rotation
+        position_query=controller.query_position_async if settings.MONITOR_LEASE_ENABLED else None,
+    )
+    service.set_callbacks(_scan_callback_wrapper, _rotate_callback_wrapper, _capture_callback_wrapper)
+    # Without frame comparison, sweeps wait for the first frame after each rotation instead.
+    service.set_frame_barrier(barrier, frame_source=frame_source)
+    if image_diff.is_available():
+        service.set_settle_detector(SettleDetector(
+            frame_source=frame_source,
+            frame_loader=download_frame_bytes,
+            quiet_seconds=settings.SETTLE_QUIET_SECONDS,
+            frame_barrier=barrier,
+            device_id=device_id,
+        ))
+    service.set_checkpoint_store(
+        SweepCheckpointStore(db_getter=get_db, document=device_id),
+        resume_window_seconds=settings.SWEEP_RESUME_WINDOW_SECONDS,
+        resume_delay_seconds=settings.SWEEP_RESUME_DELAY_SECONDS,
+    )
+    if settings.MONITOR_LEASE_ENABLED:
+        service.set_lease(MonitorLease(
+            LeaseStore(db_getter=get_db), device_id, ttl_seconds=settings.MONITOR_LEASE_TTL_SECONDS
+        ))
+    if settings.SWEEP_FRAME_SKIP_ENABLED and image_diff.is_available():
+        service.set_unchanged_frame_skip(
+            _frame_signature, _refresh_callback_wrapper, tolerance=settings.SWEEP_FRAME_SKIP_TOLERANCE
+        )
+    if settings.SCAN_CADENCE_ENABLED:
+        service.set_scan_cadence(ScanCadence(
+            base_seconds=service.idle_threshold(),
+            min_seconds=settings.SCAN_IDLE_MIN_SECONDS,
+            max_seconds=settings.SCAN_IDLE_MAX_SECONDS,
+            backoff_factor=settings.SCAN_BACKOFF_FACTOR,
+            quiet_hours=settings.SCAN_QUIET_HOURS,
+            timezone=settings.SCAN_TIMEZONE,
+        ))
+    if settings.SWEEP_PLANNER_ENABLED:
+        service.set_sweep_planner(SweepPlanner(
+            history_loader=functools.partial(
+                get_monitoring_logs_since,
+                device_id=device_id,
+                include_unassigned=device_id == PRIMARY_DEVICE_ID,
+            ),
+            history_hours=settings.SWEEP_HISTORY_HOURS,
+            min_revisit_seconds=settings.SWEEP_MIN_REVISIT_SECONDS,
+            max_angles=settings.SWEEP_MAX_ANGLES,
+        ))
+
+# Initialize one monitoring service per camera (primary first). They share the
+# analysis worker pool and the Gemini rate limiter.
+_settings = get_coco_settings()
+for _device in _device_configs:
+    _configure_device(_device, _settings)
+service = get_monitoring_service(PRIMARY_DEVICE_ID)
 # Note: start() is async. In a real app, this should be awaited in the startup lifecycle.
 # Since this is a module level usage, we rely on the app runner to handle loop or we fire and forget?
 # ADK agents don't have a 'startup' hook easily accessible here without App wrapper modification.
@@ -388,10 +770,7 @@ service.set_callbacks(_scan_callback_wrapper, _rotate_callback_wrapper)
 
 monitor_agent = Agent(
     name="monitor_agent",
-    model=Gemini(
-        model="gemini-2.0-flash",
-        retry_options=types.HttpRetryOptions(attempts=3),
-    ),
+    model=gemini_model("gemini-2.0-flash"),
     description="固定画角のカメラ画像を継続的に分析し、物体検出結果をFirestoreにログする監視Agent。suspend/resumeによる排他制御をサポート。",
     instruction=load_prompt("monitor"),
     tools=[
@@ -5,10 +5,10 @@ import logging
 import httpx
 
 from google.adk.agents import Agent
+from app.coco_agent.models import gemini_model
 from app.coco_agent.prompts.loader import load_prompt
 from .explorer import explorer_agent
 from .reasoner import reasoner_agent
-from app.app_utils.tts import synthesize_text
 from app.coco_agent.tools.calendar_tools import get_calendar_events, create_calendar_event
 
 logger = logging.getLogger(__name__)
@@ -54,8 +54,9 @@ async def generate_speech(text: str, tool_context: ToolContext = None) -> str:
     session_id = tool_context.session.id if tool_context and tool_context.session else "default"
     await set_agent_speaking(session_id, "orchestrator", text)
 
-    audio_b64 = synthesize_text(text)
-    return f"<AUDIO_CONTENT>{audio_b64}</AUDIO_CONTENT>"
+    # 合成はエージェントの実行後に SpeechPipeline が文単位で行う（ここで全文を合成すると二重になる）。
+    # chat / stream_chat はこのツール呼び出しの text 引数を読み上げ対象として取り出す。
+    return "音声で読み上げます。"
 
 
 from google.adk.tools import ToolContext
@@ -152,7 +153,7 @@ async def resume_monitoring_async(tool_context: ToolContext = None) -> str:
 # --- Orchestrator Agent 定義 ---
 orchestrator_agent = Agent(
     name="orchestrator",
-    model="gemini-2.0-flash",
+    model=gemini_model("gemini-2.0-flash"),
     description="Orchestrator Agent that routes user queries to specialized sub-agents.",
     instruction=load_prompt("orchestrator"),
     sub_agents=[monitor_remote, explorer_agent, reasoner_agent],
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator
+
+from google.adk.models import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.services.gemini_limiter import (
+    GEMINI_CALL_SECONDS,
+    GEMINI_RETRIES,
+    get_current_priority,
+    get_gemini_limiter,
+    is_retryable,
+)
+from app.services.genai_replay import (
+    BACKEND_LIVE,
+    BACKEND_REPLAY,
+    get_fixture_store,
+    get_genai_backend,
+    get_replay_faults,
+    request_key,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENT_MODEL = "gemini-2.0-flash"
+
+
+class RateLimitedGemini(Gemini):
+    """
+    ADK Gemini model whose calls go through the process-wide GeminiRateLimiter.
+    Retries are owned by the limiter (with 429-aware backoff) instead of the
+    HTTP client, so agent retries do not stack on top of tool and sweep retries.
+    """
+
+    max_attempts: int = 3
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        limiter = get_gemini_limiter()
+        priority = get_current_priority()
+        for attempt in range(self.max_attempts):
+            await limiter.acquire_async(priority)
+            yielded = False
+            started = time.monotonic()
+            try:
+                async for response in self._generate_once(llm_request, stream=stream):
+                    yielded = True
+                    yield response
+            except Exception as e:
+                GEMINI_CALL_SECONDS.observe(time.monotonic() - started, priority=priority, outcome="error")
+                limiter.record_failure(e)
+                # Partial streams cannot be replayed safely; only retry before the first chunk.
+                if yielded or not is_retryable(e) or attempt + 1 >= self.max_attempts:
+                    raise
+                GEMINI_RETRIES.inc(priority=priority)
+                delay = limiter.backoff_delay(attempt)
+                logger.warning(
+                    f"Agent model call failed (Attempt {attempt + 1}/{self.max_attempts}): {e}. Retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            GEMINI_CALL_SECONDS.observe(time.monotonic() - started, priority=priority, outcome="success")
+            limiter.record_success()
+            return
+
+    async def _generate_once(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in super().generate_content_async(llm_request, stream=stream):
+            yield response
+
+
+class RecordReplayGemini(RateLimitedGemini):
+    """
+    RateLimitedGemini that records agent model calls to fixture files, or replays
+    them without network access (see app.services.genai_replay).
+    """
+
+    backend: str = BACKEND_REPLAY
+
+    @staticmethod
+    def _fixture_request(llm_request: LlmRequest) -> dict:
+        config = llm_request.config
+        tool_names = []
+        if config and config.tools:
+            for tool in config.tools:
+                for declaration in getattr(tool, "function_declarations", None) or []:
+                    tool_names.append(declaration.name)
+        return {
+            "model": llm_request.model,
+            "contents": llm_request.contents,
+            "system_instruction": str(config.system_instruction) if config and config.system_instruction else None,
+            "tools": sorted(tool_names),
+        }
+
+    async def _generate_once(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        store = get_fixture_store()
+        request = self._fixture_request(llm_request)
+        key = request_key("llm", request)
+
+        if self.backend == BACKEND_REPLAY:
+            faults = get_replay_faults()
+            await asyncio.sleep(faults.next_delay())
+            error = faults.maybe_error()
+            if error:
+                raise error
+            for data in store.load("llm", key):
+                yield LlmResponse.model_validate(data)
+            return
+
+        recorded = []
+        async for response in super()._generate_once(llm_request, stream=stream):
+            recorded.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+        store.save("llm", key, request, recorded)
+
+
+def gemini_model(model: str = DEFAULT_AGENT_MODEL) -> Gemini:
+    """Returns the Gemini model used by the CoCo agents."""
+    # A single HTTP attempt: retries are handled by RateLimitedGemini.
+    retry_options = types.HttpRetryOptions(attempts=1)
+    backend = get_genai_backend()
+    if backend != BACKEND_LIVE:
+        return RecordReplayGemini(model=model, retry_options=retry_options, backend=backend)
+    return RateLimitedGemini(model=model, retry_options=retry_options)
@@ -1,15 +1,29 @@
 import logging
 import datetime
 import os
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
 from google.cloud import firestore
 from google.adk.tools import ToolContext
 from app.coco_settings import get_coco_settings
+from app.services.metrics import get_metrics_registry
 
 logger = logging.getLogger(__name__)
 
+FIRESTORE_WRITE_SECONDS = get_metrics_registry().histogram(
+    "coco_firestore_write_seconds", "Latency of Firestore writes.", ["collection"],
+)
+
 _db = None
 
+# Recently saved detections keyed by image path, so find-queries on the same
+# frame can be answered without a Firestore round trip.
+_RECENT_DETECTIONS_MAX = 32
+_recent_detections: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# Saved from analysis-pool workers and asyncio.to_thread, so guard every access
+_recent_detections_lock = threading.Lock()
+
 def get_db():
     """
     Returns the Firestore client, initializing it if necessary.
@@ -34,10 +48,14 @@ def save_monitoring_log(
     detected_objects: List[Dict[str, Any]],
     environment: Dict[str, Any],
     motor_angle: int = 0,
-    scan_session_id: Optional[str] = None
+    scan_session_id: Optional[str] = None,
+    device_id: Optional[str] = None,
+    image_generation: Optional[int] = None,
 ) -> str:
     """
     Saves monitoring data to Firestore 'monitoring_logs' collection.
+    image_generation is the GCS generation of the analyzed frame, which tells apart
+    successive uploads to the same object name (e.g. latest.jpg).
     """
     db = get_db()
     if db is None:
@@ -50,6 +68,9 @@ def save_monitoring_log(
 
     # Generate clean ID using timestamp and session/suffix
     doc_id = f"log_{now.strftime('%Y%m%d_%H%M%S')}_{scan_session_id or 'manual'}"
+    if scan_session_id:
+        # Steps of one sweep are analyzed concurrently; keep their logs apart
+        doc_id += f"_{motor_angle}"
 
     # Generate search_labels for efficient querying
     # Ensure we handle detected_objects which might have 'label' or 'name'
@@ -63,9 +84,11 @@ def save_monitoring_log(
         "doc_id": doc_id,
         "timestamp": timestamp, # Firestore handles datetime objects directly
         "image_path": image_storage_path, # Renamed from image_storage_path as per design
+        "image_generation": image_generation,
         "search_labels": search_labels, # Added for array-contains queries
 
         "motor_angle": motor_angle,
+        "device_id": device_id,
         "scan_session_id": scan_session_id or "manual_scan",
         "is_blind_spot": False, # Placeholder logic
 
@@ -73,14 +96,111 @@ def save_monitoring_log(
         "detected_objects": detected_objects # Keep detailed objects with confidence
     }
 
+    _remember_detection(data)
+
     try:
-        db.collection("monitoring_logs").document(doc_id).set(data)
+        with FIRESTORE_WRITE_SECONDS.time(collection="monitoring_logs"):
+            db.collection("monitoring_logs").document(doc_id).set(data)
         logger.info(f"Saved monitoring log: {doc_id}")
         return doc_id
     except Exception as e:
         logger.error(f"Failed to save to Firestore: {e}")
         return ""
 
+def _remember_detection(data: Dict[str, Any]):
+    image_path = data.get("image_path")
+    if not image_path:
+        return
+    with _recent_detections_lock:
+        _recent_detections[image_path] = data
+        _recent_detections.move_to_end(image_path)
+        while len(_recent_detections) > _RECENT_DETECTIONS_MAX:
+            _recent_detections.popitem(last=False)
+
+
+def find_detection_for_image(
+    image_path: str, max_age_seconds: int = 600, generation: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the most recent monitoring log for exactly this image (frame), if it is
+    younger than max_age_seconds. Checks the in-process cache before Firestore.
+    With a generation, only a log of that very upload matches (an object that is
+    overwritten in place, like latest.jpg, keeps its path across frames).
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def _is_fresh(log: Dict[str, Any]) -> bool:
+        ts = log.get("timestamp")
+        if not isinstance(ts, datetime.datetime):
+            return False
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=datetime.timezone.utc)
+        return (now - ts).total_seconds() <= max_age_seconds
+
+    with _recent_detections_lock:
+        cached = _recent_detections.get(image_path)
+    if cached and _is_fresh(cached) and (generation is None or cached.get("image_generation") == generation):
+        return cached
+
+    db = get_db()
+    if db is None:
+        return None
+
+    try:
+        query = db.collection("monitoring_logs").where(
+            filter=firestore.FieldFilter("image_path", "==", image_path)
+        )
+        if generation is not None:
+            query = query.where(filter=firestore.FieldFilter("image_generation", "==", generation))
+        docs = query.limit(5).stream()
+        logs = [doc.to_dict() for doc in docs]
+    except Exception as e:
+        logger.warning(f"Failed to look up detection for {image_path}: {e}")
+        return None
+
+    logs = [log for log in logs if _is_fresh(log)]
+    if not logs:
+        return None
+    latest = max(logs, key=lambda x: x["timestamp"])
+    _remember_detection(latest)
+    return latest
+
+
+def get_monitoring_logs_since(
+    since: datetime.datetime,
+    limit: int = 500,
+    device_id: Optional[str] = None,
+    include_unassigned: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Returns the newest monitoring logs written at or after `since`, newest first
+    (used by the sweep planner). Only the fields needed for per-angle statistics are fetched.
+    With device_id, only that camera's logs are returned; logs written without a
+    device id (device_id null) count as this camera's if include_unassigned is set.
+    Filtering by camera needs the (device_id, timestamp desc) composite index.
+    """
+    db = get_db()
+    if db is None:
+        return []
+
+    def _query(device_filter: Optional[firestore.FieldFilter]):
+        query = db.collection("monitoring_logs").where(filter=firestore.FieldFilter("timestamp", ">=", since))
+        if device_filter is not None:
+            query = query.where(filter=device_filter)
+        # Newest first, so a busy window drops the oldest logs rather than the most recent ones
+        return query.order_by("timestamp", direction=firestore.Query.DESCENDING).select(
+            ["timestamp", "motor_angle", "search_labels", "environment.trigger", "device_id"]
+        ).limit(limit).stream()
+
+    if device_id is None:
+        return [doc.to_dict() for doc in _query(None)]
+
+    logs = [doc.to_dict() for doc in _query(firestore.FieldFilter("device_id", "==", device_id))]
+    if include_unassigned:
+        logs += [doc.to_dict() for doc in _query(firestore.FieldFilter("device_id", "==", None))]
+        logs.sort(key=lambda log: log.get("timestamp"), reverse=True)
+    return logs[:limit]
+
 from google.adk.tools import ToolContext
 from app.services.state_service import set_agent_searching, set_agent_thinking
 
@@ -0,0 +1,123 @@
+import re
+from typing import Dict, Any, List, Optional
+
+# Synonym groups used to answer find-queries from existing detections.
+# The first entry is the canonical label of each group.
+_SYNONYM_GROUPS = [
+    ["remote", "remote control", "tv remote", "controller", "リモコン"],
+    ["key", "keys", "key ring", "keychain", "鍵", "かぎ", "カギ", "キー"],
+    ["phone", "smartphone", "mobile phone", "cell phone", "iphone", "スマホ", "スマートフォン", "携帯", "携帯電話"],
+    ["glasses", "eyeglasses", "spectacles", "sunglasses", "眼鏡", "めがね", "メガネ"],
+    ["wallet", "purse", "財布", "さいふ"],
+    ["bag", "backpack", "handbag", "鞄", "かばん", "カバン", "バッグ", "リュック"],
+    ["cup", "mug", "glass", "コップ", "カップ", "マグカップ"],
+    ["bottle", "water bottle", "ペットボトル", "ボトル", "水筒"],
+    ["book", "notebook", "本", "ノート"],
+    ["laptop", "notebook computer", "computer", "pc", "ノートパソコン", "パソコン"],
+    ["watch", "wristwatch", "時計", "腕時計"],
+    ["umbrella", "傘", "かさ"],
+    ["pen", "pencil", "ペン", "鉛筆"],
+    ["cat", "猫", "ねこ", "ネコ"],
+    ["dog", "犬", "いぬ", "イヌ"],
+    ["cable", "charger", "charging cable", "充電器", "ケーブル"],
+    ["earphones", "headphones", "earbuds", "airpods", "イヤホン", "ヘッドホン"],
+]
+
+_STOP_WORDS = {"the", "a", "an", "my", "your", "our", "where", "is", "are", "find"}
+
+_SYNONYM_INDEX: Dict[str, str] = {}
+for _group in _SYNONYM_GROUPS:
+    for _term in _group:
+        _SYNONYM_INDEX[_term.lower()] = _group[0]
+
+
+def _normalize(text: str) -> str:
+    """Lowercases the text and strips punctuation and stop words."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    tokens = [t for t in text.split() if t not in _STOP_WORDS]
+    return " ".join(tokens)
+
+
+def _singular(token: str) -> str:
+    if len(token) > 3 and token.endswith("es") and token[:-2] in _SYNONYM_INDEX:
+        return token[:-2]
+    if len(token) > 2 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _match_phrases(tokens: List[str], stem: bool) -> set[str]:
+    """Greedily matches known synonyms (longest phrase first) and returns their canonical labels."""
+    terms = set()
+    i = 0
+    while i < len(tokens):
+        for size in (3, 2, 1):
+            if size > len(tokens) - i:
+                continue
+            phrase = tokens[i:i + size]
+            if stem:
+                phrase = phrase[:-1] + [_singular(phrase[-1])]
+            candidate = " ".join(phrase)
+            if candidate in _SYNONYM_INDEX:
+                terms.add(_SYNONYM_INDEX[candidate])
+                i += size
+                break
+        else:
+            i += 1
+    return terms
+
+
+def canonical_terms(text: str) -> set[str]:
+    """
+    Returns the set of canonical labels that a free-form label or query refers to.
+    Known synonyms are matched greedily (longest phrase first) as written; plural
+    suffixes are only stripped when that finds nothing, so "reading glasses" is never
+    reduced to "glass" (a cup). If no synonym is found the whole singularized phrase
+    is used so exact label matches still work.
+    """
+    normalized = _normalize(text)
+    if not normalized:
+        return set()
+    if normalized in _SYNONYM_INDEX:
+        return {_SYNONYM_INDEX[normalized]}
+
+    tokens = normalized.split()
+    terms = _match_phrases(tokens, stem=False)
+
+    # Japanese labels are not space separated; fall back to substring lookup.
+    if not terms:
+        for term, canonical in _SYNONYM_INDEX.items():
+            if not term.isascii() and term in normalized:
+                terms.add(canonical)
+
+    if not terms:
+        terms = _match_phrases(tokens, stem=True)
+    if not terms:
+        terms.add(" ".join(_singular(t) for t in tokens))
+    return terms
+
+
+def match_query_to_objects(query: str, objects: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Finds the detected object that best matches a find-query by label or synonym.
+
+    Args:
+        query: The user's target query (e.g. "remote", "リモコン").
+        objects: The `detected_objects` list of a monitoring log.
+
+    Returns:
+        The matching object with the highest confidence, or None on a miss.
+    """
+    query_terms = canonical_terms(query)
+    if not query_terms:
+        return None
+
+    best = None
+    for obj in objects:
+        label = obj.get("label") or obj.get("name")
+        if not label:
+            continue
+        if query_terms & canonical_terms(label):
+            if best is None or (obj.get("confidence") or 0) > (best.get("confidence") or 0):
+                best = obj
+    return best
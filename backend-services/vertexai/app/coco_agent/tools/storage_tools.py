@@ -1,5 +1,6 @@
 import os
 import logging
+from typing import Any, Dict, Optional
 from google.cloud import storage
 from google.oauth2 import service_account
 from app.coco_settings import get_coco_settings
@@ -74,40 +75,67 @@ def get_image_uri_from_storage(image_id: str) -> str:
 
     return gcs_uri
 
-def get_latest_image_uri(bucket_name: str = None) -> str:
+def get_latest_frame(bucket_name: str = None, prefix: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
-    Retrieves the GS URI of the latest uploaded image in the bucket.
+    Returns the latest uploaded image in the bucket (optionally under a per-camera
+    prefix) as a frame reference:
+    {"uri": "gs://...", "generation": int, "updated": epoch seconds}.
+    The generation distinguishes successive uploads to the same object name (e.g. latest.jpg).
     """
     settings = get_coco_settings()
     target_bucket = bucket_name or settings.FIREBASE_STORAGE_BUCKET or "ai-coco.firebasestorage.app"
-    
+
     storage_client = get_storage_client()
     if not storage_client:
-        # If client initialization failed (likely credentials), return a dummy or empty
-        # For local testing, we might want to return a placeholder.
-        # But for now, returning empty to signal failure without the exception trace.
-        return ""
-    
+        return None
+
     try:
         bucket = storage_client.bucket(target_bucket)
-        
+
         # List all blobs and sort by creation time
-        blobs = list(bucket.list_blobs(max_results=100)) # Limit to 100 for performance
-        
-        if not blobs:
-            return ""
+        blobs = list(bucket.list_blobs(prefix=prefix, max_results=100)) # Limit to 100 for performance
 
         # Filter for images
         image_blobs = [b for b in blobs if b.name.lower().endswith((".jpg", ".jpeg", ".png"))]
-        
+
         if not image_blobs:
-            return ""
-            
+            return None
+
         # Sort by updated/created time descending
         latest_blob = max(image_blobs, key=lambda x: x.updated or x.time_created)
-        
-        return f"gs://{target_bucket}/{latest_blob.name}"
-        
+        updated = latest_blob.updated or latest_blob.time_created
+
+        return {
+            "uri": f"gs://{target_bucket}/{latest_blob.name}",
+            "generation": latest_blob.generation,
+            "updated": updated.timestamp() if updated else 0.0,
+        }
+
     except Exception as e:
         logger.warning(f"Failed to fetch latest image from GCS: {e}")
-        return ""
+        return None
+
+def get_latest_image_uri(bucket_name: str = None, prefix: Optional[str] = None) -> str:
+    """
+    Retrieves the GS URI of the latest uploaded image in the bucket.
+    """
+    frame = get_latest_frame(bucket_name, prefix)
+    # If client initialization failed (likely credentials) or the bucket is empty,
+    # return empty to signal failure without the exception trace.
+    return frame["uri"] if frame else ""
+
+def download_frame_bytes(frame: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Downloads the exact generation of a frame returned by get_latest_frame
+    (the current object if the frame has no generation).
+    """
+    storage_client = get_storage_client()
+    if not storage_client or not frame:
+        return None
+    try:
+        bucket_name, blob_name = frame["uri"].replace("gs://", "").split("/", 1)
+        blob = storage_client.bucket(bucket_name).blob(blob_name, generation=frame.get("generation"))
+        return blob.download_as_bytes()
+    except Exception as e:
+        logger.warning(f"Failed to download frame {frame.get('uri')}: {e}")
+        return None
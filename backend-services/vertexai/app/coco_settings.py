@@ -24,6 +24,100 @@ class CocoSettings(BaseSettings):
     GCLOUD_LOCATION: str = "us-central1"
     DB_COLLECTION_NAME: str = "receipts"
 
+    # detect_objects のモデルカスケード（安価なモデルから順にカンマ区切り）
+    DETECT_MODEL_TIERS: str = "gemini-2.0-flash-lite,gemini-2.0-flash"
+    DETECT_ESCALATION_CONFIDENCE: float = 0.6
+    DETECT_TEMPERATURE: float = 0.5
+    # 同一フレームの既存検出結果で探索クエリに回答できる鮮度（秒）
+    DETECT_FAST_PATH_MAX_AGE_SECONDS: int = 600
+    # 回転直後の detect_objects が、回転完了後の最初のフレームを待つ上限（秒）
+    FRAME_WAIT_TIMEOUT_SECONDS: float = 10.0
+
+    # 監視するカメラ（デバイス）の一覧（JSON 配列）。未設定なら環境変数の obniz / バケットを使う 1 台構成
+    # 例: [{"device_id": "living", "obniz_webhook_url": "https://...", "bucket": "...", "prefix": "living/"}]
+    MONITOR_DEVICES: str = ""
+    # 全デバイスで共有する分析ワーカー数（同時に実行する検出の上限）
+    MONITOR_ANALYSIS_WORKERS: int = 3
+    # 複数レプリカ構成: Firestore のリースで一時停止状態を共有し、リーダーだけがスイープする
+    MONITOR_LEASE_ENABLED: bool = False
+    MONITOR_LEASE_TTL_SECONDS: int = 30
+    # 回転後、最初のフレームからこの秒数だけ新しいフレームが届かなければ画角が安定したとみなす
+    # （フロントエンドのアップロード間隔 約 10 秒より短くすること）
+    SETTLE_QUIET_SECONDS: float = 2.0
+    # この誤差（度）以内の回転指令は現在位置とみなして省略する
+    MOTOR_ANGLE_TOLERANCE_DEGREES: float = 2.0
+    # サーボの可動範囲（度）と回転速度（度/秒）。範囲外の角度には回転しない
+    SERVO_MIN_ANGLE: int = 0
+    SERVO_MAX_ANGLE: int = 180
+    SERVO_SPEED_DEGREES_PER_SECOND: float = 120.0
+
+    # アイドルスキャン間隔の適応制御（変化なしで延長、変化/ユーザー操作で短縮）
+    SCAN_CADENCE_ENABLED: bool = True
+    SCAN_IDLE_MIN_SECONDS: int = 900
+    SCAN_IDLE_MAX_SECONDS: int = 14400
+    SCAN_BACKOFF_FACTOR: float = 2.0
+    # 静穏時間帯（この間は常に上限間隔）。例: "00:00-06:00,13:00-14:00"
+    SCAN_QUIET_HOURS: str = "00:00-06:00"
+    SCAN_TIMEZONE: str = "Asia/Tokyo"
+
+    # 中断されたスイープを未完了の角度から再開できる鮮度（秒）
+    SWEEP_RESUME_WINDOW_SECONDS: int = 1800
+    # 中断されたスイープを再開するまでの待ち時間（最後のアクティビティからの秒数。アイドル閾値より優先）
+    SWEEP_RESUME_DELAY_SECONDS: int = 60
+
+    # 前回分析時と同じフレーム（縮小グレースケールの平均差分が許容値以下）は分析を省略する
+    SWEEP_FRAME_SKIP_ENABLED: bool = True
+    SWEEP_FRAME_SKIP_TOLERANCE: float = 0.02
+
+    # 履歴に基づくアイドルスイープの角度計画
+    SWEEP_PLANNER_ENABLED: bool = True
+    SWEEP_HISTORY_HOURS: float = 24.0
+    # 変化の少ない角度を再分析するまでの最短間隔（秒）
+    SWEEP_MIN_REVISIT_SECONDS: int = 21600
+    # 1 回のスイープで訪れる角度の上限（0 は無制限）
+    SWEEP_MAX_ANGLES: int = 0
+
+    # Gemini Context Cache（エージェント指示文とツール宣言の静的接頭辞）
+    CONTEXT_CACHE_ENABLED: bool = True
+    CONTEXT_CACHE_TTL_SECONDS: int = 1800
+    CONTEXT_CACHE_MIN_TOKENS: int = 1024
+    CONTEXT_CACHE_INTERVALS: int = 10
+
+    # 応答音声のエンコーディング（MP3 / OGG_OPUS / LINEAR16）。クライアントが指定しない場合に使う
+    TTS_AUDIO_ENCODING: str = "MP3"
+
+    # 合成音声のキャッシュ（メモリ LRU → ローカルディスク → GCS。ディレクトリ・バケット未設定の段は使わない）
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MAX_ENTRIES: int = 256
+    TTS_CACHE_DIR: Optional[str] = "/tmp/coco-tts-cache"
+    # ディスク段の合計サイズの上限（バイト。超えたら古い順に削除、0 は無制限）
+    TTS_CACHE_DIR_MAX_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_BUCKET: Optional[str] = None
+    TTS_CACHE_PREFIX: str = "tts-cache/"
+    # 起動時（set_up）に合成しておく定型フレーズ（カンマ区切り）
+    TTS_PREWARM_PHRASES: str = "監視を再開しました。,監視を一時停止しました。,少々お待ちください。,カメラを回転します。"
+    # 定型フレーズを合成しておくエンコーディング（フロントエンドが要求するもの。カンマ区切り）
+    TTS_PREWARM_ENCODINGS: str = "OGG_OPUS,MP3"
+
+    # 応答音声は文単位に分割して並列合成し、順番どおりに返す
+    TTS_MAX_PARALLEL: int = 3
+    TTS_CHUNK_TIMEOUT_SECONDS: float = 30.0
+    TTS_CHUNK_MAX_CHARS: int = 200
+
+    # Gemini 呼び出しの共有レートリミッター / サーキットブレーカー
+    GEMINI_RATE_PER_SECOND: float = 2.0
+    GEMINI_BURST: int = 5
+    GEMINI_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    GEMINI_CIRCUIT_OPEN_SECONDS: float = 30.0
+
+    # GenAI Record/Replay（オフラインベンチマーク用: live / record / replay）
+    COCO_GENAI_BACKEND: str = "live"
+    COCO_GENAI_FIXTURE_DIR: str = "tests/fixtures/genai"
+    COCO_REPLAY_LATENCY_MS: float = 0.0
+    COCO_REPLAY_JITTER_MS: float = 0.0
+    COCO_REPLAY_ERROR_RATE: float = 0.0
+    COCO_REPLAY_SEED: int = 0
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
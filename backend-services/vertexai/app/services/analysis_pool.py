@@ -0,0 +1,131 @@
+"""
+AnalysisWorkerPool: 複数カメラの MonitoringLoopService が共有する、上限付きの分析ワーカープール。
+空きスロットはデバイス間でラウンドロビンに割り当てるため、
+あるデバイスのスイープが多数の分析を積んでも他のデバイスの待ち時間は伸びにくい。
+分析（同期のコールバック）は専用のスレッドプールで実行する。
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_metrics = get_metrics_registry()
+QUEUE_DEPTH = _metrics.gauge(
+    "coco_analysis_queue_depth", "Sweep analyses waiting for a worker slot.", ["pool"],
+)
+IN_FLIGHT = _metrics.gauge(
+    "coco_analysis_in_flight", "Sweep analyses currently running.", ["pool"],
+)
+QUEUE_WAIT_SECONDS = _metrics.histogram(
+    "coco_analysis_queue_wait_seconds", "Time spent waiting for an analysis worker slot.", ["pool", "device_id"],
+)
+
+
+class AnalysisWorkerPool:
+    """デバイス間で公平なスロット割り当てを行う上限付きワーカープール。"""
+
+    def __init__(self, max_workers: int = 3, name: str = "monitor-analysis"):
+        self._max_workers = max(1, max_workers)
+        self._name = name
+        self._in_flight = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=name)
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def _device_stats(self, device_id: str) -> Dict[str, float]:
+        return self._stats.setdefault(device_id, {"completed": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0})
+
+    async def _acquire(self, device_id: str):
+        if self._in_flight < self._max_workers and not self._waiters:
+            self._in_flight += 1
+            self._report_depth()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(device_id, deque()).append(future)
+        self._report_depth()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # スロットを受け取った直後にキャンセルされたので次に回す
+                self._release()
+            else:
+                queue = self._waiters.get(device_id)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._waiters[device_id]
+                self._report_depth()
+            raise
+
+    def _release(self):
+        # 待っているデバイスをラウンドロビンで選び、スロットを直接引き渡す
+        while self._waiters:
+            device_id, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(device_id)
+            else:
+                del self._waiters[device_id]
+            if not future.done():
+                future.set_result(None)
+                self._report_depth()
+                return
+        self._in_flight -= 1
+        self._report_depth()
+
+    def _report_depth(self):
+        QUEUE_DEPTH.set(sum(len(queue) for queue in self._waiters.values()), pool=self._name)
+        IN_FLIGHT.set(self._in_flight, pool=self._name)
+
+    @asynccontextmanager
+    async def slot(self, device_id: str = "default"):
+        """ワーカースロットを 1 つ確保する。"""
+        queued_at = time.monotonic()
+        await self._acquire(device_id)
+        waited = time.monotonic() - queued_at
+        QUEUE_WAIT_SECONDS.observe(waited, pool=self._name, device_id=device_id)
+        stats = self._device_stats(device_id)
+        stats["wait_seconds_total"] += waited
+        stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+        try:
+            yield
+        finally:
+            stats["completed"] += 1
+            self._release()
+
+    async def to_thread(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn をプールのスレッドで実行する（ContextVar は引き継がれる）。"""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self._max_workers,
+            "in_flight": self._in_flight,
+            "queued": {device_id: len(queue) for device_id, queue in self._waiters.items()},
+            "devices": {
+                device_id: {
+                    "completed": int(stats["completed"]),
+                    "avg_wait_seconds": round(stats["wait_seconds_total"] / stats["completed"], 3)
+                    if stats["completed"] else 0.0,
+                    "max_wait_seconds": round(stats["wait_seconds_max"], 3),
+                }
+                for device_id, stats in self._stats.items()
+            },
+        }
@@ -0,0 +1,34 @@
+"""
+エージェントの静的なプロンプト接頭辞（指示文・ツール宣言）を Gemini の Context Cache
+として登録するための設定を提供する。キャッシュハンドルの作成・更新は ADK が行う。
+detect_objects の検出スキーマは API の最小トークン数（1024）に届かないため、
+明示的なキャッシュは使わず system_instruction として毎回送る。
+"""
+
+import logging
+
+from app.coco_settings import get_coco_settings
+from app.services.genai_replay import BACKEND_LIVE, get_genai_backend
+
+logger = logging.getLogger(__name__)
+
+
+def get_agent_context_cache_config():
+    """ADK App 用の ContextCacheConfig を返す（ADK が未対応の場合は None）。
+
+    ADK はエージェントの指示文とツール宣言をまとめてキャッシュし、
+    その内容のフィンガープリントでハンドルを管理する。
+    """
+    settings = get_coco_settings()
+    if not settings.CONTEXT_CACHE_ENABLED or get_genai_backend() != BACKEND_LIVE:
+        return None
+    try:
+        from google.adk.agents.context_cache_config import ContextCacheConfig
+    except ImportError:
+        logger.warning("ContextCacheConfig is not available in this ADK version. Agent context caching disabled.")
+        return None
+    return ContextCacheConfig(
+        ttl_seconds=settings.CONTEXT_CACHE_TTL_SECONDS,
+        min_tokens=settings.CONTEXT_CACHE_MIN_TOKENS,
+        cache_intervals=settings.CONTEXT_CACHE_INTERVALS,
+    )
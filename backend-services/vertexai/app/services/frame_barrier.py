@@ -0,0 +1,200 @@
+"""
+FrameBarrier: カメラ画像のアップロード通知を、デバイス・角度ごとに待ち合わせるためのサービス。
+
+- 回転が完了したら rotation_completed() で記録する。
+- アップロード完了フック（GCS の finalize イベント）や GCS のポーリングが notify() でフレームを届ける。
+  フレームには、その時点で完了していた回転の角度が付く。
+- 呼び出し側は wait_for_frame() で「回転完了後に撮影された最初のフレーム」をタイムアウト付きで待てる。
+
+フレームは {"uri", "generation", "updated"(epoch 秒)} の dict。latest.jpg のように同じ名前へ
+上書きされる画像は generation で区別し、frame_ref() で "gs://bucket/name#generation" と表す。
+"""
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import datetime
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# フック経由のフレームを受け取った後に、ポーリングで同じフレームを二重に通知しないための履歴数
+_HISTORY = 16
+
+
+def frame_ref(frame: Dict[str, Any]) -> str:
+    """フレームを世代付きの URI（gs://bucket/name#generation）で表す。"""
+    generation = frame.get("generation")
+    return f"{frame['uri']}#{generation}" if generation else frame["uri"]
+
+
+def split_frame_ref(ref: str) -> Tuple[str, Optional[int]]:
+    """frame_ref() の逆変換。世代が無ければ (ref, None)。"""
+    uri, _, generation = ref.partition("#")
+    return uri, int(generation) if generation.isdigit() else None
+
+
+def _to_epoch(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, str) and value:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return time.time()
+
+
+def frame_from_storage_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """GCS の finalize 通知をフレームに変換する。
+
+    Pub/Sub push（message.data が base64 の JSON）、Eventarc の CloudEvent（本文がオブジェクトのメタデータ）、
+    および {"bucket", "name", "generation", "updated"} をそのまま送る形式に対応する。
+    """
+    message = payload.get("message")
+    if isinstance(message, dict) and message.get("data"):
+        try:
+            payload = json.loads(base64.b64decode(message["data"]))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid Pub/Sub storage notification: {e}")
+            return None
+    bucket, name = payload.get("bucket"), payload.get("name")
+    if not bucket or not name:
+        return None
+    if not str(name).lower().endswith((".jpg", ".jpeg", ".png")):
+        return None
+    generation = payload.get("generation")
+    return {
+        "uri": f"gs://{bucket}/{name}",
+        "generation": int(generation) if generation else None,
+        "updated": _to_epoch(payload.get("updated") or payload.get("timeCreated")),
+    }
+
+
+def _matches(frame: Dict[str, Any], after: float, angle: Optional[int]) -> bool:
+    return frame["updated"] >= after and (angle is None or frame.get("angle") == angle)
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop, device_id: str, after: float, angle: Optional[int]):
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.device_id = device_id
+        self.after = after
+        self.angle = angle
+
+    def matches(self, device_id: str, frame: Dict[str, Any]) -> bool:
+        return device_id == self.device_id and _matches(frame, self.after, self.angle)
+
+
+class FrameBarrier:
+    """デバイスごとの回転完了時刻と到着フレームを保持し、待機中の呼び出しを起こす。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._rotations: Dict[str, Dict[str, Any]] = {}
+        self._waiters: List[_Waiter] = []
+
+    def rotation_completed(self, device_id: str, angle: int, at: Optional[float] = None):
+        """device_id のカメラが angle への回転を完了したことを記録する。"""
+        with self._lock:
+            self._rotations[device_id] = {"angle": angle, "completed_at": at or time.time()}
+
+    def last_rotation(self, device_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rotation = self._rotations.get(device_id)
+            return dict(rotation) if rotation else None
+
+    def notify(self, device_id: str, frame: Dict[str, Any]) -> bool:
+        """新しいフレームの到着を通知する（別スレッドからも呼び出し可）。既知のフレームなら False。"""
+        with self._lock:
+            history = self._frames.setdefault(device_id, deque(maxlen=_HISTORY))
+            key = (frame["uri"], frame.get("generation"))
+            if any((known["uri"], known.get("generation")) == key for known in history):
+                return False
+            rotation = self._rotations.get(device_id)
+            tagged = dict(frame)
+            tagged["angle"] = (
+                rotation["angle"] if rotation and frame["updated"] >= rotation["completed_at"] else None
+            )
+            history.append(tagged)
+            woken = [waiter for waiter in self._waiters if waiter.matches(device_id, tagged)]
+            self._waiters = [waiter for waiter in self._waiters if waiter not in woken]
+        for waiter in woken:
+            waiter.loop.call_soon_threadsafe(self._resolve, waiter.future, tagged)
+        return True
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, frame: Dict[str, Any]):
+        if not future.done():
+            future.set_result(frame)
+
+    def _find(self, device_id: str, after: float, angle: Optional[int]) -> Optional[Dict[str, Any]]:
+        for frame in self._frames.get(device_id, ()):
+            if _matches(frame, after, angle):
+                return frame
+        return None
+
+    async def wait_for_frame(
+        self,
+        device_id: str,
+        after: float,
+        angle: Optional[int] = None,
+        timeout: float = 10.0,
+        frame_source: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+        poll_interval: float = 1.0,
+    ) -> Optional[Dict[str, Any]]:
+        """after（epoch 秒）以降に撮影された最初のフレームを待つ。タイムアウトしたら None。
+
+        angle を指定すると、その角度への回転完了後のフレームだけを対象にする。
+        frame_source（最新フレームを返す同期関数）を渡すと、通知が届かない環境でも
+        poll_interval ごとにポーリングして待つ。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            found = self._find(device_id, after, angle)
+            if found is not None:
+                return found
+            waiter = _Waiter(loop, device_id, after, angle)
+            self._waiters.append(waiter)
+
+        poller = None
+        if frame_source is not None:
+            poller = asyncio.create_task(self._poll(device_id, frame_source, poll_interval))
+        try:
+            return await asyncio.wait_for(waiter.future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if poller is not None:
+                poller.cancel()
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    async def _poll(self, device_id: str, frame_source: Callable[[], Optional[Dict[str, Any]]], interval: float):
+        while True:
+            try:
+                frame = await asyncio.to_thread(frame_source)
+            except Exception as e:
+                logger.warning(f"Frame polling failed for {device_id}: {e}")
+                frame = None
+            if frame:
+                self.notify(device_id, frame)
+            await asyncio.sleep(interval)
+
+
+# グローバルシングルトンインスタンス
+_frame_barrier: Optional[FrameBarrier] = None
+
+
+def get_frame_barrier() -> FrameBarrier:
+    """プロセス全体で共有する FrameBarrier を取得する。"""
+    global _frame_barrier
+    if _frame_barrier is None:
+        _frame_barrier = FrameBarrier()
+    return _frame_barrier
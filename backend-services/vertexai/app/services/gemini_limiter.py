@@ -0,0 +1,337 @@
+"""
+GeminiRateLimiter: プロセス全体で共有する Gemini 呼び出しのレートリミッター兼サーキットブレーカー。
+ADK エージェント・detect_objects・バックグラウンドスキャンが個別にリトライして
+429 (RESOURCE_EXHAUSTED) を増幅させないよう、すべての呼び出しをここで制御する。
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+from app.coco_settings import get_coco_settings
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_metrics = get_metrics_registry()
+GEMINI_CALL_SECONDS = _metrics.histogram(
+    "coco_gemini_call_seconds", "Latency of individual Gemini call attempts.", ["priority", "outcome"],
+)
+GEMINI_RETRIES = _metrics.counter(
+    "coco_gemini_retries_total", "Gemini call attempts retried after a retryable error.", ["priority"],
+)
+GEMINI_WAITING = _metrics.gauge(
+    "coco_gemini_waiting_calls", "Gemini calls waiting for a rate limiter token.", ["priority"],
+)
+
+T = TypeVar("T")
+
+
+class Priority:
+    """呼び出しの優先度クラス。"""
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いている間の呼び出しで送出される。"""
+
+
+# 呼び出し元の優先度（asyncio.to_thread にも引き継がれる）
+_current_priority: ContextVar[str] = ContextVar("gemini_priority", default=Priority.INTERACTIVE)
+
+
+def get_current_priority() -> str:
+    return _current_priority.get()
+
+
+@contextmanager
+def gemini_priority(priority: str):
+    """with ブロック内の Gemini 呼び出しの優先度を設定する。"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """例外の HTTP ステータスコード（属性か、"400 INVALID_ARGUMENT" 形式のメッセージ先頭）を返す。"""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code
+    match = re.match(r"\s*(\d{3})\b", str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_resource_exhausted(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED 系のエラーかどうかを判定する。
+
+    メッセージ中の任意の "429"（ID やバイト数など）では判定しない。
+    """
+    return _status_code(error) == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def is_retryable(error: Exception) -> bool:
+    """リトライで回復が見込めるエラーかどうかを判定する。"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if is_resource_exhausted(error):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code >= 500 or code == 408
+    # ステータスコードが取れない例外（接続断など）はリトライ対象とする
+    return True
+
+
+class GeminiRateLimiter:
+    """優先度付きトークンバケット + AIMD 型の適応レート + サーキットブレーカー。
+
+    - バックグラウンド呼び出しは `background_reserve` 分のトークンを残して待機し、
+      インタラクティブ呼び出しの枠を食い潰さない。
+    - 429 を受けるとレートを半減し、`cooldown` の間は新規呼び出しを止める。
+      成功のたびにレートを少しずつ元に戻す。
+    - リトライ可能なエラーの連続失敗が `failure_threshold` に達するとサーキットを開き、
+      `open_seconds` 経過後に1件だけ試験的に通す（half-open）。
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 2.0,
+        burst: int = 5,
+        background_reserve: float = 2.0,
+        min_rate_per_second: float = 0.1,
+        rate_increase_step: float = 0.05,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        base_backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0,
+    ):
+        self._max_rate = rate_per_second
+        self._rate = rate_per_second
+        self._min_rate = min_rate_per_second
+        self._rate_increase_step = rate_increase_step
+        self._burst = float(burst)
+        self._background_reserve = background_reserve
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._cooldown_until = 0.0
+
+        self._failure_threshold = failure_threshold
+        self._open_seconds = open_seconds
+        self._consecutive_failures = 0
+        self._circuit_state = "closed"  # closed, open, half_open
+        self._opened_at: Optional[float] = None
+        self._half_open_probe_in_flight = False
+        self._probe_started_at = 0.0
+
+        self._base_backoff = base_backoff_seconds
+        self._max_backoff = max_backoff_seconds
+
+        self._lock = threading.Lock()
+        self._counters = {
+            "acquired_interactive": 0,
+            "acquired_background": 0,
+            "rejected_open_circuit": 0,
+            "successes": 0,
+            "failures": 0,
+            "client_errors": 0,
+            "rate_limited": 0,
+        }
+        self._waiting = {Priority.INTERACTIVE: 0, Priority.BACKGROUND: 0}
+
+    # ------------------------------------------------------------------
+    # Token bucket
+    # ------------------------------------------------------------------
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+
+    def _try_acquire(self, priority: str) -> float:
+        """トークン取得を試み、取得できたら 0、できなければ待つべき秒数を返す。"""
+        with self._lock:
+            now = time.monotonic()
+
+            if self._circuit_state == "open":
+                if now - (self._opened_at or now) >= self._open_seconds:
+                    self._circuit_state = "half_open"
+                    logger.info("Gemini circuit HALF-OPEN. Allowing a probe call.")
+                else:
+                    self._counters["rejected_open_circuit"] += 1
+                    raise CircuitOpenError("Gemini circuit breaker is open. Try again later.")
+            if self._circuit_state == "half_open":
+                # 結果が報告されないまま放置された試験呼び出しは無効とみなす
+                if self._half_open_probe_in_flight and now - self._probe_started_at < self._open_seconds:
+                    return 0.5
+                self._half_open_probe_in_flight = True
+                self._probe_started_at = now
+                self._counters[f"acquired_{priority}"] += 1
+                return 0.0
+
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+
+            self._refill(now)
+            required = 1.0 + (self._background_reserve if priority == Priority.BACKGROUND else 0.0)
+            # インタラクティブ待ちがいる間はバックグラウンドに譲らない
+            if priority == Priority.BACKGROUND and self._waiting[Priority.INTERACTIVE] > 0:
+                return max(0.05, 1.0 / self._rate)
+            if self._tokens >= required:
+                self._tokens -= 1.0
+                self._counters[f"acquired_{priority}"] += 1
+                return 0.0
+            return max(0.01, (required - self._tokens) / self._rate)
+
+    def _update_waiting(self, priority: str, delta: int):
+        with self._lock:
+            self._waiting[priority] += delta
+            waiting = self._waiting[priority]
+        GEMINI_WAITING.set(waiting, priority=priority)
+
+    def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """トークンを取得するまでブロックする（同期版）。"""
+        priority = priority or get_current_priority()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._update_waiting(priority, 1)
+        try:
+            while True:
+                wait = self._try_acquire(priority)
+                if wait <= 0:
+                    return
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise TimeoutError(f"Timed out waiting for Gemini rate limiter ({priority}).")
+                time.sleep(wait)
+        finally:
+            self._update_waiting(priority, -1)
+
+    async def acquire_async(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """トークンを取得するまで待機する（非同期版）。"""
+        priority = priority or get_current_priority()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._update_waiting(priority, 1)
+        try:
+            while True:
+                wait = self._try_acquire(priority)
+                if wait <= 0:
+                    return
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise TimeoutError(f"Timed out waiting for Gemini rate limiter ({priority}).")
+                await asyncio.sleep(wait)
+        finally:
+            self._update_waiting(priority, -1)
+
+    # ------------------------------------------------------------------
+    # Outcome feedback
+    # ------------------------------------------------------------------
+    def record_success(self):
+        with self._lock:
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            self._half_open_probe_in_flight = False
+            if self._circuit_state != "closed":
+                logger.info("Gemini circuit CLOSED.")
+            self._circuit_state = "closed"
+            self._rate = min(self._max_rate, self._rate + self._rate_increase_step)
+
+    def record_failure(self, error: Exception):
+        """失敗を記録する。サーキットの判定に数えるのはリトライ可能なエラー（429・5xx・タイムアウト等）のみ。"""
+        with self._lock:
+            now = time.monotonic()
+            self._half_open_probe_in_flight = False
+            if not is_retryable(error):
+                # 不正なリクエストなど 4xx はサービスの異常ではない。試験呼び出しなら応答があったので閉じる
+                self._counters["client_errors"] += 1
+                if self._circuit_state == "half_open":
+                    logger.info("Gemini circuit CLOSED.")
+                    self._circuit_state = "closed"
+                return
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+
+            if is_resource_exhausted(error):
+                self._counters["rate_limited"] += 1
+                self._rate = max(self._min_rate, self._rate / 2)
+                self._tokens = 0.0
+                self._cooldown_until = max(self._cooldown_until, now + self.backoff_delay(self._consecutive_failures - 1))
+                logger.warning(f"Gemini RESOURCE_EXHAUSTED. Rate reduced to {self._rate:.2f}/s.")
+
+            if self._circuit_state == "half_open" or self._consecutive_failures >= self._failure_threshold:
+                if self._circuit_state != "open":
+                    logger.error(
+                        f"Gemini circuit OPEN after {self._consecutive_failures} consecutive failures."
+                    )
+                self._circuit_state = "open"
+                self._opened_at = now
+
+    def backoff_delay(self, attempt: int) -> float:
+        """attempt 回目（0 始まり）のリトライ前に待つ秒数（フルジッター付き指数バックオフ）。"""
+        delay = min(self._max_backoff, self._base_backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def call(self, fn: Callable[[], T], max_attempts: int = 3, priority: Optional[str] = None) -> T:
+        """fn をリミッター経由で実行し、リトライ可能なエラーはバックオフして再試行する（同期版）。"""
+        last_error: Optional[Exception] = None
+        priority = priority or get_current_priority()
+        for attempt in range(max_attempts):
+            self.acquire(priority)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                GEMINI_CALL_SECONDS.observe(time.monotonic() - started, priority=priority, outcome="error")
+                self.record_failure(e)
+                last_error = e
+                if not is_retryable(e) or attempt + 1 >= max_attempts:
+                    raise
+                GEMINI_RETRIES.inc(priority=priority)
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"Gemini call failed (Attempt {attempt + 1}/{max_attempts}): {e}. Retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            GEMINI_CALL_SECONDS.observe(time.monotonic() - started, priority=priority, outcome="success")
+            self.record_success()
+            return result
+        raise last_error or Exception("Gemini call failed.")
+
+    def get_status(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "circuit_state": self._circuit_state,
+                "rate_per_second": round(self._rate, 3),
+                "max_rate_per_second": self._max_rate,
+                "tokens": round(self._tokens, 2),
+                "consecutive_failures": self._consecutive_failures,
+                "cooldown_remaining_seconds": max(0.0, round(self._cooldown_until - time.monotonic(), 2)),
+                "waiting": dict(self._waiting),
+                **self._counters,
+            }
+
+
+# グローバルシングルトンインスタンス
+_gemini_limiter: Optional[GeminiRateLimiter] = None
+
+
+def get_gemini_limiter() -> GeminiRateLimiter:
+    """GeminiRateLimiter のシングルトンインスタンスを取得する。"""
+    global _gemini_limiter
+    if _gemini_limiter is None:
+        settings = get_coco_settings()
+        _gemini_limiter = GeminiRateLimiter(
+            rate_per_second=settings.GEMINI_RATE_PER_SECOND,
+            burst=settings.GEMINI_BURST,
+            failure_threshold=settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+            open_seconds=settings.GEMINI_CIRCUIT_OPEN_SECONDS,
+        )
+    return _gemini_limiter
@@ -0,0 +1,212 @@
+"""
+GenAI Record/Replay バックエンド: Vertex AI への実リクエストとレスポンスを
+フィクスチャファイルに記録し、後からネットワークなしで再生する。
+detect_objects・エージェント・監視スイープのベンチマークやプロファイリングを
+決定的に行うためのもので、再生時にはレイテンシとエラー率を注入できる。
+
+COCO_GENAI_BACKEND:
+    live   - 通常どおり Vertex AI / AI Studio を呼ぶ（デフォルト）
+    record - 実際に呼び出し、リクエスト/レスポンスを記録する
+    replay - 記録済みフィクスチャのみで応答する（ネットワーク不要）
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from app.coco_settings import get_coco_settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LIVE = "live"
+BACKEND_RECORD = "record"
+BACKEND_REPLAY = "replay"
+
+# フィクスチャのキーに含めない（実行ごとに変わる）フィールド
+_VOLATILE_KEYS = {"id", "thought_signature", "cached_content", "http_options"}
+
+
+class FixtureNotFoundError(KeyError):
+    """再生モードで該当リクエストのフィクスチャが存在しない場合に送出される。"""
+
+
+class InjectedError(Exception):
+    """再生モードで注入されたエラー。code で 429 / 503 を表す。"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in _VOLATILE_KEYS and v is not None}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    return value
+
+
+def request_key(kind: str, payload: Dict[str, Any]) -> str:
+    """リクエスト内容を正規化してフィクスチャキー（SHA-256）を返す。"""
+    normalized = _strip_volatile(_to_jsonable(payload))
+    blob = json.dumps({"kind": kind, "request": normalized}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """フィクスチャを `<dir>/<kind>/<key>.json` として保存・読み込みする。"""
+
+    def __init__(self, directory: str):
+        self._dir = directory
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return self._dir
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self._dir, kind, f"{key}.json")
+
+    def save(self, kind: str, key: str, request: Dict[str, Any], responses: List[Dict[str, Any]]):
+        path = self._path(kind, key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"request": _strip_volatile(_to_jsonable(request)), "responses": responses},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                    default=str,
+                )
+        logger.info(f"[Record] Saved fixture {kind}/{key[:12]}")
+
+    def load(self, kind: str, key: str) -> List[Dict[str, Any]]:
+        path = self._path(kind, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["responses"]
+        except FileNotFoundError as e:
+            raise FixtureNotFoundError(f"No recorded fixture for {kind}/{key} in {self._dir}") from e
+
+
+class ReplayFaults:
+    """再生時のレイテンシとエラーの注入設定（乱数シード固定で決定的）。"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def maybe_error(self) -> Optional[InjectedError]:
+        with self._lock:
+            if self.error_rate <= 0 or self._rng.random() >= self.error_rate:
+                return None
+            if self._rng.random() < 0.5:
+                return InjectedError(429, "RESOURCE_EXHAUSTED (injected)")
+            return InjectedError(503, "UNAVAILABLE (injected)")
+
+
+class _RecordReplayModels:
+    def __init__(self, owner: "RecordReplayClient"):
+        self._owner = owner
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None):
+        from google.genai import types
+
+        owner = self._owner
+        request = {"model": model, "contents": contents, "config": config}
+        key = request_key("generate_content", request)
+
+        if owner.mode == BACKEND_REPLAY:
+            time.sleep(owner.faults.next_delay())
+            error = owner.faults.maybe_error()
+            if error:
+                raise error
+            responses = owner.store.load("generate_content", key)
+            return types.GenerateContentResponse.model_validate(responses[0])
+
+        response = owner.real_client.models.generate_content(model=model, contents=contents, config=config)
+        owner.store.save("generate_content", key, request, [_to_jsonable(response)])
+        return response
+
+
+class RecordReplayClient:
+    """google.genai.Client の代替。models.generate_content を記録・再生する。
+
+    Context Cache は live 以外では使わない（get_agent_context_cache_config が None を返す）ため、caches は持たない。
+    """
+
+    def __init__(self, mode: str, store: FixtureStore, faults: ReplayFaults, real_client: Any = None):
+        if mode == BACKEND_RECORD and real_client is None:
+            raise ValueError("Record mode requires a real GenAI client.")
+        self.mode = mode
+        self.store = store
+        self.faults = faults
+        self.real_client = real_client
+        self.models = _RecordReplayModels(self)
+
+
+def get_genai_backend() -> str:
+    """設定された GenAI バックエンド（live / record / replay）を返す。"""
+    backend = (get_coco_settings().COCO_GENAI_BACKEND or BACKEND_LIVE).lower()
+    if backend not in (BACKEND_LIVE, BACKEND_RECORD, BACKEND_REPLAY):
+        logger.warning(f"Unknown COCO_GENAI_BACKEND '{backend}'. Falling back to live.")
+        return BACKEND_LIVE
+    return backend
+
+
+# グローバルシングルトンインスタンス
+_fixture_store: Optional[FixtureStore] = None
+_replay_faults: Optional[ReplayFaults] = None
+
+
+def get_fixture_store() -> FixtureStore:
+    global _fixture_store
+    if _fixture_store is None:
+        _fixture_store = FixtureStore(get_coco_settings().COCO_GENAI_FIXTURE_DIR)
+    return _fixture_store
+
+
+def get_replay_faults() -> ReplayFaults:
+    global _replay_faults
+    if _replay_faults is None:
+        settings = get_coco_settings()
+        _replay_faults = ReplayFaults(
+            latency_ms=settings.COCO_REPLAY_LATENCY_MS,
+            jitter_ms=settings.COCO_REPLAY_JITTER_MS,
+            error_rate=settings.COCO_REPLAY_ERROR_RATE,
+            seed=settings.COCO_REPLAY_SEED,
+        )
+    return _replay_faults
+
+
+def wrap_genai_client(real_client: Any) -> Any:
+    """バックエンド設定に応じて GenAI クライアントを Record/Replay 用に包む。"""
+    backend = get_genai_backend()
+    if backend == BACKEND_LIVE:
+        return real_client
+    logger.info(f"GenAI client running in {backend.upper()} mode (fixtures: {get_fixture_store().directory})")
+    return RecordReplayClient(backend, get_fixture_store(), get_replay_faults(), real_client=real_client)
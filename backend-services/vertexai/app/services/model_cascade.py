@@ -0,0 +1,162 @@
+"""
+ModelCascade: 安価・高速なモデルから順に呼び出し、結果が不十分な場合のみ上位モデルへ
+エスカレーションするためのサービス。
+汎用の監視スキャンは最下位ティアのみで処理し、ターゲット探索は「未発見」または
+「信頼度がしきい値未満」の場合に次のティアへ進む。
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from app.coco_settings import get_coco_settings
+
+logger = logging.getLogger(__name__)
+
+# DETECT_MODEL_TIERS が空の場合に使うモデル（カスケード導入前の detect_objects と同じ）
+DEFAULT_DETECTION_MODEL = "gemini-2.0-flash"
+
+
+class ModelTier:
+    """カスケードの1段を表す（モデル名と生成パラメータ）。"""
+
+    def __init__(self, name: str, model: str, temperature: float = 0.5):
+        self.name = name
+        self.model = model
+        self.temperature = temperature
+
+    def __repr__(self) -> str:
+        return f"ModelTier(name={self.name!r}, model={self.model!r})"
+
+
+class ModelCascade:
+    """ティア順にモデルを呼び出し、ティアごとのレイテンシとエスカレーション率を記録する。"""
+
+    def __init__(self, tiers: List[ModelTier], escalation_confidence: float = 0.6):
+        if not tiers:
+            raise ValueError("ModelCascade requires at least one tier.")
+        self._tiers = tiers
+        self._escalation_confidence = escalation_confidence
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            tier.name: {"calls": 0, "errors": 0, "escalations": 0, "total_latency": 0.0}
+            for tier in tiers
+        }
+        logger.info(
+            f"ModelCascade initialized (tiers={[t.model for t in tiers]}, escalation_confidence={escalation_confidence})"
+        )
+
+    @property
+    def tiers(self) -> List[ModelTier]:
+        return list(self._tiers)
+
+    @property
+    def escalation_confidence(self) -> float:
+        return self._escalation_confidence
+
+    def is_acceptable(self, result: Dict[str, Any]) -> bool:
+        """ターゲット探索の結果が十分か判定する（発見済みかつ信頼度がしきい値以上）。"""
+        if not result.get("found"):
+            return False
+        confidence = result.get("confidence")
+        if confidence is None:
+            # 信頼度が返らない場合は発見フラグを信用する
+            return True
+        try:
+            return float(confidence) >= self._escalation_confidence
+        except (TypeError, ValueError):
+            return False
+
+    def run(
+        self,
+        call: Callable[[ModelTier], Dict[str, Any]],
+        is_generic: bool,
+    ) -> Tuple[Dict[str, Any], ModelTier]:
+        """カスケードを実行し、採用した結果とティアを返す。
+
+        汎用スキャンは最初に成功したティアの結果をそのまま採用する。
+        ターゲット探索は is_acceptable を満たすまで上位ティアへ進み、
+        どのティアも満たさない場合は最後に成功した結果を返す。
+        """
+        last_result: Optional[Dict[str, Any]] = None
+        last_tier: Optional[ModelTier] = None
+        last_error: Optional[Exception] = None
+
+        for index, tier in enumerate(self._tiers):
+            has_next = index + 1 < len(self._tiers)
+            start = time.monotonic()
+            try:
+                result = call(tier)
+            except Exception as e:
+                self._record(tier, time.monotonic() - start, error=True, escalated=has_next)
+                logger.warning(f"Cascade tier '{tier.name}' ({tier.model}) failed: {e}")
+                last_error = e
+                continue
+
+            accepted = is_generic or self.is_acceptable(result)
+            self._record(tier, time.monotonic() - start, escalated=not accepted and has_next)
+            last_result, last_tier = result, tier
+            if accepted:
+                return result, tier
+            if has_next:
+                logger.info(
+                    f"Escalating from tier '{tier.name}' (found={result.get('found')}, confidence={result.get('confidence')})"
+                )
+
+        if last_result is not None and last_tier is not None:
+            return last_result, last_tier
+        raise last_error or Exception("All cascade tiers failed.")
+
+    def _record(self, tier: ModelTier, latency: float, error: bool = False, escalated: bool = False):
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["calls"] += 1
+            stats["total_latency"] += latency
+            if error:
+                stats["errors"] += 1
+            if escalated:
+                stats["escalations"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ティアごとの呼び出し回数・平均レイテンシ・エスカレーション率を返す。"""
+        with self._lock:
+            result = {}
+            for tier in self._tiers:
+                stats = self._stats[tier.name]
+                calls = stats["calls"]
+                result[tier.name] = {
+                    "model": tier.model,
+                    "calls": int(calls),
+                    "errors": int(stats["errors"]),
+                    "escalations": int(stats["escalations"]),
+                    "avg_latency_seconds": (stats["total_latency"] / calls) if calls else 0.0,
+                    "escalation_rate": (stats["escalations"] / calls) if calls else 0.0,
+                }
+            return result
+
+
+def _parse_tiers(spec: str, temperature: float) -> List[ModelTier]:
+    """"model-a,model-b" 形式の設定文字列をティアのリストに変換する。"""
+    models = [m.strip() for m in spec.split(",") if m.strip()]
+    return [ModelTier(name=f"tier{i}", model=m, temperature=temperature) for i, m in enumerate(models)]
+
+
+# グローバルシングルトンインスタンス
+_detection_cascade: Optional[ModelCascade] = None
+
+
+def get_detection_cascade() -> ModelCascade:
+    """detect_objects 用の ModelCascade のシングルトンインスタンスを取得する。"""
+    global _detection_cascade
+    if _detection_cascade is None:
+        settings = get_coco_settings()
+        tiers = _parse_tiers(settings.DETECT_MODEL_TIERS, settings.DETECT_TEMPERATURE)
+        if not tiers:
+            logger.warning(f"DETECT_MODEL_TIERS is empty. Falling back to a single tier ({DEFAULT_DETECTION_MODEL}).")
+            tiers = _parse_tiers(DEFAULT_DETECTION_MODEL, settings.DETECT_TEMPERATURE)
+        _detection_cascade = ModelCascade(
+            tiers=tiers,
+            escalation_confidence=settings.DETECT_ESCALATION_CONFIDENCE,
+        )
+    return _detection_cascade
@@ -0,0 +1,274 @@
+"""
+MonitorLease: 複数レプリカで動く Monitor Agent の間で、一時停止状態とスイープのリーダー権を
+Firestore のリース（TTL 付き）として共有するサービス。
+
+- リーダー選出: 期限切れのリースをトランザクションで取得したレプリカだけがスイープを行う。
+  リーダーは TTL の 1/3 ごとにリースを更新する。
+- フェンシングトークン: リースを取得するたびに単調増加する番号。
+  チェックポイントなどの書き込みに添え、古いリーダーの遅れた書き込みを拒否させる。
+- 一時停止状態: どのレプリカで /api/suspend を受けても全レプリカに反映される。
+
+Firestore が使えない場合はプロセス内メモリに保持する（単一プロセスでの動作・テスト用）。
+FIRESTORE_EMULATOR_HOST を設定すると Firestore エミュレータに対して動作する。
+"""
+
+from typing import Any, Callable, Dict, Optional
+import copy
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from google.cloud import firestore
+
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_WRITE_SECONDS = get_metrics_registry().histogram(
+    "coco_firestore_write_seconds", "Latency of Firestore writes.", ["collection"],
+)
+
+
+def default_replica_id() -> str:
+    """このプロセスを識別するレプリカ ID（Cloud Run のリビジョン名 + ホスト名 + 乱数）。"""
+    revision = os.environ.get("K_REVISION", "local")
+    return f"{revision}/{socket.gethostname()}/{os.getpid()}/{uuid.uuid4().hex[:6]}"
+
+
+def _take_leadership(state: Dict[str, Any], holder: str, ttl_seconds: float, now: float) -> Optional[int]:
+    """state["leader"] を更新してリースを取得・更新する。取得できなければ None。"""
+    leader = state.get("leader") or {}
+    token = int(leader.get("token") or 0)
+    active = float(leader.get("expires_at") or 0) > now
+    if active and leader.get("holder") == holder:
+        leader["expires_at"] = now + ttl_seconds
+        state["leader"] = leader
+        return token
+    if active:
+        return None
+    token += 1
+    state["leader"] = {"holder": holder, "token": token, "acquired_at": now, "expires_at": now + ttl_seconds}
+    return token
+
+
+class LeaseStore:
+    """デバイスごとのリース文書（monitoring_leases/{device_id}）を読み書きする。"""
+
+    def __init__(
+        self,
+        db_getter: Optional[Callable[[], Any]] = None,
+        collection: str = "monitoring_leases",
+        clock: Callable[[], float] = time.time,
+    ):
+        self._db_getter = db_getter
+        self._collection = collection
+        self._clock = clock
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _db(self):
+        return self._db_getter() if self._db_getter else None
+
+    def _doc_ref(self, device_id: str):
+        db = self._db()
+        if db is None:
+            return None
+        return db.collection(self._collection).document(device_id)
+
+    def _update(self, device_id: str, mutate: Callable[[Dict[str, Any]], Any]) -> Any:
+        """文書をトランザクション内で読み、mutate(state) で変更して書き戻す。mutate の戻り値を返す。"""
+        db = self._db()
+        if db is None:
+            with self._lock:
+                state = self._memory.setdefault(device_id, {})
+                return mutate(state)
+
+        doc_ref = db.collection(self._collection).document(device_id)
+
+        @firestore.transactional
+        def _transaction(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            state = snapshot.to_dict() if snapshot.exists else {}
+            result = mutate(state)
+            transaction.set(doc_ref, state)
+            return result
+
+        with FIRESTORE_WRITE_SECONDS.time(collection=self._collection):
+            return _transaction(db.transaction())
+
+    def read(self, device_id: str) -> Dict[str, Any]:
+        doc_ref = self._doc_ref(device_id)
+        if doc_ref is None:
+            with self._lock:
+                return copy.deepcopy(self._memory.get(device_id, {}))
+        snapshot = doc_ref.get()
+        return snapshot.to_dict() if snapshot.exists else {}
+
+    def acquire(self, device_id: str, holder: str, ttl_seconds: float) -> Optional[int]:
+        """リースを取得（保持中なら更新）し、フェンシングトークンを返す。他者が保持中なら None。"""
+        now = self._clock()
+        return self._update(device_id, lambda state: _take_leadership(state, holder, ttl_seconds, now))
+
+    def release(self, device_id: str, holder: str, token: int):
+        """保持しているリースを手放す（他者に移っていれば何もしない）。"""
+        def _release(state):
+            leader = state.get("leader") or {}
+            if leader.get("holder") == holder and leader.get("token") == token:
+                leader["expires_at"] = 0.0
+                state["leader"] = leader
+        self._update(device_id, _release)
+
+    def set_suspend(self, device_id: str, reason: str, duration: Optional[float]):
+        now = self._clock()
+
+        def _suspend(state):
+            state["suspend"] = {
+                "reason": reason,
+                "suspended_at": now,
+                "until": now + duration if duration else None,
+            }
+        self._update(device_id, _suspend)
+
+    def clear_suspend(self, device_id: str):
+        self._update(device_id, lambda state: state.pop("suspend", None))
+
+    def touch_activity(self, device_id: str, timestamp: float):
+        def _touch(state):
+            state["last_activity"] = max(float(state.get("last_activity") or 0), timestamp)
+        self._update(device_id, _touch)
+
+
+class MonitorLease:
+    """1 デバイス分のリースをこのレプリカの視点で扱う。
+
+    Firestore へのアクセスは同期的なので、非同期コードからは asyncio.to_thread 経由で呼ぶ。
+    """
+
+    def __init__(
+        self,
+        store: LeaseStore,
+        device_id: str,
+        replica_id: Optional[str] = None,
+        ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._store = store
+        self.device_id = device_id
+        self.replica_id = replica_id or default_replica_id()
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._token: Optional[int] = None
+        self._expires_at = 0.0
+        self._state: Dict[str, Any] = {}
+        self._last_sync = 0.0
+        self._last_activity_published = 0.0
+
+    @property
+    def poll_interval(self) -> float:
+        """リース更新・状態同期の間隔（TTL の 1/3）。"""
+        return self._ttl / 3
+
+    @property
+    def token(self) -> Optional[int]:
+        """保持中のフェンシングトークン（リーダーでなければ None）。"""
+        return self._token if self.is_leader() else None
+
+    def is_leader(self) -> bool:
+        return self._token is not None and self._expires_at > self._clock()
+
+    def ensure_leader(self) -> bool:
+        """リーダー権を取得・更新する。取得できなければ False。"""
+        now = self._clock()
+        try:
+            token = self._store.acquire(self.device_id, self.replica_id, self._ttl)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Lease renewal failed: {e}")
+            return self.is_leader()
+        if token is None:
+            if self._token is not None:
+                logger.info(f"[{self.device_id}] Lost sweep leadership (replica {self.replica_id}).")
+            self._token = None
+            return False
+        if token != self._token:
+            logger.info(f"[{self.device_id}] Acquired sweep leadership (token {token}, replica {self.replica_id}).")
+        self._token = token
+        self._expires_at = now + self._ttl
+        return True
+
+    def release(self):
+        if self._token is None:
+            return
+        try:
+            self._store.release(self.device_id, self.replica_id, self._token)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Failed to release lease: {e}")
+        self._token = None
+        self._expires_at = 0.0
+
+    def sync(self, force: bool = False) -> Dict[str, Any]:
+        """poll_interval ごとにリーダー権を更新し、共有状態（一時停止・アクティビティ）を読み直す。"""
+        now = self._clock()
+        if not force and now - self._last_sync < self.poll_interval:
+            return self._state
+        self._last_sync = now
+        self.ensure_leader()
+        try:
+            self._state = self._store.read(self.device_id)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Failed to read lease state: {e}")
+        return self._state
+
+    def remote_suspend(self) -> Optional[Dict[str, Any]]:
+        """共有されている一時停止状態（期限切れなら None）。"""
+        suspend = self._state.get("suspend")
+        if not suspend:
+            return None
+        until = suspend.get("until")
+        if until is not None and float(until) <= self._clock():
+            return None
+        return suspend
+
+    def remote_activity(self) -> float:
+        return float(self._state.get("last_activity") or 0)
+
+    def publish_suspend(self, reason: str, duration: Optional[float]) -> bool:
+        try:
+            self._store.set_suspend(self.device_id, reason, duration)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Failed to share suspend state: {e}")
+            return False
+        self._last_sync = 0.0
+        return True
+
+    def publish_resume(self) -> bool:
+        try:
+            self._store.clear_suspend(self.device_id)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Failed to share resume: {e}")
+            return False
+        self._last_sync = 0.0
+        return True
+
+    def publish_activity(self, timestamp: float):
+        """ユーザー操作の時刻を共有する（poll_interval ごとに最大 1 回）。"""
+        if timestamp - self._last_activity_published < self.poll_interval:
+            return
+        self._last_activity_published = timestamp
+        try:
+            self._store.touch_activity(self.device_id, timestamp)
+        except Exception as e:
+            logger.warning(f"[{self.device_id}] Failed to share activity: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        leader = self._state.get("leader") or {}
+        return {
+            "replica_id": self.replica_id,
+            "is_leader": self.is_leader(),
+            "fencing_token": self.token,
+            "leader": leader.get("holder"),
+            "leader_expires_in_seconds": round(float(leader.get("expires_at") or 0) - self._clock(), 1),
+            "remote_suspend": self.remote_suspend(),
+        }
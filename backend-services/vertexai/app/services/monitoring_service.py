@@ -2,15 +2,73 @@
 """
 MonitoringLoopService: バックグラウンドで定期的にカメラ画像を取得・分析するサービス。
 is_suspended フラグにより、Explorer Agent との排他制御を実現する。
+カメラ（デバイス）ごとに 1 インスタンスを持ち、分析ワーカープールと
+Gemini レートリミッターはプロセス内の全デバイスで共有する。
+複数レプリカで動かす場合は MonitorLease で一時停止状態を共有し、リーダーだけがスイープする。
 """
 
-from typing import Optional, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
 import asyncio
+import functools
 import logging
+import threading
 import time
 
+from app.app_utils import image_diff
+from app.coco_settings import get_coco_settings
+from app.services.analysis_pool import AnalysisWorkerPool
+from app.services.frame_barrier import frame_ref
+from app.services.metrics import get_metrics_registry
+from app.services.motion_planner import MotionPlanner, ServoModel
+from app.services.scan_cadence import sweep_changed
+from app.services.sweep_checkpoint import STATUS_COMPLETED, is_resumable, new_checkpoint
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_DEVICE_ID = "default"
+
+# 実行中のスイープ ID（scan_callback のワーカースレッドにも引き継がれ、scan_session_id として記録される）
+_current_sweep_id: ContextVar[Optional[str]] = ContextVar("sweep_id", default=None)
+
+
+# 実行中のスイープのデバイス ID
+_current_device_id: ContextVar[Optional[str]] = ContextVar("device_id", default=None)
+
+
+def get_current_sweep_id() -> Optional[str]:
+    """スイープの分析ステップ内であれば、そのスイープ ID を返す。"""
+    return _current_sweep_id.get()
+
+
+def get_current_device_id() -> Optional[str]:
+    """スイープの分析ステップ内であれば、そのデバイス ID を返す。"""
+    return _current_device_id.get()
+
+
+_metrics = get_metrics_registry()
+SWEEP_SECONDS = _metrics.histogram(
+    "coco_sweep_duration_seconds", "Duration of idle sweeps.", ["device_id", "outcome"],
+    buckets=(10, 30, 60, 120, 180, 300, 600, 900, 1800, 3600),
+)
+SWEEP_STEP_SECONDS = _metrics.histogram(
+    "coco_sweep_step_seconds", "Latency of each sweep step phase (rotate, settle, analyze).", ["device_id", "phase"],
+)
+SUSPEND_SECONDS = _metrics.histogram(
+    "coco_monitor_suspend_seconds", "How long monitoring stayed suspended.", ["device_id"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+CACHE_REQUESTS = _metrics.counter(
+    "coco_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"],
+)
+
+
+# サーボの可動範囲の既定値（set_motion_planner で ServoModel ごと差し替えられる）
+MIN_ANGLE_DEGREES = 0
+MAX_ANGLE_DEGREES = 180
+
 
 class MonitoringLoopService:
     """定期的な監視ループを管理するサービスクラス。
@@ -27,9 +85,18 @@ class MonitoringLoopService:
         rotation_step_degrees: int = 30,
         rotation_steps: int = 12,
         rotation_settle_time_seconds: int = 15,
-        scan_callback: Optional[Callable[[int], None]] = None,
-        rotate_callback: Optional[Callable[[int], None]] = None
+        max_concurrent_analyses: int = 3,
+        interactive_grace_seconds: float = 5.0,
+        max_pause_seconds: float = 900.0,
+        scan_callback: Optional[Callable[[int, Optional[str]], Any]] = None,
+        rotate_callback: Optional[Callable[[int], Any]] = None,
+        capture_callback: Optional[Callable[[int], Optional[str]]] = None,
+        device_id: str = DEFAULT_DEVICE_ID,
+        analysis_pool: Optional[AnalysisWorkerPool] = None,
     ):
+        self.device_id = device_id
+        # 共有プールが無ければ、このデバイス専用のプールで max_concurrent_analyses に制限する
+        self._analysis_pool = analysis_pool or AnalysisWorkerPool(max_concurrent_analyses)
         self._is_suspended = False
         self._suspended_by: Optional[str] = None
         self._suspended_at: Optional[float] = None
@@ -41,44 +108,390 @@ class MonitoringLoopService:
         self._rotation_step = rotation_step_degrees
         self._rotation_steps = rotation_steps
         self._rotation_settle_time = rotation_settle_time_seconds
+        self._last_sweep_results: Dict[int, Any] = {}
         self._last_activity_time = time.time()
         self._is_scanning = False
         
         # Callbacks for actions
         self._scan_callback = scan_callback
         self._rotate_callback = rotate_callback
+        self._capture_callback = capture_callback
+        # 回転後の安定検出（未設定なら rotation_settle_time の固定待ち）
+        self._settle_detector = None
+        # 回転後に最初に届くフレームの待ち合わせ（安定検出が無いときに固定待ちの代わりに使う）
+        self._frame_barrier = None
+        self._frame_source: Optional[Callable[[], Optional[Dict[str, Any]]]] = None
+        # 履歴に基づく訪問角度の計画（未設定なら全候補角度を訪れる）
+        self._sweep_planner = None
+        # サーボの特性に基づく訪問順の計画（可動範囲外の角度は訪れない）
+        self._motion_planner = MotionPlanner(ServoModel(
+            MIN_ANGLE_DEGREES, MAX_ANGLE_DEGREES, settle_seconds=rotation_settle_time_seconds
+        ))
+        self._position_getter: Optional[Callable[[], Optional[float]]] = None
+        self._last_motion_plan: Optional[Dict[str, Any]] = None
+        # 変化率に応じたアイドル閾値の適応制御（未設定なら idle_threshold 固定）
+        self._scan_cadence = None
+        # 角度ごとの「最後に分析したフレーム」のシグネチャ（縮小グレースケール）。
+        # 新しいフレームが一致すればモデル呼び出しを省き、前回の検出結果を再利用する
+        self._frame_signer: Optional[Callable[[str], Any]] = None
+        self._refresh_callback: Optional[Callable[[int, str, Any], Any]] = None
+        self._signature_tolerance = 0.02
+        self._frame_signatures: Dict[int, Any] = {}
+        self._unchanged_frames_skipped = 0
+
+        # 優先度レーン: インタラクティブな処理（ユーザーのクエリや手動回転）の実行中と
+        # その直後 interactive_grace_seconds の間は、バックグラウンドのスイープを一時停止する
+        self._interactive_lock = threading.Lock()
+        self._interactive_active = 0
+        self._last_interactive_end = 0.0
+        self._interactive_grace = interactive_grace_seconds
+        self._max_pause = max_pause_seconds
+        self._sweep_preemptions = 0
+        # 実行中のスイープが一時停止・リース喪失で打ち切られたか（失敗した角度だけなら False）
+        self._sweep_interrupted = False
+
+        # スイープのチェックポイント（未設定なら中断されたスイープは最初からやり直し）
+        self._checkpoint_store = None
+        self._resume_window = 1800.0
+        self._resume_delay = 60.0
+        # 中断されたスイープを再開できる期限（None なら通常のアイドル閾値で次のスイープを待つ）
+        self._resumable_until: Optional[float] = None
+        self._checkpoint: Optional[Dict[str, Any]] = None
+        self._checkpoint_lock: Optional[asyncio.Lock] = None
+
+        # レプリカ間のリース（未設定なら単一レプリカとして常にスイープする）
+        self._lease = None
+        # 現在の一時停止がリース経由で共有されているか（他レプリカの resume で解除する）
+        self._suspend_shared = False
+        # リースへの読み書き（同期の Firestore トランザクション）を順番に実行する専用スレッド
+        self._lease_executor: Optional[ThreadPoolExecutor] = None
 
         self._loop_task: Optional[asyncio.Task] = None
         self._running = False
+
+        # イベント駆動スケジューラ: 次の期限（アイドル到達・一時停止の期限切れ）まで眠り、
+        # resume() / update_activity() などで即座に起こされる
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_event: Optional[asyncio.Event] = None
+        self._lane_event: Optional[asyncio.Event] = None
         logger.info(
-            f"MonitoringLoopService initialized (interval={scan_interval_seconds}s, idle={idle_threshold_seconds}s)"
+            f"MonitoringLoopService[{device_id}] initialized "
+            f"(interval={scan_interval_seconds}s, idle={idle_threshold_seconds}s)"
         )
 
-    def set_callbacks(self, scan_callback: Callable[[int], None], rotate_callback: Callable[[int], None]):
-        """スキャン（撮影・分析）と回転のアクションを実行するコールバックを設定する。"""
+    def set_callbacks(
+        self,
+        scan_callback: Callable[[int, Optional[str]], Any],
+        rotate_callback: Callable[[int], Any],
+        capture_callback: Optional[Callable[[int], Optional[str]]] = None,
+    ):
+        """スキャン（分析）・回転・撮影のアクションを実行するコールバックを設定する。
+
+        scan_callback(angle, frame) は capture_callback(angle) が返したフレーム参照
+        （画像 URI など）を受け取る。capture_callback が無い場合 frame は None になり、
+        各ステップの分析は次の回転の前に完了を待つ。
+        rotate_callback はコルーチン関数でもよい（同期関数はワーカースレッドで実行する）。
+        rotate_callback が False（または MotionCommandQueue の status="failed"）を返したステップは
+        失敗として飛ばし、次回のスイープで再訪する。status="skipped"（既にその角度）なら安定待ちを省く。
+        """
         self._scan_callback = scan_callback
         self._rotate_callback = rotate_callback
+        self._capture_callback = capture_callback
+        # コールバック未設定で待機中のスケジューラをすぐにスキャンさせる
+        self._wake()
+
+    @property
+    def rotation_settle_seconds(self) -> float:
+        """回転後の安定待ちの上限（秒）。"""
+        return self._rotation_settle_time
+
+    def set_settle_detector(self, settle_detector):
+        """回転後の画角安定を検出する SettleDetector を設定する。
+
+        最大待ち時間は rotation_settle_time で、それを超えた場合は従来どおり
+        固定時間待ったものとして扱う。
+        """
+        self._settle_detector = settle_detector
+
+    def set_frame_barrier(self, frame_barrier, frame_source: Optional[Callable[[], Optional[Dict[str, Any]]]] = None):
+        """回転完了後の最初のフレームを待つ FrameBarrier を設定する。
+
+        SettleDetector が無い場合、回転後は rotation_settle_time の固定待ちではなく
+        このカメラの次のフレームが届くまで（最大 rotation_settle_time）待つ。
+        frame_source（最新フレームを返す関数）があれば、アップロード通知が無くてもポーリングで待てる。
+        """
+        self._frame_barrier = frame_barrier
+        self._frame_source = frame_source
+
+    def set_sweep_planner(self, sweep_planner):
+        """スイープで訪れる角度の順序と取捨を決める SweepPlanner を設定する。"""
+        self._sweep_planner = sweep_planner
+
+    def set_motion_planner(self, motion_planner: MotionPlanner, position_getter: Optional[Callable[[], Optional[float]]] = None):
+        """訪問順を決める MotionPlanner と、現在のサーボ位置（不明なら None）を返す関数を設定する。"""
+        self._motion_planner = motion_planner
+        self._position_getter = position_getter
+
+    @property
+    def motion_planner(self) -> MotionPlanner:
+        return self._motion_planner
+
+    def candidate_angles(self) -> list[int]:
+        """スイープの候補角度（rotation_step 刻み、サーボの可動範囲内のみ）。"""
+        servo = self._motion_planner.servo
+        angles = []
+        for i in range(self._rotation_steps):
+            angle = servo.min_angle + i * self._rotation_step
+            if servo.is_reachable(angle) and angle not in angles:
+                angles.append(angle)
+        return angles
+
+    def _order_angles(self, angles: list[int]) -> list[int]:
+        """現在位置から最短の移動で angles を訪れる順序に並べ替える。"""
+        position = None
+        if self._position_getter is not None:
+            try:
+                position = self._position_getter()
+            except Exception as e:
+                logger.warning(f"Failed to read servo position: {e}")
+        plan = self._motion_planner.plan(angles, start=position)
+        self._last_motion_plan = plan
+        logger.info(
+            f"Motion plan: {plan['order']} from {position} "
+            f"({plan['travel_degrees']:.0f}° travel, ~{plan['estimated_seconds']:.0f}s)"
+        )
+        return plan["order"]
+
+    def set_scan_cadence(self, scan_cadence):
+        """アイドル閾値を適応的に決める ScanCadence を設定する。"""
+        self._scan_cadence = scan_cadence
+        self._wake()
+
+    def set_unchanged_frame_skip(
+        self,
+        frame_signer: Callable[[str], Any],
+        refresh_callback: Callable[[int, str, Any], Any],
+        tolerance: float = 0.02,
+    ):
+        """前回分析時と同じフレームの分析を省略する仕組みを設定する。
+
+        frame_signer(frame) はフレームのシグネチャ（image_diff の縮小画像）を返す。
+        一致した場合は refresh_callback(angle, frame, previous_result) を呼び、
+        前回の検出結果をタイムスタンプだけ更新して再利用する。
+        refresh_callback が None を返した場合は通常どおり分析する。
+        """
+        self._frame_signer = frame_signer
+        self._refresh_callback = refresh_callback
+        self._signature_tolerance = tolerance
+
+    def set_checkpoint_store(
+        self,
+        checkpoint_store,
+        resume_window_seconds: float = 1800.0,
+        resume_delay_seconds: float = 60.0,
+    ):
+        """スイープの進捗を保存する SweepCheckpointStore を設定する。
+
+        中断されたスイープは、最終更新から resume_window_seconds 以内なら
+        次回のスイープで未完了の角度から再開する。再開はアイドル閾値を待たず、
+        最後のアクティビティから resume_delay_seconds 後に行う（再起動後も同様）。
+        """
+        self._checkpoint_store = checkpoint_store
+        self._resume_window = resume_window_seconds
+        self._resume_delay = resume_delay_seconds
+
+    def _schedule_resume(self, checkpoint: Optional[Dict[str, Any]]):
+        """再開できるチェックポイントなら、その鮮度が切れる前に再開するよう期限を前倒しする。"""
+        if is_resumable(checkpoint, time.time(), self._resume_window):
+            self._resumable_until = float(checkpoint.get("updated_at") or 0) + self._resume_window
+        else:
+            self._resumable_until = None
+
+    def set_lease(self, lease):
+        """レプリカ間で一時停止状態とスイープのリーダー権を共有する MonitorLease を設定する。"""
+        self._lease = lease
+        if lease is not None and self._lease_executor is None:
+            # ワーカー 1 つで実行するため、suspend → resume などの書き込み順は入れ替わらない
+            self._lease_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"lease-{self.device_id}")
+
+    def _submit_lease(self, fn: Callable[..., Any], *args) -> Future:
+        """リース操作を専用スレッドに積む。イベントループからも呼べるよう、呼び出し元はブロックしない。"""
+        return self._lease_executor.submit(fn, *args)
+
+    async def _run_lease(self, fn: Callable[..., Any], *args) -> Any:
+        """リース操作を専用スレッドで実行し、先に積まれた書き込みの後に結果を待つ。"""
+        return await asyncio.wrap_future(self._submit_lease(fn, *args))
+
+    def _mark_suspend_shared(self, suspended_at: Optional[float], future: Future):
+        # 共有が終わる前に resume や別の suspend があった場合は反映しない
+        if future.exception() is None and future.result() and self._is_suspended and self._suspended_at == suspended_at:
+            self._suspend_shared = True
+
+    def idle_threshold(self, now: Optional[float] = None) -> float:
+        """現在のアイドル閾値（秒）。"""
+        if self._scan_cadence is not None:
+            return self._scan_cadence.current_interval(now)
+        return self._idle_threshold
 
     def update_activity(self):
-        """アクティビティを更新し、アイドルタイマーをリセットする。"""
+        """ユーザー操作によるアクティビティを記録し、アイドルタイマーをリセットする。"""
+        if self._scan_cadence is not None:
+            self._scan_cadence.record_user_activity()
+        self._reset_idle_timer()
+        if self._lease is not None:
+            self._submit_lease(self._lease.publish_activity, self._last_activity_time)
+
+    def _reset_idle_timer(self):
         self._last_activity_time = time.time()
         logger.debug("Activity updated. Idle timer reset.")
+        self._wake()
 
-    @property
-    def is_suspended(self) -> bool:
-        """現在の一時停止状態を返す。タイムアウトも自動チェックする。"""
+    def _wake(self):
+        """スケジューラと一時停止中のスイープを起こして状態を再確認させる（別スレッドからも呼び出し可）。"""
+        loop = self._event_loop
+        events = [event for event in (self._wake_event, self._lane_event) if event is not None]
+        if loop is None or not events or loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        for event in events:
+            if running_loop is loop:
+                event.set()
+            else:
+                loop.call_soon_threadsafe(event.set)
+
+    @contextmanager
+    def interactive_lane(self, reason: str = "interactive"):
+        """インタラクティブな処理を囲むコンテキストマネージャ（別スレッドからも使用可）。
+
+        ブロック内の処理は待たされない。実行中のスイープは次の区切り
+        （回転の前、安定待ちの途中、分析の開始前）で一時停止し、
+        ブロックを抜けて interactive_grace_seconds 経過後に同じ角度から再開する。
+        """
+        with self._interactive_lock:
+            self._interactive_active += 1
+        if self._is_scanning:
+            logger.info(f"Interactive request '{reason}' preempting background sweep.")
+        self._wake()
+        try:
+            yield
+        finally:
+            with self._interactive_lock:
+                self._interactive_active -= 1
+                self._last_interactive_end = time.time()
+            self._wake()
+
+    def _background_wait_seconds(self, now: Optional[float] = None) -> Optional[float]:
+        """バックグラウンド処理が進めるまでの秒数（0 は今すぐ、None は起こされるまで）。"""
+        now = now or time.time()
+        with self._interactive_lock:
+            if self._interactive_active > 0:
+                return None
+            grace_left = self._last_interactive_end + self._interactive_grace - now
+        self._expire_suspend_if_due(now)
+        if self._is_suspended:
+            if self._suspend_duration and self._suspended_at:
+                return max(0.01, self._suspended_at + self._suspend_duration - now)
+            return None
+        return max(0.0, grace_left)
+
+    async def _wait_for_background_turn(self) -> bool:
+        """バックグラウンドの番が来るまで待つ。停止や max_pause_seconds 超過時は False。"""
+        paused_at = None
+        while self._running:
+            # 一時停止中もリースを更新し、他のレプリカでの resume を取り込む
+            await self._sync_lease()
+            wait = self._background_wait_seconds()
+            if wait == 0:
+                if paused_at is not None:
+                    logger.info(f"Background sweep resumed after {time.monotonic() - paused_at:.1f}s pause.")
+                return True
+            if paused_at is None:
+                paused_at = time.monotonic()
+            elif time.monotonic() - paused_at >= self._max_pause:
+                logger.info(f"Background sweep paused for over {self._max_pause}s. Abandoning it.")
+                return False
+            self._lane_event.clear()
+            # 期限が無い場合も定期的に再確認する（_wake の取りこぼし対策）
+            timeout = 1.0 if wait is None else min(wait, 1.0)
+            try:
+                await asyncio.wait_for(self._lane_event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    async def _run_preemptible(self, coro):
+        """coro を実行し、途中でインタラクティブ処理が割り込んだらキャンセルする。
+
+        Returns:
+            (完了したか, 結果)
+        """
+        task = asyncio.create_task(coro)
+        try:
+            while True:
+                lane_changed = asyncio.create_task(self._lane_event.wait())
+                done, _ = await asyncio.wait({task, lane_changed}, return_when=asyncio.FIRST_COMPLETED)
+                lane_changed.cancel()
+                if task in done:
+                    return True, task.result()
+                self._lane_event.clear()
+                if self._background_wait_seconds() != 0:
+                    return False, None
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    def _expire_suspend_if_due(self, now: Optional[float] = None):
+        """一時停止の期限が過ぎていれば解除する。"""
         if self._is_suspended and self._suspend_duration and self._suspended_at:
-            elapsed = time.time() - self._suspended_at
+            elapsed = (now or time.time()) - self._suspended_at
             if elapsed >= self._suspend_duration:
                 logger.info(
                     f"Suspend duration ({self._suspend_duration}s) expired. Auto-resuming."
                 )
-                self._is_suspended = False
-                self._suspended_by = None
-                self._suspended_at = None
-                self._suspend_duration = None
+                self._clear_suspend(now)
+
+    def _clear_suspend(self, now: Optional[float] = None):
+        """一時停止状態を解除し、停止していた時間を記録する。"""
+        if self._is_suspended and self._suspended_at:
+            elapsed = (now or time.time()) - self._suspended_at
+            if self._suspend_duration:
+                elapsed = min(elapsed, self._suspend_duration)
+            SUSPEND_SECONDS.observe(max(0.0, elapsed), device_id=self.device_id)
+        self._is_suspended = False
+        self._suspended_by = None
+        self._suspended_at = None
+        self._suspend_duration = None
+
+    @property
+    def is_suspended(self) -> bool:
+        """現在の一時停止状態を返す。タイムアウトも自動チェックする。"""
+        self._expire_suspend_if_due()
         return self._is_suspended
 
+    def seconds_until_next_deadline(self, now: Optional[float] = None) -> Optional[float]:
+        """次にスケジューラが動くべき時刻までの秒数を返す（None は「起こされるまで待機」）。"""
+        now = now or time.time()
+        self._expire_suspend_if_due(now)
+        if self._is_suspended:
+            if self._suspend_duration and self._suspended_at:
+                return max(0.0, self._suspended_at + self._suspend_duration - now)
+            return None
+        if self._is_scanning:
+            return None
+        deadline = self._last_activity_time + self.idle_threshold(now)
+        if self._resumable_until is not None:
+            resume_at = self._last_activity_time + self._resume_delay
+            if resume_at < self._resumable_until:
+                deadline = min(deadline, resume_at)
+        return max(0.0, deadline - now)
+
     def suspend(self, reason: str = "explorer_request", duration: int = 300) -> dict:
         """監視ループを一時停止する。"""
         self._is_suspended = True
@@ -88,6 +501,13 @@ class MonitoringLoopService:
         logger.info(
             f"Monitoring SUSPENDED by '{reason}' for {duration}s"
         )
+        if self._lease is not None:
+            self._suspend_shared = False
+            suspended_at = self._suspended_at
+            self._submit_lease(self._lease.publish_suspend, reason, duration).add_done_callback(
+                functools.partial(self._mark_suspend_shared, suspended_at)
+            )
+        self._wake()
         return {
             "status": "suspended",
             "reason": reason,
@@ -98,11 +518,11 @@ class MonitoringLoopService:
     def resume(self) -> dict:
         """監視ループを再開する。"""
         was_suspended = self._is_suspended
-        self._is_suspended = False
         suspended_by = self._suspended_by
-        self._suspended_by = None
-        self._suspended_at = None
-        self._suspend_duration = None
+        self._clear_suspend()
+        if self._lease is not None:
+            self._submit_lease(self._lease.publish_resume)
+            self._suspend_shared = False
         
         # Resume時にアクティビティも更新して即座にスキャンが走らないようにする
         self.update_activity()
@@ -125,12 +545,27 @@ class MonitoringLoopService:
     def get_status(self) -> dict:
         """現在の監視ステータスを返す。"""
         return {
+            "device_id": self.device_id,
             "is_suspended": self.is_suspended,
             "suspended_by": self._suspended_by,
             "scan_interval_seconds": self._scan_interval,
             "loop_running": self._running,
-            "idle_threshold": self._idle_threshold,
-            "seconds_since_activity": time.time() - self._last_activity_time
+            "idle_threshold": self.idle_threshold(),
+            "scan_cadence": self._scan_cadence.get_status() if self._scan_cadence else None,
+            "seconds_since_activity": time.time() - self._last_activity_time,
+            "next_wake_in_seconds": self.seconds_until_next_deadline(),
+            "unchanged_frames_skipped": self._unchanged_frames_skipped,
+            "interactive_active": self._interactive_active,
+            "sweep_preemptions": self._sweep_preemptions,
+            "sweep_id": self._checkpoint["sweep_id"] if self._checkpoint else None,
+            "sweep_progress": (
+                f"{len(self._checkpoint['completed'])}/{len(self._checkpoint['angles'])}"
+                if self._checkpoint else None
+            ),
+            "sweep_resume_pending": self._resumable_until is not None,
+            "last_sweep_plan": self._sweep_planner.get_last_plan() if self._sweep_planner else None,
+            "last_motion_plan": self._last_motion_plan,
+            "lease": self._lease.get_status() if self._lease else None,
         }
 
     async def start(self):
@@ -138,96 +573,440 @@ class MonitoringLoopService:
         if self._running:
             return
         self._running = True
+        self._event_loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._lane_event = asyncio.Event()
         self._loop_task = asyncio.create_task(self._run_loop())
         logger.info("Monitoring loop started.")
 
     async def stop(self):
         """監視ループを停止する。"""
         self._running = False
+        self._wake()
         if self._loop_task:
             self._loop_task.cancel()
             try:
                 await self._loop_task
             except asyncio.CancelledError:
                 pass
+        if self._lease is not None:
+            # 次のリーダーが TTL 切れを待たずに引き継げるようにする
+            await self._run_lease(self._lease.release)
         logger.info("Monitoring loop stopped.")
 
+    async def _wait_for_wake(self, timeout: Optional[float]):
+        """タイムアウトするか _wake() されるまで待機する。"""
+        if self._wake_event is None:
+            # start() を経ずに呼ばれた場合（テストなど）は起こされることがない
+            await asyncio.sleep(timeout or 0)
+            return
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
     async def _run_loop(self):
-        """メイン監視ループ。"""
+        """メイン監視ループ（期限ベースのイベント駆動スケジューラ）。"""
         logger.info("Monitoring loop running...")
+        if self._checkpoint_store is not None:
+            # 再起動前に中断されたスイープは、アイドル閾値を待たずに再開する
+            try:
+                self._schedule_resume(await asyncio.to_thread(self._checkpoint_store.load))
+            except Exception as e:
+                logger.warning(f"Failed to load sweep checkpoint: {e}")
         while self._running:
+            # 状態を確認する前にクリアし、確認中の _wake() を取りこぼさない
+            self._wake_event.clear()
             try:
-                if not self.is_suspended and not self._is_scanning:
-                    # Check for idle
-                    idle_time = time.time() - self._last_activity_time
-                    if idle_time >= self._idle_threshold:
-                        logger.info(f"Idle threshold ({self._idle_threshold}s) reached. Starting periodic scan.")
+                await self._sync_lease()
+                delay = self.seconds_until_next_deadline()
+                if delay is not None and delay <= 0 and not self._is_suspended:
+                    if self._lease is None or self._lease.is_leader():
+                        logger.info(f"Idle threshold ({self.idle_threshold():.0f}s) reached. Starting periodic scan.")
                         await self._perform_periodic_scan()
-                
-                await asyncio.sleep(self._scan_interval)
+                        continue
+                    # 他のレプリカがリーダーとしてスイープする。リースが切れたら引き継ぐ
+                    delay = None
+                if self._lease is not None:
+                    # リースの更新と共有状態の確認のため、poll_interval ごとに起きる
+                    delay = self._lease.poll_interval if delay is None else min(delay, self._lease.poll_interval)
+
+                logger.debug(f"Scheduler sleeping (next deadline in {delay}s)")
+                await self._wait_for_wake(delay)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
+                # 異常時は scan_interval だけ間隔を空けて再試行する
                 await asyncio.sleep(self._scan_interval)
 
+    async def _sync_lease(self):
+        """リースを更新し、他のレプリカが共有した一時停止状態とアクティビティを取り込む。"""
+        if self._lease is None:
+            return
+        try:
+            # 自分の未送信の書き込み（resume など）を読み戻さないよう、同じスレッドで順番に実行する
+            await self._run_lease(self._lease.sync)
+        except Exception as e:
+            logger.warning(f"Lease sync failed: {e}")
+            return
+
+        remote = self._lease.remote_suspend()
+        if remote:
+            suspended_at = float(remote.get("suspended_at") or time.time())
+            if not self._is_suspended or suspended_at > (self._suspended_at or 0):
+                until = remote.get("until")
+                self._is_suspended = True
+                self._suspended_by = remote.get("reason")
+                self._suspended_at = suspended_at
+                self._suspend_duration = float(until) - suspended_at if until is not None else None
+                self._suspend_shared = True
+                logger.info(f"Monitoring SUSPENDED by '{self._suspended_by}' (shared by another replica)")
+                self._wake()
+        elif self._is_suspended and self._suspend_shared:
+            logger.info(f"Monitoring RESUMED (shared by another replica, was suspended by '{self._suspended_by}')")
+            self._clear_suspend()
+            self._suspend_shared = False
+            self._wake()
+
+        # 他のレプリカでのユーザー操作やスイープもアイドルタイマーに反映する
+        remote_activity = self._lease.remote_activity()
+        if remote_activity > self._last_activity_time:
+            self._last_activity_time = remote_activity
+
+    async def _hold_leadership(self) -> bool:
+        """スイープを続けてよいか（リースを更新できたか）を返す。"""
+        if self._lease is None:
+            return True
+        return await self._run_lease(self._lease.ensure_leader)
+
     async def _perform_periodic_scan(self):
-        """全方位スキャンを実行する。"""
+        """全方位スキャンを実行する。
+
+        パイプライン化: ステップ i の撮影（capture）が終わった時点で分析を
+        バックグラウンドタスクとして開始し、その間にモーターはステップ i+1 へ移動する。
+        分析の同時実行数はワーカープール（共有または max_concurrent_analyses）で制限し、最後にまとめて待ち合わせる。
+        """
         if not self._scan_callback or not self._rotate_callback:
             logger.warning("Callbacks not set. Skipping scan.")
+            # 期限を先送りしないと _run_loop が await せずに回り続け、イベントループを占有する
+            self._reset_idle_timer()
+            await self._wait_for_wake(self._scan_interval)
             return
 
+        if self._lane_event is None:
+            # start() を経ずに直接呼ばれた場合（テストなど）
+            self._event_loop = asyncio.get_running_loop()
+            self._lane_event = asyncio.Event()
+
         self._is_scanning = True
-        # Suspend monitoring during scan to prevent interference? 
-        # Actually we are the monitoring loop, so we just block other logic.
-        
+        sweep_start = time.monotonic()
+        outcome = "interrupted"
+        swept = False
+        self._sweep_interrupted = False
+        pending: list[asyncio.Task] = []
+        sweep_token = None
+        device_token = None
+
         try:
-            logger.info(f"Starting {self._rotation_steps}-step rotation scan.")
-            for i in range(self._rotation_steps):
-                if not self._running or self.is_suspended:
+            checkpoint = await self._begin_sweep()
+            remaining = [angle for angle in checkpoint["angles"] if angle not in checkpoint["completed"]]
+            angles = self._order_angles(remaining)
+            if len(angles) < len(remaining):
+                # Unreachable angles (e.g. from a checkpoint planned with another servo range) are dropped.
+                checkpoint["angles"] = [a for a in checkpoint["angles"] if a in angles or a in checkpoint["completed"]]
+            restored = {int(angle): result for angle, result in checkpoint["results"].items()}
+            sweep_token = _current_sweep_id.set(checkpoint["sweep_id"])
+            device_token = _current_device_id.set(self.device_id)
+            logger.info(f"Starting {len(angles)}-step rotation scan ({checkpoint['sweep_id']}).")
+            i = 0
+            while i < len(angles):
+                angle = angles[i]
+                # A replica that lost its lease stops; the new leader resumes from the checkpoint.
+                if not await self._hold_leadership():
+                    logger.info("Sweep leadership lost. Leaving the sweep to the new leader.")
+                    self._sweep_interrupted = True
+                    break
+                # Interactive work and suspension pause the sweep; it resumes at the same angle.
+                if not await self._wait_for_background_turn():
                      logger.info("Scan interrupted.")
+                     self._sweep_interrupted = True
                      break
-                
-                # Rotate
-                angle = i * self._rotation_step
-                logger.info(f"Scan step {i+1}/{self._rotation_steps}: Rotating to {angle}")
-                self._rotate_callback(angle)
-                
-                # Wait for rotation to settle (arbitrary small delay)
-                await asyncio.sleep(self._rotation_settle_time)
-                
-                # Scan/Analyze
-                logger.info(f"Scan step {i+1}: Analyzing...")
-                # We assume scan_callback handles the async nature or is fast enough
-                # If it's blocking detection, we might want to run in executor, but let's keep simple.
-                # Since callbacks might be sync, we wrap if needed, but for now direct call.
-                # Actually detect_objects in monitor.py is sync (detect_objects -> Agent model call).
-                # But we want to call the logic, not the tool string.
-                # The callback should be `detect_objects` directly.
-                
-                # Check if callback is async pattern? The provided tools define sync functions.
-                # We will assume sync execution for now or wrap in simple await if needed.
-                try:
-                    await asyncio.to_thread(self._scan_callback, angle) # Pass angle or some context if needed
-                except Exception as e:
-                    logger.error(f"Error during scan Step {i}: {e}")
 
-                await asyncio.sleep(1)
+                logger.info(f"Scan step {i+1}/{len(angles)}: Rotating to {angle}")
+                commanded_at = time.time()
+                with SWEEP_STEP_SECONDS.time(device_id=self.device_id, phase="rotate"):
+                    rotated = await self._rotate(angle)
+                if rotated is False or (isinstance(rotated, dict) and rotated.get("status") == "failed"):
+                    # Left pending in the checkpoint so a resumed sweep retries it.
+                    logger.warning(f"Scan step {i+1}: Rotation to {angle} failed. Skipping this angle.")
+                    i += 1
+                    continue
+
+                # Wait for rotation to settle (interactive requests may take the camera meanwhile)
+                settle_start = time.monotonic()
+                if isinstance(rotated, dict) and rotated.get("status") == "skipped":
+                    # The camera was already at this angle; there is nothing to settle.
+                    completed, settled_frame = True, None
+                else:
+                    completed, settled_frame = await self._run_preemptible(self._wait_for_settle(commanded_at))
+                if completed:
+                    SWEEP_STEP_SECONDS.observe(time.monotonic() - settle_start, device_id=self.device_id, phase="settle")
+                else:
+                    self._sweep_preemptions += 1
+                    logger.info(f"Scan step {i+1} preempted. Will re-rotate to {angle} when resumed.")
+                    continue
+
+                # Capture the frame for this angle before the motor moves on
+                frame = settled_frame
+                i += 1
+                if frame is None and self._capture_callback:
+                    try:
+                        frame = await asyncio.to_thread(self._capture_callback, angle)
+                    except Exception as e:
+                        logger.error(f"Error capturing frame at step {i}: {e}")
+                        continue
+
+                # Analyze concurrently with the next rotation
+                logger.info(f"Scan step {i}: Analyzing...")
+                task = asyncio.create_task(self._analyze_step(i - 1, angle, frame))
+                if self._capture_callback is None:
+                    # Without a captured frame reference the analysis reads "the latest image",
+                    # so it must finish before the camera moves.
+                    await task
+                pending.append(task)
+
+            results = await asyncio.gather(*pending)
+            swept = not self._sweep_interrupted
+            sweep_results = {**restored, **{angle: result for angle, result in results if angle is not None}}
+            if self._scan_cadence is not None:
+                self._scan_cadence.record_sweep(sweep_changed(self._last_sweep_results, sweep_results))
+            self._last_sweep_results.update(sweep_results)
+            if set(checkpoint["completed"]) >= set(checkpoint["angles"]):
+                checkpoint["status"] = STATUS_COMPLETED
+                await self._save_checkpoint()
+                outcome = "completed"
+            logger.info(
+                f"Periodic scan completed ({len(sweep_results)} steps analyzed in "
+                f"{time.monotonic() - sweep_start:.1f}s)."
+            )
 
-            logger.info("Periodic scan completed.")
-            
         finally:
+            SWEEP_SECONDS.observe(time.monotonic() - sweep_start, device_id=self.device_id, outcome=outcome)
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+            if sweep_token is not None:
+                _current_sweep_id.reset(sweep_token)
+            if device_token is not None:
+                _current_device_id.reset(device_token)
             self._is_scanning = False
-            self.update_activity() # Reset timer after scan
+            # A sweep cut short (not one that only had failed angles) resumes soon instead of after the idle threshold.
+            self._schedule_resume(self._checkpoint if self._checkpoint_store is not None and not swept else None)
+            self._reset_idle_timer() # Reset timer after scan (not user activity)
+            if self._lease is not None:
+                await self._run_lease(self._lease.publish_activity, self._last_activity_time)
+
+    async def _begin_sweep(self) -> Dict[str, Any]:
+        """鮮度内の中断されたスイープがあれば再開し、無ければ新しいスイープを計画する。"""
+        self._checkpoint_lock = asyncio.Lock()
+        self._resumable_until = None
+        now = time.time()
+        if self._checkpoint_store is not None:
+            try:
+                saved = await asyncio.to_thread(self._checkpoint_store.load)
+            except Exception as e:
+                logger.warning(f"Failed to load sweep checkpoint: {e}")
+                saved = None
+            if is_resumable(saved, now, self._resume_window):
+                logger.info(
+                    f"Resuming sweep {saved['sweep_id']} "
+                    f"({len(saved['completed'])}/{len(saved['angles'])} steps already done)."
+                )
+                self._checkpoint = saved
+                self._stamp_fencing_token()
+                return saved
+
+        angles = await self._plan_angles()
+        sweep_id = f"sweep_{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}"
+        self._checkpoint = new_checkpoint(sweep_id, angles, now)
+        self._stamp_fencing_token()
+        await self._save_checkpoint()
+        return self._checkpoint
+
+    def _stamp_fencing_token(self):
+        # 以前のリーダーの遅れた書き込みがこのスイープの進捗を上書きできないようにする
+        if self._lease is not None and self._lease.token is not None:
+            self._checkpoint["fencing_token"] = self._lease.token
+
+    async def _record_step(self, angle: int, result: Any):
+        """完了したステップをチェックポイントに記録する。"""
+        checkpoint = self._checkpoint
+        if checkpoint is None:
+            return
+        if angle not in checkpoint["completed"]:
+            checkpoint["completed"].append(angle)
+        checkpoint["results"][str(angle)] = result
+        await self._save_checkpoint()
+
+    async def _save_checkpoint(self):
+        if self._checkpoint_store is None or self._checkpoint is None:
+            return
+        # 保存は順番どおりに行い、古い内容で新しい内容を上書きしない
+        async with self._checkpoint_lock:
+            self._checkpoint["updated_at"] = time.time()
+            snapshot = dict(self._checkpoint, completed=list(self._checkpoint["completed"]),
+                            results=dict(self._checkpoint["results"]))
+            try:
+                if await asyncio.to_thread(self._checkpoint_store.save, snapshot) is False:
+                    logger.warning(f"Checkpoint for {snapshot['sweep_id']} superseded by a newer leader.")
+            except Exception as e:
+                logger.warning(f"Failed to save sweep checkpoint: {e}")
+
+    async def _plan_angles(self) -> list[int]:
+        """今回のスイープで訪れる角度を返す。計画に失敗した場合は全候補を訪れる。"""
+        candidates = self.candidate_angles()
+        if self._sweep_planner is None:
+            return candidates
+        try:
+            planned = await asyncio.to_thread(self._sweep_planner.plan, candidates)
+        except Exception as e:
+            logger.warning(f"Sweep planning failed, visiting all angles: {e}")
+            return candidates
+        return [angle for angle in planned if angle in candidates] or candidates
+
+    async def _rotate(self, angle: int) -> Any:
+        """rotate_callback を実行する（同期のコールバックはイベントループを塞がないようスレッドで）。"""
+        if asyncio.iscoroutinefunction(self._rotate_callback):
+            return await self._rotate_callback(angle)
+        return await asyncio.to_thread(self._rotate_callback, angle)
+
+    async def _wait_for_settle(self, commanded_at: float) -> Optional[str]:
+        """回転後の安定を待つ。安定判定に使ったフレームの参照（世代付き URI）があれば返す。"""
+        if self._settle_detector is None:
+            if self._frame_barrier is None:
+                await asyncio.sleep(self._rotation_settle_time)
+                return None
+            return await self._wait_for_first_frame(commanded_at)
+        try:
+            result = await self._settle_detector.wait_until_settled(
+                commanded_at, max_wait_seconds=self._rotation_settle_time
+            )
+        except Exception as e:
+            logger.warning(f"Settle detection failed, falling back to timer: {e}")
+            await asyncio.sleep(self._rotation_settle_time)
+            return None
+        frame = result.get("frame")
+        if result.get("settled") and frame:
+            return frame_ref(frame)
+        return None
+
+    async def _wait_for_first_frame(self, commanded_at: float) -> Optional[str]:
+        """回転完了後に撮影された最初のフレームを待つ（タイムアウトしたら None）。"""
+        rotation = self._frame_barrier.last_rotation(self.device_id)
+        # 回転完了（サーボの移動時間込み）が記録されていればそれ以降、無ければ指令時刻以降のフレーム
+        after = max(commanded_at, rotation["completed_at"]) if rotation else commanded_at
+        frame = await self._frame_barrier.wait_for_frame(
+            self.device_id,
+            after=after,
+            timeout=self._rotation_settle_time,
+            frame_source=self._frame_source,
+        )
+        if frame is None:
+            logger.info(f"No new frame within {self._rotation_settle_time}s after rotation.")
+            return None
+        return frame_ref(frame)
+
+    async def _analyze_step(self, index: int, angle: int, frame: Optional[str]):
+        """1ステップ分の分析を共有ワーカープールで実行する。失敗しても他のステップは継続する。"""
+        # Queued analyses wait while interactive requests use the Gemini quota.
+        if not await self._wait_for_background_turn():
+            self._sweep_interrupted = True
+            return None, None
+        async with self._analysis_pool.slot(self.device_id):
+            try:
+                signature = None
+                if self._frame_signer and frame:
+                    signature = await self._analysis_pool.to_thread(self._frame_signer, frame)
+                    reused = await self._reuse_if_unchanged(angle, frame, signature)
+                    if reused is not None:
+                        await self._record_step(angle, reused)
+                        return angle, reused
+
+                with SWEEP_STEP_SECONDS.time(device_id=self.device_id, phase="analyze"):
+                    result = await self._analysis_pool.to_thread(self._scan_callback, angle, frame)
+                if signature is not None:
+                    self._frame_signatures[angle] = signature
+                await self._record_step(angle, result)
+                return angle, result
+            except Exception as e:
+                logger.error(f"Error during scan Step {index}: {e}")
+                return None, None
+
+    async def _reuse_if_unchanged(self, angle: int, frame: str, signature: Any) -> Any:
+        """フレームが前回分析時と一致すれば、前回結果を再利用した結果を返す（不一致なら None）。"""
+        previous_signature = self._frame_signatures.get(angle)
+        previous_result = self._last_sweep_results.get(angle)
+        if signature is None or previous_signature is None or previous_result is None:
+            return None
+        difference = image_diff.frame_difference(previous_signature, signature)
+        if difference > self._signature_tolerance:
+            CACHE_REQUESTS.inc(cache="unchanged_frame", result="miss")
+            return None
+        try:
+            result = await self._analysis_pool.to_thread(self._refresh_callback, angle, frame, previous_result)
+        except Exception as e:
+            logger.warning(f"Failed to reuse detection at {angle}, analyzing instead: {e}")
+            return None
+        if result is not None:
+            CACHE_REQUESTS.inc(cache="unchanged_frame", result="hit")
+            self._unchanged_frames_skipped += 1
+            logger.info(f"Frame at {angle} unchanged (diff={difference:.3f}). Skipped model call.")
+        return result
+
+
+# グローバルインスタンス
+# Monitor Agent プロセス内で、デバイスごとに一つずつ存在する
+_monitoring_services: Dict[str, MonitoringLoopService] = {}
+_analysis_pool: Optional[AnalysisWorkerPool] = None
+
+
+def get_analysis_pool() -> AnalysisWorkerPool:
+    """全デバイスで共有する分析ワーカープールを取得する。"""
+    global _analysis_pool
+    if _analysis_pool is None:
+        _analysis_pool = AnalysisWorkerPool(get_coco_settings().MONITOR_ANALYSIS_WORKERS)
+    return _analysis_pool
+
+
+def get_monitoring_service(device_id: Optional[str] = None) -> MonitoringLoopService:
+    """デバイスの MonitoringLoopService を取得する（無ければ作成する）。
+
+    device_id を省略すると、最初に作成されたデバイス（プライマリ）を返す。
+    """
+    if device_id is None:
+        if _monitoring_services:
+            return next(iter(_monitoring_services.values()))
+        device_id = DEFAULT_DEVICE_ID
+    service = _monitoring_services.get(device_id)
+    if service is None:
+        service = MonitoringLoopService(device_id=device_id, analysis_pool=get_analysis_pool())
+        _monitoring_services[device_id] = service
+    return service
+
+
+def list_monitoring_services() -> Dict[str, MonitoringLoopService]:
+    """作成済みの全デバイスの MonitoringLoopService を返す。"""
+    return dict(_monitoring_services)
 
 
-# グローバルシングルトンインスタンス
-# Monitor Agent プロセス内で一つだけ存在する
-_monitoring_service: Optional[MonitoringLoopService] = None
+async def start_monitoring_services():
+    """全デバイスの監視ループを開始する。"""
+    for service in list_monitoring_services().values():
+        await service.start()
 
 
-def get_monitoring_service() -> MonitoringLoopService:
-    """MonitoringLoopService のシングルトンインスタンスを取得する。"""
-    global _monitoring_service
-    if _monitoring_service is None:
-        _monitoring_service = MonitoringLoopService()
-    return _monitoring_service
+async def stop_monitoring_services():
+    """全デバイスの監視ループを停止する。"""
+    await asyncio.gather(*(service.stop() for service in list_monitoring_services().values()))
 
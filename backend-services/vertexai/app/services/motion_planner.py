@@ -0,0 +1,96 @@
+"""
+MotionPlanner: サーボの特性（可動範囲・回転速度・安定時間）に基づいて、
+複数の角度を訪れる順序と所要時間の見積もりを計算するサービス。
+
+サーボは 1 軸なので、最短移動の巡回順は「現在位置から近い方の端へ向かい、折り返して反対の端まで」
+の単調な 2 区間になる。可動範囲外の角度は訪問対象から除き、単発の回転はクランプする。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServoModel:
+    """サーボの可動範囲・回転速度・回転後の安定時間。"""
+
+    def __init__(
+        self,
+        min_angle: int = 0,
+        max_angle: int = 180,
+        speed_degrees_per_second: float = 120.0,
+        settle_seconds: float = 15.0,
+    ):
+        if min_angle > max_angle:
+            raise ValueError(f"Invalid servo range: {min_angle}..{max_angle}")
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.speed = max(1e-6, speed_degrees_per_second)
+        self.settle_seconds = settle_seconds
+
+    def is_reachable(self, angle: float) -> bool:
+        return self.min_angle <= angle <= self.max_angle
+
+    def clamp(self, angle: float) -> int:
+        return int(max(self.min_angle, min(self.max_angle, round(angle))))
+
+    def travel_seconds(self, start: Optional[float], end: float) -> float:
+        """start から end への回転時間（start 不明なら可動範囲の半分を移動するとみなす）。"""
+        distance = abs(end - start) if start is not None else (self.max_angle - self.min_angle) / 2
+        return distance / self.speed
+
+
+class MotionPlanner:
+    """角度の集合から、最短移動の訪問順と見積もり時間を求める。"""
+
+    def __init__(self, servo: Optional[ServoModel] = None):
+        self.servo = servo or ServoModel()
+
+    def plan(self, targets: Iterable[int], start: Optional[float] = None) -> Dict[str, Any]:
+        """targets を訪れる計画を返す。
+
+        Returns:
+            order（訪問順）、unreachable（範囲外で除いた角度）、travel_degrees、
+            estimated_seconds（回転 + 各角度での安定待ち）を含む dict。
+        """
+        unique: List[int] = []
+        unreachable: List[int] = []
+        for angle in targets:
+            if not self.servo.is_reachable(angle):
+                if angle not in unreachable:
+                    unreachable.append(angle)
+            elif angle not in unique:
+                unique.append(angle)
+        if unreachable:
+            logger.info(f"Dropping angles outside the servo range {self.servo.min_angle}..{self.servo.max_angle}: {unreachable}")
+
+        order = self._order(sorted(unique), start)
+        travel_degrees = 0.0
+        estimated = 0.0
+        position = start
+        for angle in order:
+            if position is not None:
+                travel_degrees += abs(angle - position)
+            estimated += self.servo.travel_seconds(position, angle) + self.servo.settle_seconds
+            position = angle
+        return {
+            "order": order,
+            "unreachable": unreachable,
+            "travel_degrees": travel_degrees,
+            "estimated_seconds": round(estimated, 2),
+        }
+
+    @staticmethod
+    def _order(ascending: List[int], start: Optional[float]) -> List[int]:
+        if not ascending or start is None:
+            return ascending
+        low, high = ascending[0], ascending[-1]
+        # 近い方の端を先に訪れると、折り返しの重複移動が短い方で済む
+        if abs(start - low) <= abs(high - start):
+            below = [a for a in ascending if a <= start]
+            above = [a for a in ascending if a > start]
+            return list(reversed(below)) + above
+        above = [a for a in ascending if a >= start]
+        below = [a for a in ascending if a < start]
+        return above + list(reversed(below))
@@ -0,0 +1,166 @@
+"""
+MotionCommandQueue: ObnizController の前段に置くモーター指令キュー。
+
+- 最新目標優先（latest-target-wins）: 回転中に届いた指令は 1 つの保留枠にまとめ、
+  保留中の古い目標は新しい目標で置き換える。置き換えられた呼び出しも最終目標の完了を待つ。
+- 空回転の除去: 現在位置（デバイスが応答した角度）から許容誤差以内への回転は webhook を呼ばずに完了し、
+  省略できた安定待ち時間を結果として返す。他のプロセスも同じモーターを動かす構成では
+  position_query でデバイスの実際の位置を確認してから省略する。
+
+回転は 1 台のサーボにつき同時に 1 つだけ実行する。
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+STATUS_MOVED = "moved"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+_metrics = get_metrics_registry()
+MOTOR_COMMANDS = _metrics.counter(
+    "coco_motor_commands_total", "Motor commands by outcome (moved, skipped, coalesced, failed).", ["result"],
+)
+SETTLE_SECONDS_SAVED = _metrics.counter(
+    "coco_motor_settle_seconds_saved_total", "Settle wait avoided by skipped or coalesced rotations.",
+)
+
+
+class MotionCommandQueue:
+    """1 台のサーボへの回転指令をまとめて実行する。"""
+
+    def __init__(
+        self,
+        controller,
+        tolerance_degrees: float = 2.0,
+        settle_seconds: float = 15.0,
+        on_moved: Optional[Callable[[int, Optional[int]], None]] = None,
+        position_query: Optional[Callable[[], Awaitable[Optional[float]]]] = None,
+    ):
+        """on_moved(angle, previous_angle) は回転が成功するたびに呼ばれる（FrameBarrier への回転完了の記録など）。
+
+        position_query はデバイスの実際の位置を返す（取得できなければ None）。設定されている場合、
+        このキューを通らない回転があっても古い応答角度を信用しないよう、省略の前に位置を問い合わせ、
+        確認できなければ回転する。
+        """
+        self._controller = controller
+        self._on_moved = on_moved
+        self._position_query = position_query
+        self._tolerance = tolerance_degrees
+        self._settle_seconds = settle_seconds
+        self._pending: Optional[Tuple[int, List[Tuple[int, asyncio.Future]]]] = None
+        self._in_flight: Optional[int] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"moved": 0, "skipped": 0, "coalesced": 0, "failed": 0, "settle_seconds_saved": 0.0}
+
+    def _at(self, angle: int) -> bool:
+        # 応答済みの位置が無い（起動直後・失敗直後など）場合は省略しない
+        position = self._controller.acknowledged_angle
+        return position is not None and abs(position - angle) <= self._tolerance
+
+    async def _can_skip(self, angle: int) -> bool:
+        if not self._at(angle):
+            return False
+        if self._position_query is None:
+            return True
+        try:
+            position = await self._position_query()
+        except Exception as e:
+            logger.warning(f"[Motion] Position query failed: {e}")
+            return False
+        return position is not None and abs(position - angle) <= self._tolerance
+
+    def _record(self, result: str, saved_seconds: float = 0.0):
+        self._stats[result] += 1
+        MOTOR_COMMANDS.inc(result=result)
+        if saved_seconds:
+            self._stats["settle_seconds_saved"] += saved_seconds
+            SETTLE_SECONDS_SAVED.inc(saved_seconds)
+
+    async def move_to(self, angle: int, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """angle への回転を依頼し、（まとめられた場合は最終目標の）回転の完了を待つ。
+
+        Returns:
+            status（moved / skipped / failed）、requested_angle、angle（実際の目標）、
+            coalesced（より新しい目標に置き換えられたか）、settle_seconds_skipped を含む dict。
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 別のイベントループ（テストなど）から使われた場合は状態を持ち越さない
+            self._loop, self._pending, self._in_flight, self._worker = loop, None, None, None
+
+        idle = self._pending is None and self._in_flight is None
+        # 位置の問い合わせ中に別の指令が来た場合は省略しない
+        if idle and await self._can_skip(angle) and self._pending is None and self._in_flight is None:
+            self._record("skipped", self._settle_seconds)
+            logger.info(f"[Motion] Already at {angle} (±{self._tolerance}). Skipped rotation.")
+            return self._result(STATUS_SKIPPED, angle, angle, coalesced=False)
+
+        future = loop.create_future()
+        waiters = [(angle, future)]
+        if self._pending is not None:
+            superseded, earlier = self._pending
+            logger.info(f"[Motion] Target {superseded} superseded by {angle}.")
+            waiters = earlier + waiters
+        self._pending = (angle, waiters)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+    async def _run(self):
+        while self._pending is not None:
+            target, waiters = self._pending
+            self._pending = None
+            self._in_flight = target
+            if await self._can_skip(target):
+                self._in_flight = None
+                status = STATUS_SKIPPED
+                self._record("skipped", self._settle_seconds)
+            else:
+                previous = self._controller.acknowledged_angle
+                try:
+                    ok = await self._controller.rotate_async(target)
+                except Exception as e:
+                    logger.error(f"[Motion] Rotation to {target} failed: {e}")
+                    ok = False
+                finally:
+                    self._in_flight = None
+                status = STATUS_MOVED if ok else STATUS_FAILED
+                self._record("moved" if ok else "failed")
+                if ok and self._on_moved is not None:
+                    try:
+                        self._on_moved(target, previous)
+                    except Exception as e:
+                        logger.warning(f"[Motion] on_moved callback failed: {e}")
+
+            for requested, future in waiters:
+                coalesced = requested != target or future is not waiters[-1][1]
+                if coalesced and status == STATUS_MOVED:
+                    # 置き換えられた目標への回転と安定待ちを丸ごと省略できた
+                    self._record("coalesced", self._settle_seconds)
+                if not future.done():
+                    future.set_result(self._result(status, requested, target, coalesced))
+
+    def _result(self, status: str, requested: int, target: int, coalesced: bool) -> Dict[str, Any]:
+        skipped = status == STATUS_SKIPPED or (coalesced and status == STATUS_MOVED)
+        return {
+            "status": status,
+            "requested_angle": requested,
+            "angle": target,
+            "coalesced": coalesced,
+            "settle_seconds_skipped": self._settle_seconds if skipped else 0.0,
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "pending": self._pending[0] if self._pending else None,
+            "tolerance_degrees": self._tolerance,
+            **self._stats,
+        }
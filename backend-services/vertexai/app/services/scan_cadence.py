@@ -0,0 +1,154 @@
+"""
+ScanCadence: アイドルスキャンの間隔（アイドル閾値）を、シーンの変化率に合わせて調整するサービス。
+変化の無いスイープが続くと間隔を指数的に延ばし、変化の検出やユーザー操作があると縮める。
+下限・上限と静穏時間帯（quiet hours）を設定でき、バックグラウンドの Gemini 利用量を
+実際の家の中の動きに追従させる。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: no cover - Python < 3.9
+    ZoneInfo = None
+
+
+def parse_quiet_hours(spec: str) -> List[Tuple[int, int]]:
+    """"23:00-06:00,13:00-14:00" 形式を (開始分, 終了分) のリストに変換する。日付をまたぐ範囲も可。"""
+    ranges = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = (p.strip() for p in part.split("-", 1))
+            sh, sm = (int(x) for x in start.split(":"))
+            eh, em = (int(x) for x in end.split(":"))
+        except ValueError:
+            logger.warning(f"Ignoring invalid quiet hours range: '{part}'")
+            continue
+        ranges.append((sh * 60 + sm, eh * 60 + em))
+    return ranges
+
+
+def _labels(result: Any) -> Optional[set]:
+    if isinstance(result, dict) and result.get("labels") is not None:
+        return {str(label).lower() for label in result["labels"]}
+    return None
+
+
+def sweep_changed(previous: Dict[int, Any], current: Dict[int, Any], similarity: float = 0.7) -> Optional[bool]:
+    """前回と今回のスイープ結果を角度ごとに比較し、シーンに変化があったかを返す。
+
+    結果は {"labels": [...]} を含む dict を想定する。比較できる角度が無い場合は None。
+    """
+    compared = 0
+    for angle, result in current.items():
+        before, after = _labels(previous.get(angle)), _labels(result)
+        if before is None or after is None:
+            continue
+        compared += 1
+        union = before | after
+        if union and len(before & after) / len(union) < similarity:
+            return True
+    return False if compared else None
+
+
+class ScanCadence:
+    """アイドル閾値の適応制御。
+
+    - 変化なしのスイープ: 間隔 × backoff_factor（上限 max_seconds）
+    - 変化ありのスイープ: 間隔 × tighten_factor（下限 min_seconds）
+    - ユーザー操作: 間隔を base_seconds 以下に戻す
+    - 静穏時間帯: 常に max_seconds
+    """
+
+    def __init__(
+        self,
+        base_seconds: float = 3600,
+        min_seconds: float = 900,
+        max_seconds: float = 4 * 3600,
+        backoff_factor: float = 2.0,
+        tighten_factor: float = 0.5,
+        quiet_hours: str = "",
+        timezone: str = "Asia/Tokyo",
+    ):
+        self._min = min_seconds
+        self._max = max(min_seconds, max_seconds)
+        self._base = self._clamp(base_seconds)
+        self._interval = self._base
+        self._backoff_factor = max(1.0, backoff_factor)
+        self._tighten_factor = min(1.0, max(0.0, tighten_factor))
+        self._quiet_ranges = parse_quiet_hours(quiet_hours)
+        self._tz = None
+        if ZoneInfo is not None:
+            try:
+                self._tz = ZoneInfo(timezone)
+            except Exception as e:
+                logger.warning(f"Unknown timezone '{timezone}' for quiet hours, using UTC: {e}")
+        self._lock = threading.Lock()
+        self._unchanged_sweeps = 0
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self._max, max(self._min, seconds))
+
+    def is_quiet(self, now: Optional[float] = None) -> bool:
+        """now（epoch 秒）が静穏時間帯に入っているか。"""
+        if not self._quiet_ranges:
+            return False
+        ts = datetime.datetime.fromtimestamp(now, tz=self._tz or datetime.timezone.utc) if now else \
+            datetime.datetime.now(tz=self._tz or datetime.timezone.utc)
+        minute = ts.hour * 60 + ts.minute
+        for start, end in self._quiet_ranges:
+            if start <= end:
+                if start <= minute < end:
+                    return True
+            elif minute >= start or minute < end:
+                return True
+        return False
+
+    def current_interval(self, now: Optional[float] = None) -> float:
+        """現在のアイドル閾値（秒）。"""
+        if self.is_quiet(now):
+            return self._max
+        return self._interval
+
+    def record_sweep(self, changed: Optional[bool]):
+        """スイープ結果を反映する。changed が None（比較不能）の場合は何もしない。"""
+        if changed is None:
+            return
+        with self._lock:
+            previous = self._interval
+            if changed:
+                self._unchanged_sweeps = 0
+                self._interval = self._clamp(self._interval * self._tighten_factor)
+            else:
+                self._unchanged_sweeps += 1
+                self._interval = self._clamp(self._interval * self._backoff_factor)
+        logger.info(
+            f"Scan cadence: sweep {'changed' if changed else 'unchanged'}, "
+            f"idle threshold {previous:.0f}s -> {self._interval:.0f}s"
+        )
+
+    def record_user_activity(self):
+        """ユーザー操作があったので、延びた間隔を base_seconds まで戻す。"""
+        with self._lock:
+            if self._interval > self._base:
+                logger.info(f"Scan cadence: user activity, idle threshold {self._interval:.0f}s -> {self._base:.0f}s")
+                self._interval = self._base
+            self._unchanged_sweeps = 0
+
+    def get_status(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "idle_threshold_seconds": self.current_interval(now),
+            "adaptive_interval_seconds": self._interval,
+            "min_seconds": self._min,
+            "max_seconds": self._max,
+            "unchanged_sweeps": self._unchanged_sweeps,
+            "quiet_now": self.is_quiet(now),
+        }
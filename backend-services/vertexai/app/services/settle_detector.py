@@ -0,0 +1,117 @@
+"""
+SettleDetector: 回転コマンド後に届くフレームを監視し、画角が安定したことを検出するサービス。
+固定の待ち時間（rotation_settle_time）の代わりに、回転後に撮影された連続フレームの
+縮小グレースケール差分が小さくなった時点で「安定」とみなす。
+最大待ち時間を超えた場合や、フレーム比較が使えない環境ではタイマーにフォールバックする。
+FrameBarrier を渡すと、ポーリング間隔を待たずにアップロード通知でフレームを確認する。
+"""
+
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+from app.app_utils import image_diff
+
+logger = logging.getLogger(__name__)
+
+
+class SettleDetector:
+    """回転後のフレーム安定を検出する。
+
+    フロントエンドは差分があるときだけ（約 10 秒ごとに）画像をアップロードするため、
+    2 枚目を待つとアップロード間隔ぶん遅れる。回転後のフレームを1枚以上受け取った後に
+    `quiet_seconds`（アップロード間隔より十分短い値）の間新しいフレームが届かない場合も
+    「安定」とみなす。
+    """
+
+    def __init__(
+        self,
+        frame_source: Callable[[], Optional[Dict[str, Any]]],
+        frame_loader: Callable[[Dict[str, Any]], Optional[bytes]],
+        max_wait_seconds: float = 15.0,
+        poll_interval_seconds: float = 1.0,
+        stable_frames: int = 2,
+        diff_threshold: float = 0.02,
+        quiet_seconds: float = 2.0,
+        frame_barrier=None,
+        device_id: Optional[str] = None,
+    ):
+        self._frame_source = frame_source
+        self._frame_loader = frame_loader
+        self._max_wait = max_wait_seconds
+        self._poll_interval = poll_interval_seconds
+        self._stable_frames = max(2, stable_frames)
+        self._diff_threshold = diff_threshold
+        self._quiet_seconds = quiet_seconds
+        self._frame_barrier = frame_barrier
+        self._device_id = device_id
+
+    async def wait_until_settled(self, commanded_at: float, max_wait_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """commanded_at（epoch 秒）以降に撮影されたフレームで安定を判定する。
+
+        Returns:
+            {"settled": bool, "method": "frames" | "quiet" | "timeout" | "timer",
+             "elapsed": 秒, "frames": 確認したフレーム数, "frame": 最後に確認したフレーム}
+        """
+        max_wait = self._max_wait if max_wait_seconds is None else max_wait_seconds
+        start = time.monotonic()
+        deadline = start + max_wait
+
+        if not image_diff.is_available():
+            await asyncio.sleep(max_wait)
+            return {"settled": False, "method": "timer", "elapsed": time.monotonic() - start, "frames": 0, "frame": None}
+
+        seen = set()
+        previous = None
+        stable = 0
+        frames = 0
+        last_frame: Optional[Dict[str, Any]] = None
+        last_frame_at: Optional[float] = None
+        newest_seen = commanded_at
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            frame = await asyncio.to_thread(self._frame_source)
+            key = (frame.get("uri"), frame.get("generation")) if frame else None
+            if frame and key not in seen and frame.get("updated", 0) >= commanded_at:
+                seen.add(key)
+                newest_seen = max(newest_seen, frame.get("updated", 0))
+                data = await asyncio.to_thread(self._frame_loader, frame)
+                thumbnail = image_diff.downsample_gray(data) if data else None
+                if thumbnail is not None:
+                    frames += 1
+                    last_frame, last_frame_at = frame, time.monotonic()
+                    if previous is not None and image_diff.frame_difference(previous, thumbnail) <= self._diff_threshold:
+                        stable += 1
+                    else:
+                        stable = 1
+                    previous = thumbnail
+                    if stable >= self._stable_frames:
+                        return self._result(True, "frames", start, frames, last_frame)
+
+            if last_frame_at is not None and time.monotonic() - last_frame_at >= self._quiet_seconds:
+                return self._result(True, "quiet", start, frames, last_frame)
+
+            await self._wait_for_next_frame(newest_seen, max(0.0, min(self._poll_interval, deadline - time.monotonic())))
+
+        logger.info(f"Settle detection timed out after {max_wait}s ({frames} new frames).")
+        return self._result(False, "timeout", start, frames, last_frame)
+
+    async def _wait_for_next_frame(self, newest_seen: float, timeout: float):
+        """次のポーリングまで待つ。FrameBarrier があれば新しいフレームの通知で早めに起きる。"""
+        if self._frame_barrier is None or self._device_id is None:
+            await asyncio.sleep(timeout)
+            return
+        # GCS の更新時刻はミリ秒精度なので、確認済みのフレームより 1ms 以上新しいものを待つ
+        await self._frame_barrier.wait_for_frame(self._device_id, after=newest_seen + 0.001, timeout=timeout)
+
+    @staticmethod
+    def _result(settled: bool, method: str, start: float, frames: int, frame: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        elapsed = time.monotonic() - start
+        if settled:
+            logger.info(f"View settled via {method} in {elapsed:.1f}s ({frames} frames).")
+        return {"settled": settled, "method": method, "elapsed": elapsed, "frames": frames, "frame": frame}
@@ -0,0 +1,124 @@
+"""
+SweepCheckpointStore: アイドルスイープの進捗（スイープ ID・訪問予定の角度・完了した角度・結果）を
+永続化するサービス。中断（suspend・停止・エラー・再起動）されたスイープは、
+鮮度の範囲内であれば次回、未完了の角度から再開される。
+Firestore が使えない場合はプロセス内メモリに保持する。
+チェックポイントに fencing_token（MonitorLease のトークン）があれば、保存済みのものより
+古いトークンでの書き込み（リーダー権を失ったレプリカの遅れた書き込み）は拒否する。
+"""
+
+from typing import Any, Callable, Dict, Optional
+import copy
+import logging
+import threading
+
+from google.cloud import firestore
+
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_WRITE_SECONDS = get_metrics_registry().histogram(
+    "coco_firestore_write_seconds", "Latency of Firestore writes.", ["collection"],
+)
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+
+def new_checkpoint(sweep_id: str, angles: list, now: float) -> Dict[str, Any]:
+    """新しいスイープのチェックポイントを作成する。"""
+    return {
+        "sweep_id": sweep_id,
+        "status": STATUS_IN_PROGRESS,
+        "angles": list(angles),
+        "completed": [],
+        # Firestore のマップキーは文字列なので角度は str で保存する
+        "results": {},
+        "started_at": now,
+        "updated_at": now,
+    }
+
+
+def _is_stale(current: Optional[Dict[str, Any]], checkpoint: Dict[str, Any]) -> bool:
+    token = checkpoint.get("fencing_token")
+    stored = (current or {}).get("fencing_token")
+    return token is not None and stored is not None and int(token) < int(stored)
+
+
+def is_resumable(checkpoint: Optional[Dict[str, Any]], now: float, window_seconds: float) -> bool:
+    """未完了かつ最終更新が window_seconds 以内のチェックポイントなら True。"""
+    if not checkpoint or checkpoint.get("status") != STATUS_IN_PROGRESS:
+        return False
+    return now - float(checkpoint.get("updated_at") or 0) <= window_seconds
+
+
+class SweepCheckpointStore:
+    """スイープのチェックポイントを 1 ドキュメントとして保存・読み込みする。"""
+
+    def __init__(
+        self,
+        db_getter: Optional[Callable[[], Any]] = None,
+        collection: str = "monitoring_sweeps",
+        document: str = "current",
+    ):
+        self._db_getter = db_getter
+        self._collection = collection
+        self._document = document
+        self._memory: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _doc_ref(self):
+        db = self._db_getter() if self._db_getter else None
+        if db is None:
+            return None
+        return db.collection(self._collection).document(self._document)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        doc_ref = self._doc_ref()
+        if doc_ref is not None:
+            try:
+                snapshot = doc_ref.get()
+                if snapshot.exists:
+                    return snapshot.to_dict()
+                return None
+            except Exception as e:
+                logger.warning(f"Failed to load sweep checkpoint, using in-memory copy: {e}")
+        with self._lock:
+            return copy.deepcopy(self._memory)
+
+    def save(self, checkpoint: Dict[str, Any]) -> bool:
+        """チェックポイントを保存する。古いフェンシングトークンで拒否された場合は False。"""
+        with self._lock:
+            if _is_stale(self._memory, checkpoint):
+                logger.warning(f"Rejected stale checkpoint write (token {checkpoint.get('fencing_token')}).")
+                return False
+            self._memory = copy.deepcopy(checkpoint)
+
+        db = self._db_getter() if self._db_getter else None
+        if db is None:
+            return True
+        doc_ref = db.collection(self._collection).document(self._document)
+        try:
+            if checkpoint.get("fencing_token") is None:
+                with FIRESTORE_WRITE_SECONDS.time(collection=self._collection):
+                    doc_ref.set(checkpoint)
+                return True
+
+            @firestore.transactional
+            def _fenced_set(transaction) -> bool:
+                snapshot = doc_ref.get(transaction=transaction)
+                if _is_stale(snapshot.to_dict() if snapshot.exists else None, checkpoint):
+                    return False
+                transaction.set(doc_ref, checkpoint)
+                return True
+
+            with FIRESTORE_WRITE_SECONDS.time(collection=self._collection):
+                accepted = _fenced_set(db.transaction())
+            if accepted:
+                return True
+            logger.warning(f"Rejected stale checkpoint write (token {checkpoint.get('fencing_token')}).")
+            return False
+        except Exception as e:
+            logger.warning(f"Failed to save sweep checkpoint {checkpoint.get('sweep_id')}: {e}")
+            return True
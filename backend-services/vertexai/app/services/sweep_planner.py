@@ -0,0 +1,167 @@
+"""
+SweepPlanner: monitoring_logs の履歴から、アイドルスキャンで訪れる角度の順序と取捨を決めるサービス。
+角度ごとの変化頻度・最終分析からの経過時間・ユーザーの探索クエリの集中度を点数化し、
+新しい情報が得られそうな角度にモデル呼び出しを優先的に割り当てる。
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(log: Dict[str, Any]) -> set:
+    labels = log.get("search_labels")
+    if labels is None:
+        labels = [
+            (obj.get("label") or obj.get("name") or "").lower()
+            for obj in log.get("detected_objects", []) or []
+        ]
+    return {label for label in labels if label}
+
+
+def _similarity(a: set, b: set) -> float:
+    """ラベル集合の Jaccard 係数（両方空なら同一とみなす）。"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _to_epoch(ts: Any) -> Optional[float]:
+    if isinstance(ts, datetime.datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=datetime.timezone.utc)
+        return ts.timestamp()
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    return None
+
+
+class SweepPlanner:
+    """履歴に基づいてスイープの訪問角度を並べ替え・間引く。
+
+    - 変化頻度: 同じ角度の連続するログで、検出ラベル集合が `change_similarity` 未満に
+      変わった割合（観測の少ない角度は 0.5 に寄せて平滑化）
+    - 経過時間: 最後に分析してからの秒数を `min_revisit_seconds` で正規化した値
+    - クエリ集中度: ユーザーの探索クエリ（trigger="query"）がその角度で発生した割合
+
+    最近分析済みで変化も少なく、クエリも無い角度はスキップする。
+    履歴が無い角度は最優先で訪れる。
+    """
+
+    CHANGE_WEIGHT = 0.5
+    AGE_WEIGHT = 0.3
+    QUERY_WEIGHT = 0.2
+
+    def __init__(
+        self,
+        history_loader: Callable[[datetime.datetime], List[Dict[str, Any]]],
+        history_hours: float = 24.0,
+        min_revisit_seconds: float = 6 * 3600,
+        max_angles: int = 0,
+        change_similarity: float = 0.7,
+        min_change_rate: float = 0.2,
+    ):
+        self._history_loader = history_loader
+        self._history_hours = history_hours
+        self._min_revisit = max(1.0, min_revisit_seconds)
+        self._max_angles = max_angles
+        self._change_similarity = change_similarity
+        self._min_change_rate = min_change_rate
+        self._last_plan: Dict[str, Any] = {}
+
+    def summarize(self, logs: Iterable[Dict[str, Any]], angles: List[int]) -> Dict[int, Dict[str, Any]]:
+        """ログを最も近い候補角度ごとに集計する。"""
+        stats = {angle: {"analyses": 0, "changes": 0, "queries": 0, "last_analyzed": None} for angle in angles}
+        if not angles:
+            return stats
+
+        by_angle: Dict[int, List[tuple]] = {angle: [] for angle in angles}
+        for log in logs:
+            ts = _to_epoch(log.get("timestamp"))
+            motor_angle = log.get("motor_angle")
+            if ts is None or not isinstance(motor_angle, (int, float)):
+                continue
+            angle = min(angles, key=lambda a: abs(a - motor_angle))
+            trigger = (log.get("environment") or {}).get("trigger")
+            if trigger == "query":
+                stats[angle]["queries"] += 1
+            by_angle[angle].append((ts, _labels(log)))
+
+        for angle, entries in by_angle.items():
+            entries.sort(key=lambda e: e[0])
+            entry = stats[angle]
+            entry["analyses"] = len(entries)
+            if entries:
+                entry["last_analyzed"] = entries[-1][0]
+            for (_, previous), (_, current) in zip(entries, entries[1:]):
+                if _similarity(previous, current) < self._change_similarity:
+                    entry["changes"] += 1
+        return stats
+
+    def _change_rate(self, entry: Dict[str, Any]) -> float:
+        # 事前分布 0.5（観測1回分）で平滑化し、観測の少ない角度を早々に見限らない
+        transitions = max(0, entry["analyses"] - 1)
+        return (entry["changes"] + 0.5) / (transitions + 1)
+
+    def score(self, entry: Dict[str, Any], total_queries: int, now: float) -> float:
+        """角度の優先度スコア（大きいほど新情報が得られる見込みが高い）。"""
+        if entry["last_analyzed"] is None:
+            return 1.0 + self.CHANGE_WEIGHT
+        age = max(0.0, now - entry["last_analyzed"])
+        age_factor = min(1.0, age / self._min_revisit)
+        query_factor = entry["queries"] / total_queries if total_queries else 0.0
+        return (
+            self.CHANGE_WEIGHT * self._change_rate(entry)
+            + self.AGE_WEIGHT * age_factor
+            + self.QUERY_WEIGHT * query_factor
+        )
+
+    def _should_skip(self, entry: Dict[str, Any], now: float) -> bool:
+        if entry["last_analyzed"] is None or entry["queries"] > 0:
+            return False
+        recently_analyzed = now - entry["last_analyzed"] < self._min_revisit
+        return recently_analyzed and self._change_rate(entry) < self._min_change_rate
+
+    def plan(self, angles: List[int], now: Optional[float] = None) -> List[int]:
+        """候補角度から今回のスイープで訪れる角度を優先度順に返す。
+
+        履歴が取得できない場合は候補をそのまま返す。
+        """
+        if not angles:
+            return []
+        now_dt = datetime.datetime.now(datetime.timezone.utc)
+        now = now if now is not None else now_dt.timestamp()
+
+        try:
+            since = now_dt - datetime.timedelta(hours=self._history_hours)
+            logs = self._history_loader(since) or []
+        except Exception as e:
+            logger.warning(f"Failed to load sweep history, visiting all angles: {e}")
+            return list(angles)
+
+        stats = self.summarize(logs, angles)
+        total_queries = sum(entry["queries"] for entry in stats.values())
+        scores = {angle: self.score(stats[angle], total_queries, now) for angle in angles}
+
+        ordered = sorted(angles, key=lambda a: scores[a], reverse=True)
+        planned = [angle for angle in ordered if not self._should_skip(stats[angle], now)]
+        if not planned:
+            # 何も訪れないとスイープ自体が無意味になるため、最も古い/有望な角度は残す
+            planned = ordered[:1]
+        if self._max_angles > 0:
+            planned = planned[: self._max_angles]
+
+        skipped = [angle for angle in angles if angle not in planned]
+        self._last_plan = {
+            "planned": planned,
+            "skipped": skipped,
+            "scores": {angle: round(scores[angle], 3) for angle in angles},
+            "history_logs": len(logs),
+        }
+        logger.info(f"Sweep plan: visit {planned}, skip {skipped} ({len(logs)} history logs)")
+        return planned
+
+    def get_last_plan(self) -> Dict[str, Any]:
+        return dict(self._last_plan)
@@ -0,0 +1,245 @@
+"""
+TTSCache: 合成済み音声を内容アドレス（テキスト・声・モデル・プロンプト・エンコーディングのハッシュ）で
+保存し、同じ発話を TTS モデルに再度問い合わせずに返すための階層キャッシュ。
+
+- 1 段目: プロセス内の LRU（ミリ秒で返る）
+- 2 段目以降: ローカルディスク、GCS（インスタンス間・再起動後も共有できる）
+
+下位の段でヒットした音声は上位の段に書き戻す。音声は TTS API の返す base64 文字列のまま保存する。
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = get_metrics_registry().counter(
+    "coco_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"],
+)
+
+
+def tts_cache_key(text: str, voice: str, model: str, prompt: str, encoding: str, language_code: str = "") -> str:
+    """合成結果を決めるパラメータの SHA-256 ハッシュを返す。"""
+    payload = json.dumps([text, voice, model, prompt, encoding, language_code.lower()], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LocalDiskTier:
+    """ディレクトリに 1 キー 1 ファイルで保存する段。
+
+    合計サイズが max_bytes を超えたら、最後に使われてから最も時間の経ったファイルから削除する
+    （0 は無制限）。起動時に既存のファイルを読み込むので、再起動をまたいでも上限が効く。
+    """
+
+    name = "disk"
+
+    def __init__(self, directory: str, max_bytes: int = 0):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # キー → ファイルサイズ（最後に使われた順）
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(".b64"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(".b64")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.b64")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), encoding="ascii") as f:
+                audio = f.read() or None
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        try:
+            # 再起動後も使用順を復元できるよう、更新時刻を使用時刻として扱う
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return audio
+
+    def put(self, key: str, audio: str):
+        # 書きかけのファイルを読まれないよう、一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="ascii") as f:
+            f.write(audio)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._total_bytes += len(audio) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(audio)
+            self._evict()
+
+    def _evict(self):
+        # self._lock を保持した状態で呼ぶこと
+        while self._max_bytes and self._total_bytes > self._max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict TTS disk cache entry {key}: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._sizes), "bytes": self._total_bytes, "max_bytes": self._max_bytes}
+
+
+class GcsTier:
+    """GCS バケットの prefix 配下に保存する段。"""
+
+    name = "gcs"
+
+    def __init__(self, bucket_name: str, prefix: str = "tts-cache/", client_getter: Optional[Callable[[], Any]] = None):
+        self._bucket_name = bucket_name
+        self._prefix = prefix
+        self._client_getter = client_getter or self._default_client
+        self._bucket = None
+
+    @staticmethod
+    def _default_client():
+        from google.cloud import storage
+        return storage.Client()
+
+    def _blob(self, key: str):
+        if self._bucket is None:
+            self._bucket = self._client_getter().bucket(self._bucket_name)
+        return self._bucket.blob(f"{self._prefix}{key}.b64")
+
+    def get(self, key: str) -> Optional[str]:
+        from google.api_core.exceptions import NotFound
+        try:
+            return self._blob(key).download_as_text() or None
+        except NotFound:
+            return None
+
+    def put(self, key: str, audio: str):
+        self._blob(key).upload_from_string(audio, content_type="text/plain")
+
+
+class TTSCache:
+    """メモリ LRU と永続化層（ディスク・GCS）からなる TTS キャッシュ。"""
+
+    def __init__(self, max_entries: int = 256, tiers: Optional[List[Any]] = None):
+        self._max_entries = max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._tiers = tiers or []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"memory": 0, "miss": 0, **{tier.name: 0 for tier in self._tiers}}
+
+    def get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory"] += 1
+        if audio is not None:
+            CACHE_REQUESTS.inc(cache="tts", result="hit")
+        return audio
+
+    def _remember(self, key: str, audio: str):
+        with self._lock:
+            self._memory[key] = audio
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """全段を上から探す（永続化層へのアクセスはブロックする）。"""
+        audio = self.get_memory(key)
+        return audio if audio is not None else self._get_persistent(key)
+
+    def _get_persistent(self, key: str) -> Optional[str]:
+        for index, tier in enumerate(self._tiers):
+            try:
+                audio = tier.get(key)
+            except Exception as e:
+                logger.warning(f"TTS cache tier '{tier.name}' read failed: {e}")
+                continue
+            if audio is None:
+                continue
+            with self._lock:
+                self._stats[tier.name] += 1
+            CACHE_REQUESTS.inc(cache="tts", result="hit")
+            self._remember(key, audio)
+            self._write_tiers(key, audio, self._tiers[:index])
+            return audio
+        with self._lock:
+            self._stats["miss"] += 1
+        CACHE_REQUESTS.inc(cache="tts", result="miss")
+        return None
+
+    def put(self, key: str, audio: str):
+        """全段に保存する（永続化層へのアクセスはブロックする）。"""
+        if not audio:
+            return
+        self._remember(key, audio)
+        self._write_tiers(key, audio, self._tiers)
+
+    def _write_tiers(self, key: str, audio: str, tiers: Iterable[Any]):
+        for tier in tiers:
+            try:
+                tier.put(key, audio)
+            except Exception as e:
+                logger.warning(f"TTS cache tier '{tier.name}' write failed: {e}")
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get の非同期版。メモリにあればイベントループ上で即座に返す。"""
+        audio = self.get_memory(key)
+        if audio is not None or not self._tiers:
+            return audio if audio is not None else self._get_persistent(key)
+        return await asyncio.to_thread(self._get_persistent, key)
+
+    async def aput(self, key: str, audio: str):
+        if not self._tiers:
+            self.put(key, audio)
+            return
+        await asyncio.to_thread(self.put, key, audio)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "max_entries": self._max_entries,
+                "tiers": ["memory"] + [tier.name for tier in self._tiers],
+                "hits": {name: count for name, count in self._stats.items() if name != "miss"},
+                "misses": self._stats["miss"],
+            }
+
+
+def create_tts_cache(settings) -> Optional[TTSCache]:
+    """設定から TTSCache を組み立てる（無効なら None）。"""
+    if not settings.TTS_CACHE_ENABLED:
+        return None
+    tiers: List[Any] = []
+    if settings.TTS_CACHE_DIR:
+        try:
+            tiers.append(LocalDiskTier(settings.TTS_CACHE_DIR, max_bytes=settings.TTS_CACHE_DIR_MAX_BYTES))
+        except OSError as e:
+            logger.warning(f"TTS disk cache disabled ({settings.TTS_CACHE_DIR}): {e}")
+    if settings.TTS_CACHE_BUCKET:
+        tiers.append(GcsTier(settings.TTS_CACHE_BUCKET, prefix=settings.TTS_CACHE_PREFIX))
+    return TTSCache(max_entries=settings.TTS_CACHE_MAX_ENTRIES, tiers=tiers)
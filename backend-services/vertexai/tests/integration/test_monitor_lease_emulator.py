@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import uuid
+
+import pytest
+from google.cloud import firestore
+
+from app.services.monitor_lease import LeaseStore, MonitorLease
+from app.services.sweep_checkpoint import SweepCheckpointStore, new_checkpoint
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("FIRESTORE_EMULATOR_HOST"),
+    reason="Requires the Firestore emulator (set FIRESTORE_EMULATOR_HOST)",
+)
+
+
+@pytest.fixture
+def db() -> firestore.Client:
+    return firestore.Client(project="demo-coco")
+
+
+def test_only_one_replica_leads_and_stale_writes_are_fenced(db: firestore.Client) -> None:
+    """Two replicas compete for one device's lease through real Firestore transactions"""
+    device_id = f"test-{uuid.uuid4().hex[:8]}"
+    now = [1000.0]
+    store = LeaseStore(db_getter=lambda: db, clock=lambda: now[0])
+    first = MonitorLease(store, device_id, replica_id="a", ttl_seconds=30, clock=lambda: now[0])
+    second = MonitorLease(store, device_id, replica_id="b", ttl_seconds=30, clock=lambda: now[0])
+
+    assert first.ensure_leader()
+    assert not second.ensure_leader()
+
+    now[0] += 31
+    assert second.ensure_leader()
+    assert second.token == first._token + 1
+
+    checkpoints = SweepCheckpointStore(db_getter=lambda: db, document=device_id)
+    checkpoint = new_checkpoint("sweep_1", [0, 30], now=now[0])
+    assert checkpoints.save(dict(checkpoint, fencing_token=second.token))
+    stale = SweepCheckpointStore(db_getter=lambda: db, document=device_id)
+    assert not stale.save(dict(checkpoint, completed=[0], fencing_token=first._token))
+    assert checkpoints.load()["completed"] == []
+
+
+def test_suspend_is_visible_to_other_replicas(db: firestore.Client) -> None:
+    device_id = f"test-{uuid.uuid4().hex[:8]}"
+    store = LeaseStore(db_getter=lambda: db)
+    first = MonitorLease(store, device_id, replica_id="a")
+    second = MonitorLease(store, device_id, replica_id="b")
+
+    assert first.publish_suspend("explorer_request", 300)
+    second.sync(force=True)
+    assert second.remote_suspend()["reason"] == "explorer_request"
+
+    assert second.publish_resume()
+    first.sync(force=True)
+    assert first.remote_suspend() is None
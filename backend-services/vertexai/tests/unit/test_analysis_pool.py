@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+from app.services.analysis_pool import AnalysisWorkerPool
+
+
+@pytest.mark.asyncio
+async def test_slots_are_shared_round_robin_between_devices() -> None:
+    pool = AnalysisWorkerPool(max_workers=1)
+    order: list[str] = []
+
+    async def _analyze(device_id: str, name: str) -> None:
+        async with pool.slot(device_id):
+            order.append(name)
+            await pool.to_thread(lambda: None)
+
+    tasks = [asyncio.create_task(_analyze("living", f"living-{i}")) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(_analyze("kitchen", "kitchen-0")))
+    await asyncio.gather(*tasks)
+
+    assert order == ["living-0", "living-1", "kitchen-0", "living-2"]
+    assert pool.get_status()["in_flight"] == 0
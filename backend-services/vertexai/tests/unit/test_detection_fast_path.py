@@ -0,0 +1,20 @@
+from app.coco_agent.agents import monitor
+
+
+def _log(confidence) -> dict:
+    return {"detected_objects": [{"label": "remote control", "confidence": confidence}]}
+
+
+def test_confident_recent_detection_answers_the_query(monkeypatch) -> None:
+    monkeypatch.setattr(monitor, "find_detection_for_image", lambda *args, **kwargs: _log(0.9))
+
+    answer = monitor._answer_from_recent_detection("リモコン", "gs://bucket/latest.jpg", generation=7)
+
+    assert answer == "Found 'remote control'. (Confidence: 0.90, from recent scan)"
+
+
+def test_low_confidence_detection_falls_through_to_the_cascade(monkeypatch) -> None:
+    threshold = monitor.get_coco_settings().DETECT_ESCALATION_CONFIDENCE
+    monkeypatch.setattr(monitor, "find_detection_for_image", lambda *args, **kwargs: _log(threshold - 0.2))
+
+    assert monitor._answer_from_recent_detection("リモコン", "gs://bucket/latest.jpg", generation=7) is None
@@ -0,0 +1,40 @@
+import json
+
+import httpx
+import pytest
+
+from app.coco_agent.agents import explorer, monitor
+from app.services.frame_barrier import get_frame_barrier
+
+
+@pytest.mark.asyncio
+async def test_local_rotation_uses_the_monitor_queue_and_frame_barrier() -> None:
+    monitor_queue = monitor.motion_queues[monitor.PRIMARY_DEVICE_ID]
+
+    await explorer._move_camera(90)
+    await monitor_queue.move_to(180)
+
+    # The sweep's move to 180 is known, so returning to 90 is not a no-op
+    assert (await explorer._move_camera(90))["status"] == "moved"
+    # detect_objects waits for the first frame after the explorer's rotation
+    assert get_frame_barrier().last_rotation(monitor.PRIMARY_DEVICE_ID)["angle"] == 90
+
+
+@pytest.mark.asyncio
+async def test_a2a_rotation_is_sent_to_the_monitor(monkeypatch) -> None:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(200, json={"status": "moved", "angle": 120})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(explorer, "MONITOR_AGENT_ENDPOINT", "http://monitor:8001/")
+    monkeypatch.setattr(
+        explorer.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    result = await explorer._move_camera(120)
+
+    assert result["status"] == "moved"
+    assert requests == [("http://monitor:8001/api/rotate", {"angle": 120, "reason": "explorer_rotate"})]
@@ -0,0 +1,72 @@
+import datetime
+
+from app.coco_agent.tools import firestore_tools
+
+
+class _FakeQuery:
+    """Records where/order_by/limit and serves the matching logs from a list."""
+
+    def __init__(self, logs, calls):
+        self._logs = logs
+        self._calls = calls
+        self._filters = []
+        self._descending = False
+        self._limit = None
+
+    def where(self, filter):
+        self._filters.append(filter)
+        return self
+
+    def order_by(self, field, direction=None):
+        self._descending = field == "timestamp" and direction == firestore_tools.firestore.Query.DESCENDING
+        return self
+
+    def select(self, fields):
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def stream(self):
+        self._calls.append((len(self._filters), self._descending, self._limit))
+        logs = list(self._logs)
+        for field_filter in self._filters:
+            op, value = field_filter.op_string, field_filter.value
+            field = field_filter.field_path
+            if op == ">=":
+                logs = [log for log in logs if log[field] >= value]
+            else:
+                logs = [log for log in logs if log.get(field) == value]
+        logs.sort(key=lambda log: log["timestamp"], reverse=self._descending)
+        return [type("Doc", (), {"to_dict": lambda self, log=log: log})() for log in logs[: self._limit]]
+
+
+class _FakeDb:
+    def __init__(self, logs):
+        self.logs = logs
+        self.calls = []
+
+    def collection(self, name):
+        return _FakeQuery(self.logs, self.calls)
+
+
+def test_logs_since_keep_the_newest_logs_of_the_device(monkeypatch) -> None:
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    logs = [
+        {"timestamp": base + datetime.timedelta(minutes=i), "motor_angle": i, "device_id": device}
+        for i, device in enumerate(["cam-a", "cam-b", None, "cam-a", "cam-b", "cam-a"])
+    ]
+    db = _FakeDb(logs)
+    monkeypatch.setattr(firestore_tools, "get_db", lambda: db)
+
+    result = firestore_tools.get_monitoring_logs_since(base, limit=2, device_id="cam-a")
+    assert [log["motor_angle"] for log in result] == [5, 3]
+    # The camera is filtered in the query, which orders newest first before the limit
+    assert db.calls == [(2, True, 2), (2, True, 2)]
+
+    result = firestore_tools.get_monitoring_logs_since(base, limit=5, device_id="cam-a")
+    assert [log["motor_angle"] for log in result] == [5, 3, 2, 0]
+
+    result = firestore_tools.get_monitoring_logs_since(base, limit=5, device_id="cam-a", include_unassigned=False)
+    assert [log["motor_angle"] for log in result] == [5, 3, 0]
@@ -0,0 +1,64 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from app.services.frame_barrier import FrameBarrier, frame_from_storage_event, frame_ref, split_frame_ref
+
+
+def _frame(generation: int, updated: float) -> dict:
+    return {"uri": "gs://bucket/latest.jpg", "generation": generation, "updated": updated}
+
+
+@pytest.mark.asyncio
+async def test_waiter_gets_first_frame_after_rotation_and_ignores_stale_one() -> None:
+    barrier = FrameBarrier()
+    completed_at = time.time()
+    barrier.rotation_completed("cam", 90, at=completed_at)
+
+    waiter = asyncio.create_task(barrier.wait_for_frame("cam", after=completed_at, angle=90, timeout=2))
+    await asyncio.sleep(0.01)
+    # Uploaded before the servo stopped: still the previous view
+    barrier.notify("cam", _frame(1, completed_at - 0.5))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    # Upload-finalize hooks call notify() from other threads
+    thread = threading.Thread(target=barrier.notify, args=("cam", _frame(2, completed_at + 0.1)))
+    thread.start()
+    thread.join()
+
+    frame = await waiter
+    assert frame["generation"] == 2
+    assert frame["angle"] == 90
+    assert frame_ref(frame) == "gs://bucket/latest.jpg#2"
+    assert split_frame_ref(frame_ref(frame)) == ("gs://bucket/latest.jpg", 2)
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out_and_polls_frame_source() -> None:
+    barrier = FrameBarrier()
+    start = time.time()
+    barrier.rotation_completed("cam", 30, at=start)
+
+    assert await barrier.wait_for_frame("cam", after=start, timeout=0.05) is None
+
+    uploads = iter([_frame(1, start - 1), _frame(2, start + 1)])
+    frame = await barrier.wait_for_frame(
+        "cam", after=start, angle=30, timeout=2, frame_source=lambda: next(uploads, None), poll_interval=0.01
+    )
+    assert frame["generation"] == 2
+
+
+def test_parses_pubsub_storage_notification() -> None:
+    metadata = {"bucket": "b", "name": "cam1/latest.jpg", "generation": "17", "updated": "2026-01-01T00:00:00.000Z"}
+    push = {"message": {"data": base64.b64encode(json.dumps(metadata).encode()).decode()}}
+
+    frame = frame_from_storage_event(push)
+
+    assert frame["uri"] == "gs://b/cam1/latest.jpg"
+    assert frame["generation"] == 17
+    assert frame_from_storage_event({"bucket": "b", "name": "notes.txt"}) is None
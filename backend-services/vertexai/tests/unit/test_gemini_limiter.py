@@ -0,0 +1,82 @@
+import pytest
+
+from app.services.gemini_limiter import (
+    CircuitOpenError,
+    GeminiRateLimiter,
+    Priority,
+    is_resource_exhausted,
+)
+
+
+def test_background_leaves_reserve_for_interactive() -> None:
+    limiter = GeminiRateLimiter(rate_per_second=0.001, burst=3, background_reserve=2.0)
+
+    limiter.acquire(Priority.BACKGROUND, timeout=0.1)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(Priority.BACKGROUND, timeout=0.1)
+
+    # Interactive calls can still use the reserved tokens.
+    limiter.acquire(Priority.INTERACTIVE, timeout=0.1)
+    limiter.acquire(Priority.INTERACTIVE, timeout=0.1)
+
+
+def test_resource_exhausted_halves_rate() -> None:
+    limiter = GeminiRateLimiter(rate_per_second=4.0, failure_threshold=10)
+
+    limiter.record_failure(Exception("429 RESOURCE_EXHAUSTED"))
+
+    status = limiter.get_status()
+    assert status["rate_per_second"] == 2.0
+    assert status["rate_limited"] == 1
+    assert status["circuit_state"] == "closed"
+
+
+def test_circuit_opens_after_consecutive_failures() -> None:
+    limiter = GeminiRateLimiter(failure_threshold=2, open_seconds=60)
+
+    limiter.record_failure(Exception("500 INTERNAL"))
+    limiter.record_failure(Exception("500 INTERNAL"))
+
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(Priority.INTERACTIVE)
+
+
+def test_call_retries_then_succeeds() -> None:
+    limiter = GeminiRateLimiter(base_backoff_seconds=0.001, max_backoff_seconds=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise Exception("503 UNAVAILABLE")
+        return "ok"
+
+    assert limiter.call(flaky, max_attempts=3) == "ok"
+    assert len(attempts) == 2
+    assert limiter.get_status()["consecutive_failures"] == 0
+
+
+def test_is_resource_exhausted() -> None:
+    assert is_resource_exhausted(Exception("429 Too Many Requests"))
+    assert not is_resource_exhausted(Exception("400 INVALID_ARGUMENT"))
+    assert is_resource_exhausted(Exception("RESOURCE_EXHAUSTED: Quota exceeded"))
+    # A 429 elsewhere in the message is not a status code
+    assert not is_resource_exhausted(Exception("500 INTERNAL: request 4291 failed after 429 ms"))
+    assert not is_resource_exhausted(Exception("Image gs://bucket/frames/429.jpg not found"))
+
+
+def test_client_errors_do_not_open_circuit() -> None:
+    limiter = GeminiRateLimiter(failure_threshold=2, base_backoff_seconds=0.001, max_backoff_seconds=0.001)
+
+    def bad_request():
+        raise Exception("400 INVALID_ARGUMENT")
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="INVALID_ARGUMENT"):
+            limiter.call(bad_request, max_attempts=3)
+
+    status = limiter.get_status()
+    assert status["circuit_state"] == "closed"
+    assert status["consecutive_failures"] == 0
+    assert status["client_errors"] == 3
+    limiter.acquire(Priority.INTERACTIVE, timeout=0.1)
@@ -0,0 +1,79 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from app.services.genai_replay import (
+    BACKEND_RECORD,
+    BACKEND_REPLAY,
+    FixtureNotFoundError,
+    FixtureStore,
+    InjectedError,
+    RecordReplayClient,
+    ReplayFaults,
+)
+
+
+def _response(text: str) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part.from_text(text=text)]))]
+    )
+
+
+def _request() -> dict:
+    return {
+        "model": "gemini-2.0-flash-lite",
+        "contents": [types.Content(role="user", parts=[types.Part.from_text(text="find the keys")])],
+        "config": types.GenerateContentConfig(response_mime_type="application/json", temperature=0.5),
+    }
+
+
+def test_recorded_call_replays_offline(tmp_path) -> None:
+    calls = []
+
+    def generate_content(**kwargs):
+        calls.append(kwargs)
+        return _response('{"found": true}')
+
+    real_client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    store = FixtureStore(str(tmp_path))
+    recorder = RecordReplayClient(BACKEND_RECORD, store, ReplayFaults(), real_client=real_client)
+    assert recorder.models.generate_content(**_request()).text == '{"found": true}'
+
+    # No real client: the response can only come from the fixture
+    replayer = RecordReplayClient(BACKEND_REPLAY, store, ReplayFaults(latency_ms=30))
+    started = time.monotonic()
+    replayed = replayer.models.generate_content(**_request())
+
+    assert replayed.text == '{"found": true}'
+    assert time.monotonic() - started >= 0.03
+    assert len(calls) == 1
+
+    with pytest.raises(FixtureNotFoundError):
+        replayer.models.generate_content(**{**_request(), "model": "gemini-2.0-flash"})
+
+
+def test_faults_are_deterministic_for_a_seed() -> None:
+    def sequence(seed: int) -> list:
+        faults = ReplayFaults(latency_ms=100, jitter_ms=50, error_rate=0.5, seed=seed)
+        outcomes = []
+        for _ in range(20):
+            error = faults.maybe_error()
+            outcomes.append((round(faults.next_delay(), 6), error.code if error else None))
+        return outcomes
+
+    first = sequence(7)
+    assert first == sequence(7)
+    assert first != sequence(8)
+    assert all(0.05 <= delay <= 0.15 for delay, _ in first)
+    assert {code for _, code in first} <= {None, 429, 503}
+    assert any(code is not None for _, code in first)
+
+
+def test_replay_raises_injected_errors(tmp_path) -> None:
+    replayer = RecordReplayClient(BACKEND_REPLAY, FixtureStore(str(tmp_path)), ReplayFaults(error_rate=1.0, seed=1))
+
+    with pytest.raises(InjectedError) as excinfo:
+        replayer.models.generate_content(**_request())
+    assert excinfo.value.code in (429, 503)
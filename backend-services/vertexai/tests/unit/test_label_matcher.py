@@ -0,0 +1,31 @@
+from app.coco_agent.tools.label_matcher import canonical_terms, match_query_to_objects
+
+
+def test_synonyms_and_plurals_share_a_canonical_label() -> None:
+    assert canonical_terms("Where are my keys?") == {"key"}
+    assert canonical_terms("tv remotes") == {"remote"}
+    assert canonical_terms("リモコン") == {"remote"}
+    assert canonical_terms("cups") == {"cup"}
+
+
+def test_plural_suffix_is_not_stripped_from_a_known_term() -> None:
+    assert canonical_terms("glasses") == {"glasses"}
+    assert canonical_terms("reading glasses") == {"glasses"}
+    assert canonical_terms("glass") == {"cup"}
+
+
+def test_match_picks_the_most_confident_synonym() -> None:
+    objects = [
+        {"label": "TV remote", "confidence": 0.55},
+        {"label": "remote control", "confidence": 0.9},
+        {"label": "mug", "confidence": 0.95},
+    ]
+
+    assert match_query_to_objects("リモコン", objects)["label"] == "remote control"
+
+
+def test_glasses_query_does_not_match_a_drinking_glass() -> None:
+    objects = [{"label": "glass", "confidence": 0.4}]
+
+    assert match_query_to_objects("reading glasses", objects) is None
+    assert match_query_to_objects("cup", objects) == objects[0]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.metrics import MetricsRegistry
+from app.services.monitoring_service import SWEEP_STEP_SECONDS, MonitoringLoopService
+
+
+def test_render_prometheus_text_format() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("coco_test_requests_total", "Requests.", ["cache", "result"])
+    latency = registry.histogram("coco_test_seconds", "Latency.", ["phase"], buckets=(0.1, 1.0))
+
+    requests.inc(cache="tts", result="hit")
+    requests.inc(2, cache="tts", result="hit")
+    latency.observe(0.05, phase="rotate")
+    latency.observe(0.5, phase="rotate")
+    latency.observe(5.0, phase="rotate")
+
+    # The same name returns the same metric so several modules can share it
+    assert registry.counter("coco_test_requests_total", "Requests.", ["cache", "result"]) is requests
+    text = registry.render()
+    assert "# TYPE coco_test_requests_total counter" in text
+    assert 'coco_test_requests_total{cache="tts",result="hit"} 3' in text
+    assert 'coco_test_seconds_bucket{phase="rotate",le="0.1"} 1' in text
+    assert 'coco_test_seconds_bucket{phase="rotate",le="1"} 2' in text
+    assert 'coco_test_seconds_bucket{phase="rotate",le="+Inf"} 3' in text
+    assert 'coco_test_seconds_count{phase="rotate"} 3' in text
+
+
+@pytest.mark.asyncio
+async def test_sweep_records_step_latencies() -> None:
+    service = MonitoringLoopService(
+        rotation_step_degrees=90, rotation_steps=2, rotation_settle_time_seconds=0, device_id="metrics-test"
+    )
+    service.set_callbacks(lambda angle, frame: {"labels": []}, lambda angle: None)
+    service._running = True
+
+    await service._perform_periodic_scan()
+
+    for phase in ("rotate", "settle", "analyze"):
+        assert SWEEP_STEP_SECONDS.count(device_id="metrics-test", phase=phase) == 2
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import model_cascade
+from app.services.model_cascade import ModelCascade, ModelTier
+
+
+def _cascade() -> ModelCascade:
+    return ModelCascade(
+        tiers=[ModelTier("tier0", "flash-lite"), ModelTier("tier1", "flash")],
+        escalation_confidence=0.6,
+    )
+
+
+def test_low_confidence_escalates_to_next_tier() -> None:
+    cascade = _cascade()
+    results = {
+        "flash-lite": {"found": True, "confidence": 0.3},
+        "flash": {"found": True, "confidence": 0.9},
+    }
+    called = []
+
+    def call(tier: ModelTier) -> dict:
+        called.append(tier.model)
+        return results[tier.model]
+
+    result, tier = cascade.run(call, is_generic=False)
+
+    assert called == ["flash-lite", "flash"]
+    assert tier.name == "tier1"
+    assert result["confidence"] == 0.9
+
+
+def test_generic_query_stays_on_cheapest_tier() -> None:
+    cascade = _cascade()
+    called = []
+
+    def call(tier: ModelTier) -> dict:
+        called.append(tier.model)
+        return {"found": False, "confidence": 0.1}
+
+    _, tier = cascade.run(call, is_generic=True)
+
+    assert called == ["flash-lite"]
+    assert tier.name == "tier0"
+
+
+def test_unacceptable_everywhere_returns_last_result() -> None:
+    cascade = _cascade()
+
+    result, tier = cascade.run(lambda tier: {"found": False, "model": tier.model}, is_generic=False)
+
+    assert tier.name == "tier1"
+    assert result["model"] == "flash"
+
+
+def test_stats_count_calls_errors_and_escalations() -> None:
+    cascade = _cascade()
+
+    def call(tier: ModelTier) -> dict:
+        if tier.name == "tier0":
+            raise Exception("503 UNAVAILABLE")
+        return {"found": True, "confidence": 0.8}
+
+    cascade.run(call, is_generic=False)
+    cascade.run(lambda tier: {"found": True, "confidence": 0.7}, is_generic=False)
+
+    stats = cascade.get_stats()
+    assert stats["tier0"]["calls"] == 2
+    assert stats["tier0"]["errors"] == 1
+    assert stats["tier0"]["escalations"] == 1
+    assert stats["tier0"]["escalation_rate"] == 0.5
+    assert stats["tier1"]["calls"] == 1
+    assert stats["tier1"]["escalations"] == 0
+
+
+def test_all_tiers_failing_raises_last_error() -> None:
+    cascade = _cascade()
+
+    def call(tier: ModelTier) -> dict:
+        raise ValueError(f"{tier.model} failed")
+
+    with pytest.raises(ValueError, match="flash failed"):
+        cascade.run(call, is_generic=False)
+
+
+def test_empty_tier_setting_falls_back_to_default_model(monkeypatch) -> None:
+    settings = SimpleNamespace(DETECT_MODEL_TIERS=" , ", DETECT_TEMPERATURE=0.5, DETECT_ESCALATION_CONFIDENCE=0.6)
+    monkeypatch.setattr(model_cascade, "get_coco_settings", lambda: settings)
+    monkeypatch.setattr(model_cascade, "_detection_cascade", None)
+
+    cascade = model_cascade.get_detection_cascade()
+
+    assert [tier.model for tier in cascade.tiers] == [model_cascade.DEFAULT_DETECTION_MODEL]
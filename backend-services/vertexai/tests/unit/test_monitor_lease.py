@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app.services.monitor_lease import LeaseStore, MonitorLease
+from app.services.monitoring_service import MonitoringLoopService
+from app.services.sweep_checkpoint import SweepCheckpointStore, new_checkpoint
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_leader_election_and_takeover_after_ttl() -> None:
+    clock = FakeClock()
+    store = LeaseStore(clock=clock)
+    first = MonitorLease(store, "living", replica_id="a", ttl_seconds=30, clock=clock)
+    second = MonitorLease(store, "living", replica_id="b", ttl_seconds=30, clock=clock)
+
+    assert first.ensure_leader()
+    assert not second.ensure_leader()
+    assert first.token == 1
+
+    # The leader keeps its token while renewing within the TTL
+    clock.now += 20
+    assert first.ensure_leader()
+    assert first.token == 1
+
+    # Once it stops renewing, another replica takes over with a higher token
+    clock.now += 31
+    assert not first.is_leader()
+    assert second.ensure_leader()
+    assert second.token == 2
+    assert not first.ensure_leader()
+
+
+def test_stale_leader_checkpoint_write_is_rejected() -> None:
+    checkpoints = SweepCheckpointStore()
+    checkpoint = new_checkpoint("sweep_1", [0, 30], now=0.0)
+
+    assert checkpoints.save(dict(checkpoint, fencing_token=2))
+    assert not checkpoints.save(dict(checkpoint, completed=[0], fencing_token=1))
+    assert checkpoints.load()["completed"] == []
+
+
+@pytest.mark.asyncio
+async def test_suspend_and_resume_are_shared_between_replicas() -> None:
+    store = LeaseStore()
+    replicas = [MonitoringLoopService(device_id="living") for _ in range(2)]
+    for name, service in zip("ab", replicas):
+        service.set_lease(MonitorLease(store, "living", replica_id=name))
+
+    # suspend()/resume() only queue the Firestore writes; wait for them to land
+    replicas[0].suspend(reason="explorer_request", duration=300)
+    await replicas[0]._run_lease(lambda: None)
+    await replicas[1]._sync_lease()
+    assert replicas[1].is_suspended
+
+    replicas[1].resume()
+    await replicas[1]._run_lease(lambda: None)
+    await replicas[0]._sync_lease()
+    assert not replicas[0].is_suspended
+
+
+@pytest.mark.asyncio
+async def test_lease_writes_do_not_block_the_event_loop() -> None:
+    release = threading.Event()
+
+    class SlowStore(LeaseStore):
+        def set_suspend(self, *args, **kwargs):
+            release.wait(timeout=2)
+            return super().set_suspend(*args, **kwargs)
+
+    service = MonitoringLoopService(device_id="living")
+    service.set_lease(MonitorLease(SlowStore(), "living", replica_id="a"))
+
+    started = time.monotonic()
+    service.suspend(reason="explorer_request", duration=300)
+    service.update_activity()
+    assert time.monotonic() - started < 0.5
+
+    release.set()
+    await service._run_lease(lambda: None)
+    assert service.is_suspended
+    assert service._suspend_shared
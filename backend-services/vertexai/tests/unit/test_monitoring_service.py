@@ -0,0 +1,270 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.monitoring_service import MonitoringLoopService
+
+
+def _make_service(**kwargs) -> tuple[MonitoringLoopService, list[int]]:
+    scanned: list[int] = []
+    service = MonitoringLoopService(
+        scan_interval_seconds=30,
+        rotation_steps=1,
+        rotation_settle_time_seconds=0,
+        scan_callback=lambda angle, frame: scanned.append(angle),
+        rotate_callback=lambda angle: None,
+        **kwargs,
+    )
+    return service, scanned
+
+
+def test_next_deadline_tracks_idle_and_suspend() -> None:
+    service, _ = _make_service(idle_threshold_seconds=100)
+    now = time.time()
+    service._last_activity_time = now - 40
+
+    assert service.seconds_until_next_deadline(now) == pytest.approx(60)
+
+    service.suspend(reason="test", duration=10)
+    assert service.seconds_until_next_deadline() == pytest.approx(10, abs=0.5)
+
+    service.suspend(reason="test", duration=0)
+    assert service.seconds_until_next_deadline() is None
+
+
+@pytest.mark.asyncio
+async def test_scan_starts_at_idle_threshold_not_scan_interval() -> None:
+    service, scanned = _make_service(idle_threshold_seconds=0.3)
+    await service.start()
+    try:
+        # One sweep at 0.3s; the next is not due before 0.6s
+        await asyncio.sleep(0.45)
+        assert scanned == [0]
+    finally:
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_suspended_loop_wakes_on_suspend_expiry() -> None:
+    service, scanned = _make_service(idle_threshold_seconds=0.25)
+    service.suspend(reason="test", duration=0.3)
+    await service.start()
+    try:
+        await asyncio.sleep(0.2)
+        assert scanned == []
+        # The sweep runs when the suspend expires at 0.3s; the next is due at 0.55s
+        await asyncio.sleep(0.2)
+        assert scanned == [0]
+    finally:
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_scan_without_callbacks_yields_and_defers_deadline() -> None:
+    service = MonitoringLoopService(scan_interval_seconds=0.1, idle_threshold_seconds=60)
+    service._last_activity_time = time.time() - 120
+
+    start = time.monotonic()
+    await service._perform_periodic_scan()
+
+    # Returning at once with the deadline still due would make _run_loop spin
+    # without awaiting anything and freeze the event loop.
+    assert time.monotonic() - start >= 0.09
+    assert service.seconds_until_next_deadline() > 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_overlaps_analysis_with_rotation() -> None:
+    analysis_seconds = 0.2
+    events: list[tuple[str, int]] = []
+
+    def analyze(angle, frame):
+        events.append(("analyze", angle))
+        time.sleep(analysis_seconds)
+        events.append(("analyzed", angle))
+        return frame
+
+    service = MonitoringLoopService(
+        rotation_steps=4,
+        rotation_step_degrees=30,
+        rotation_settle_time_seconds=0.05,
+        max_concurrent_analyses=4,
+        scan_callback=analyze,
+        rotate_callback=lambda angle: events.append(("rotate", angle)),
+        capture_callback=lambda angle: events.append(("capture", angle)) or f"frame-{angle}",
+    )
+    service._running = True
+
+    start = time.monotonic()
+    await service._perform_periodic_scan()
+    elapsed = time.monotonic() - start
+
+    # Sequential execution would take 4 * (0.05 + 0.2) = 1.0s.
+    assert elapsed < 0.6
+    motor = [event for event in events if event[0] in ("rotate", "capture")]
+    assert motor == [(kind, angle) for angle in (0, 30, 60, 90) for kind in ("rotate", "capture")]
+    assert [angle for kind, angle in events if kind == "analyze"] == [0, 30, 60, 90]
+    for angle, next_angle in ((0, 30), (30, 60), (60, 90)):
+        # Each frame is captured before the motor moves on, and analyzed while it does
+        assert events.index(("capture", angle)) < events.index(("rotate", next_angle))
+        assert events.index(("rotate", next_angle)) < events.index(("analyzed", angle))
+    assert service._last_sweep_results == {0: "frame-0", 30: "frame-30", 60: "frame-60", 90: "frame-90"}
+
+
+def test_candidate_angles_stay_within_servo_range() -> None:
+    service = MonitoringLoopService(rotation_step_degrees=30, rotation_steps=12)
+
+    assert service.candidate_angles() == [0, 30, 60, 90, 120, 150, 180]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_frame_reuses_previous_detection() -> None:
+    analyzed: list[int] = []
+    refreshed: list[int] = []
+    service = MonitoringLoopService(
+        rotation_steps=2,
+        rotation_settle_time_seconds=0,
+        scan_callback=lambda angle, frame: analyzed.append(angle) or {"labels": ["sofa"]},
+        rotate_callback=lambda angle: None,
+        capture_callback=lambda angle: f"gs://bucket/{angle}.jpg",
+    )
+    # Angle 0 always shows the same picture; angle 30 changes on every sweep.
+    signatures = {0: iter([[10] * 4] * 2), 30: iter([[0] * 4, [255] * 4])}
+    service.set_unchanged_frame_skip(
+        frame_signer=lambda frame: next(signatures[int(frame.rsplit("/", 1)[1][:-4])]),
+        refresh_callback=lambda angle, frame, previous: refreshed.append(angle) or previous,
+    )
+    service._running = True
+
+    await service._perform_periodic_scan()
+    await service._perform_periodic_scan()
+
+    assert sorted(analyzed) == [0, 30, 30]
+    assert refreshed == [0]
+    assert service.get_status()["unchanged_frames_skipped"] == 1
+
+
+class _SlowSettle:
+    async def wait_until_settled(self, commanded_at, max_wait_seconds=None):
+        await asyncio.sleep(0.3)
+        return {"settled": True, "frame": {"uri": "gs://bucket/latest.jpg"}}
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_preempts_and_resumes_sweep() -> None:
+    rotations: list[int] = []
+    scanned: list[int] = []
+    service = MonitoringLoopService(
+        rotation_steps=2,
+        interactive_grace_seconds=0.05,
+        scan_callback=lambda angle, frame: scanned.append(angle),
+        rotate_callback=rotations.append,
+        capture_callback=lambda angle: "gs://bucket/latest.jpg",
+    )
+    service.set_settle_detector(_SlowSettle())
+    service._running = True
+
+    async def _user_query():
+        await asyncio.sleep(0.1)
+        with service.interactive_lane("test"):
+            await asyncio.sleep(0.2)
+
+    await asyncio.gather(service._perform_periodic_scan(), _user_query())
+
+    assert rotations == [0, 0, 30]
+    assert sorted(scanned) == [0, 30]
+    assert service.get_status()["sweep_preemptions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interrupted_sweep_resumes_from_pending_step() -> None:
+    from app.services.sweep_checkpoint import SweepCheckpointStore
+
+    scanned: list[tuple[int, str]] = []
+    store = SweepCheckpointStore()
+
+    def _scan(angle, frame):
+        from app.services.monitoring_service import get_current_sweep_id
+
+        scanned.append((angle, get_current_sweep_id()))
+        if angle == 60 and len(scanned) == 3:
+            raise RuntimeError("model failure")
+        return {"labels": ["sofa"]}
+
+    service = MonitoringLoopService(
+        rotation_steps=3,
+        rotation_settle_time_seconds=0,
+        scan_callback=_scan,
+        rotate_callback=lambda angle: None,
+    )
+    service.set_checkpoint_store(store, resume_window_seconds=60)
+    service._running = True
+
+    await service._perform_periodic_scan()
+    first_sweep = scanned[0][1]
+    assert store.load()["completed"] == [0, 30]
+
+    await service._perform_periodic_scan()
+
+    assert [angle for angle, _ in scanned] == [0, 30, 60, 60]
+    assert {sweep_id for _, sweep_id in scanned} == {first_sweep}
+    assert store.load()["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_resumes_an_interrupted_sweep_before_the_idle_threshold() -> None:
+    from app.services.sweep_checkpoint import SweepCheckpointStore
+
+    scanned: list[int] = []
+    rotations: list[int] = []
+
+    def _rotate(angle):
+        # The first rotation to 30 suspends monitoring long enough for the sweep to be abandoned
+        if angle == 30 and 30 not in rotations:
+            service.suspend(reason="test", duration=30)
+        rotations.append(angle)
+
+    service = MonitoringLoopService(
+        idle_threshold_seconds=60,
+        rotation_steps=2,
+        rotation_settle_time_seconds=0,
+        max_pause_seconds=0.05,
+        scan_callback=lambda angle, frame: scanned.append(angle),
+        rotate_callback=_rotate,
+    )
+    service.set_checkpoint_store(SweepCheckpointStore(), resume_window_seconds=60, resume_delay_seconds=0.1)
+    service._last_activity_time = time.time() - 60
+    await service.start()
+    try:
+        # The suspended sweep is abandoned once its pause check runs (within about 1s)
+        await asyncio.sleep(1.3)
+        assert scanned == [0]
+
+        service.resume()
+        await asyncio.sleep(0.3)
+        assert scanned == [0, 30]
+        # The resumed sweep completed, so the next one waits for the idle threshold again
+        assert service.seconds_until_next_deadline() == pytest.approx(60, abs=1)
+    finally:
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_restarted_scheduler_resumes_a_saved_sweep() -> None:
+    from app.services.sweep_checkpoint import SweepCheckpointStore, new_checkpoint
+
+    store = SweepCheckpointStore()
+    checkpoint = new_checkpoint("sweep_before_restart", [0, 30, 60], time.time() - 10)
+    checkpoint["completed"] = [0]
+    store.save(checkpoint)
+
+    service, scanned = _make_service(idle_threshold_seconds=3600)
+    service.set_checkpoint_store(store, resume_window_seconds=60, resume_delay_seconds=0.1)
+    await service.start()
+    try:
+        await asyncio.sleep(0.4)
+        assert sorted(scanned) == [30, 60]
+        assert store.load()["status"] == "completed"
+    finally:
+        await service.stop()
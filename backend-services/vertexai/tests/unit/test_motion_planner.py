@@ -0,0 +1,22 @@
+from app.services.motion_planner import MotionPlanner, ServoModel
+
+
+def test_plan_visits_nearer_end_first_without_zig_zag() -> None:
+    planner = MotionPlanner(ServoModel(0, 180, speed_degrees_per_second=90, settle_seconds=1))
+
+    plan = planner.plan([180, 0, 90, 30, 120], start=100)
+
+    # 100 -> 120 -> 180, then back down to 0 (260° instead of 280° via 0 first)
+    assert plan["order"] == [120, 180, 90, 30, 0]
+    assert plan["travel_degrees"] == 260
+    assert plan["estimated_seconds"] == round(260 / 90 + 5 * 1, 2)
+
+
+def test_plan_drops_angles_outside_servo_range() -> None:
+    planner = MotionPlanner(ServoModel(0, 180))
+
+    plan = planner.plan([0, 30, 210, 330, 30])
+
+    assert plan["order"] == [0, 30]
+    assert plan["unreachable"] == [210, 330]
+    assert planner.servo.clamp(-90) == 0
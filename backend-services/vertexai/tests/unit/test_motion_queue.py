@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services.motion_queue import MotionCommandQueue
+
+
+class FakeController:
+    def __init__(self) -> None:
+        self.acknowledged_angle = None
+        self.rotations: list[int] = []
+
+    async def rotate_async(self, angle: int) -> bool:
+        self.rotations.append(angle)
+        await asyncio.sleep(0.01)
+        self.acknowledged_angle = angle
+        return True
+
+
+@pytest.mark.asyncio
+async def test_latest_target_wins_while_a_rotation_is_in_flight() -> None:
+    controller = FakeController()
+    queue = MotionCommandQueue(controller, settle_seconds=15)
+
+    first = asyncio.create_task(queue.move_to(30))
+    await asyncio.sleep(0)
+    # Both arrive while the motor is moving to 30; only the latest is executed
+    second = asyncio.create_task(queue.move_to(60))
+    third = asyncio.create_task(queue.move_to(90))
+    results = await asyncio.gather(first, second, third)
+
+    assert controller.rotations == [30, 90]
+    assert results[0]["status"] == "moved" and not results[0]["coalesced"]
+    assert results[1]["coalesced"] and results[1]["angle"] == 90
+    assert results[1]["settle_seconds_skipped"] == 15
+    assert not results[2]["coalesced"]
+
+
+@pytest.mark.asyncio
+async def test_rotation_to_current_angle_is_skipped() -> None:
+    controller = FakeController()
+    queue = MotionCommandQueue(controller, tolerance_degrees=2, settle_seconds=15)
+
+    assert (await queue.move_to(90))["status"] == "moved"
+    result = await queue.move_to(91)
+
+    assert result["status"] == "skipped"
+    assert result["settle_seconds_skipped"] == 15
+    assert controller.rotations == [90]
+    assert queue.get_status()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_skip_requires_the_queried_position_when_configured() -> None:
+    controller = FakeController()
+    device_position = {"angle": None}
+
+    async def query_position():
+        return device_position["angle"]
+
+    queue = MotionCommandQueue(controller, tolerance_degrees=2, position_query=query_position)
+
+    await queue.move_to(90)
+    # Another process moved the camera to 180; this queue still remembers 90
+    device_position["angle"] = 180
+    assert (await queue.move_to(90))["status"] == "moved"
+
+    # Without a reported position the rotation is not skipped either
+    device_position["angle"] = None
+    assert (await queue.move_to(90))["status"] == "moved"
+
+    device_position["angle"] = 90
+    assert (await queue.move_to(90))["status"] == "skipped"
+    assert controller.rotations == [90, 90, 90]
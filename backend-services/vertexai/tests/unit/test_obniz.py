@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.app_utils.obniz import ObnizController
+
+
+def _controller(handler) -> ObnizController:
+    controller = ObnizController(webhook_url="http://obniz.test/webhook")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    controller._get_async_client = lambda: client
+    return controller
+
+
+@pytest.mark.asyncio
+async def test_rotate_async_tracks_commanded_and_acknowledged_angle() -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"angle": 89})
+
+    controller = _controller(handler)
+    assert await controller.rotate_async(90)
+
+    status = controller.get_status()
+    assert status["commanded_angle"] == 90
+    # The position reported by the device wins over the commanded angle
+    assert controller.current_angle == 89
+
+
+@pytest.mark.asyncio
+async def test_rotate_async_times_out_without_acknowledging() -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(1)
+        return httpx.Response(200)
+
+    controller = _controller(handler)
+    assert not await controller.rotate_async(120, timeout=0.05)
+
+    assert controller.commanded_angle == 120
+    assert controller.current_angle == 0
+    assert controller.get_status()["consecutive_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_from_a_previous_loop_is_closed() -> None:
+    import threading
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200)
+
+    controller = ObnizController(webhook_url="http://obniz.test/webhook", transport=httpx.MockTransport(handler))
+    thread = threading.Thread(target=lambda: asyncio.run(controller.rotate_async(30)))
+    thread.start()
+    thread.join()
+    stale = controller._async_client
+
+    assert await controller.rotate_async(60)
+    await asyncio.sleep(0)
+
+    assert controller._async_client is not stale
+    assert stale.is_closed
+    await controller.aclose()
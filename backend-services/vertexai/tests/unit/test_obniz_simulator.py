@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from app.app_utils.obniz import ObnizController
+from app.app_utils.obniz_simulator import ObnizSimulator
+from app.services.monitoring_service import MonitoringLoopService
+from app.services.motion_queue import MotionCommandQueue
+
+
+def _controller(simulator: ObnizSimulator) -> ObnizController:
+    return ObnizController(
+        webhook_url="http://obniz-sim/",
+        position_url="http://obniz-sim/position",
+        transport=simulator.transport(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_controller_tracks_simulated_servo() -> None:
+    simulator = ObnizSimulator(speed_degrees_per_second=100, latency_seconds=0)
+    controller = _controller(simulator)
+
+    assert await controller.rotate_async(90)
+    assert controller.acknowledged_angle == 90
+    # The servo is still travelling right after the webhook answered
+    assert await controller.query_position_async() < 90
+
+    simulator.failure_rate = 1.0
+    assert not await controller.rotate_async(0)
+    assert controller.acknowledged_angle == 90
+
+
+@pytest.mark.asyncio
+async def test_sweep_timing_against_simulated_servo() -> None:
+    simulator = ObnizSimulator(speed_degrees_per_second=1800, latency_seconds=0.01, seed=7)
+    controller = _controller(simulator)
+    motion = MotionCommandQueue(controller, settle_seconds=0.02)
+    service = MonitoringLoopService(rotation_step_degrees=60, rotation_steps=4, rotation_settle_time_seconds=1)
+    service.set_callbacks(lambda angle, frame: {"labels": []}, motion.move_to)
+    service.set_settle_detector(simulator.settle_detector(settle_seconds=0.02))
+    service.set_motion_planner(service.motion_planner, position_getter=lambda: controller.acknowledged_angle)
+    service._running = True
+
+    started = time.monotonic()
+    await service._perform_periodic_scan()
+    elapsed = time.monotonic() - started
+
+    assert [command["angle"] for command in simulator.commands] == [0, 60, 120, 180]
+    # 180° of travel at 1800°/s plus four webhook round trips and settle waits
+    assert elapsed < 1.0
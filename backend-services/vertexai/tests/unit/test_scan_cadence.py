@@ -0,0 +1,39 @@
+import datetime
+
+from app.services.scan_cadence import ScanCadence, sweep_changed
+
+
+def test_backs_off_when_unchanged_and_tightens_on_change() -> None:
+    cadence = ScanCadence(base_seconds=3600, min_seconds=900, max_seconds=14400)
+
+    cadence.record_sweep(False)
+    cadence.record_sweep(False)
+    cadence.record_sweep(False)
+    assert cadence.current_interval() == 14400
+
+    cadence.record_sweep(True)
+    assert cadence.current_interval() == 7200
+
+    cadence.record_user_activity()
+    assert cadence.current_interval() == 3600
+
+    cadence.record_sweep(True)
+    cadence.record_sweep(True)
+    assert cadence.current_interval() == 900
+
+
+def test_quiet_hours_use_the_ceiling() -> None:
+    cadence = ScanCadence(base_seconds=3600, max_seconds=14400, quiet_hours="23:00-06:00", timezone="UTC")
+    night = datetime.datetime(2026, 1, 1, 2, 30, tzinfo=datetime.timezone.utc).timestamp()
+    day = datetime.datetime(2026, 1, 1, 12, 0, tzinfo=datetime.timezone.utc).timestamp()
+
+    assert cadence.current_interval(night) == 14400
+    assert cadence.current_interval(day) == 3600
+
+
+def test_sweep_changed_compares_labels_per_angle() -> None:
+    previous = {0: {"labels": ["sofa", "lamp"]}, 90: {"labels": ["desk"]}}
+
+    assert sweep_changed(previous, {0: {"labels": ["lamp", "sofa"]}}) is False
+    assert sweep_changed(previous, {90: {"labels": ["desk", "bag", "cup"]}}) is True
+    assert sweep_changed({}, {0: {"labels": ["sofa"]}}) is None
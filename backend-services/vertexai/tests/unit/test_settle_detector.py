@@ -0,0 +1,69 @@
+import io
+import time
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image
+
+from app.services.settle_detector import SettleDetector
+
+
+def _jpeg(shade: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (shade, shade, shade)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class _FakeCamera:
+    """Serves a new frame on every poll; frames become identical once settled."""
+
+    def __init__(self, shades: list[int]):
+        self._shades = shades
+        self._index = 0
+
+    def latest(self):
+        shade = self._shades[min(self._index, len(self._shades) - 1)]
+        self._index += 1
+        return {"uri": "gs://bucket/latest.jpg", "generation": self._index, "updated": time.time(), "shade": shade}
+
+    @staticmethod
+    def load(frame):
+        return _jpeg(frame["shade"])
+
+
+@pytest.mark.asyncio
+async def test_settles_on_consecutive_stable_frames() -> None:
+    camera = _FakeCamera([0, 120, 200, 200])
+    detector = SettleDetector(camera.latest, camera.load, max_wait_seconds=5, poll_interval_seconds=0.01)
+
+    result = await detector.wait_until_settled(commanded_at=time.time() - 1)
+
+    assert result["settled"] is True
+    assert result["method"] == "frames"
+    assert result["elapsed"] < 1.0
+
+
+@pytest.mark.asyncio
+async def test_times_out_without_new_frames() -> None:
+    detector = SettleDetector(lambda: None, lambda frame: None, max_wait_seconds=0.1, poll_interval_seconds=0.01)
+
+    result = await detector.wait_until_settled(commanded_at=time.time())
+
+    assert result["settled"] is False
+    assert result["method"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_settles_after_a_short_quiet_period_following_one_frame() -> None:
+    frame = {"uri": "gs://bucket/latest.jpg", "generation": 1, "updated": time.time(), "shade": 90}
+    detector = SettleDetector(
+        lambda: frame, _FakeCamera.load, max_wait_seconds=5, poll_interval_seconds=0.01, quiet_seconds=0.2
+    )
+
+    result = await detector.wait_until_settled(commanded_at=time.time() - 1)
+
+    assert result["settled"] is True
+    assert result["method"] == "quiet"
+    assert result["frames"] == 1
+    assert 0.2 <= result["elapsed"] < 1.0
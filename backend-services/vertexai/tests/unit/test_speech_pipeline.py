@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.app_utils.speech_pipeline import SpeechPipeline, split_sentences
+
+
+def test_split_sentences_merges_short_fragments_and_cuts_long_ones() -> None:
+    assert split_sentences("はい。リモコンはソファの上にあります！ほかに探すものはありますか？") == [
+        "はい。リモコンはソファの上にあります！",
+        "ほかに探すものはありますか？",
+    ]
+    assert split_sentences("Sure. The remote is on the sofa!\nAnything else?") == [
+        "Sure. The remote is on the sofa!",
+        "Anything else?",
+    ]
+    long_chunks = split_sentences("、".join(["テスト文"] * 30) + "。", max_chars=40)
+    assert all(len(chunk) <= 40 for chunk in long_chunks)
+    assert "".join(long_chunks) == "、".join(["テスト文"] * 30) + "。"
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_synthesized_in_parallel_and_returned_in_order() -> None:
+    active = 0
+    peak = 0
+
+    async def synthesize(text: str, timeout=None, encoding=None) -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        # Later sentences finish first
+        await asyncio.sleep(0.05 if text.startswith("最初") else 0.01)
+        active -= 1
+        return f"audio:{text}"
+
+    pipeline = SpeechPipeline(synthesize=synthesize, max_parallel=2)
+    text = "最初の文はこちらです。二番目の文はこちらです。三番目の文はこちらです。四番目の文はこちらです。"
+
+    chunks = await pipeline.synthesize(text)
+
+    assert [chunk["index"] for chunk in chunks] == [0, 1, 2, 3]
+    assert chunks[0]["audio_content"] == "audio:最初の文はこちらです。"
+    assert peak == 2
@@ -0,0 +1,48 @@
+import datetime
+
+from app.services.sweep_planner import SweepPlanner
+
+ANGLES = [0, 30, 60, 90, 120, 150, 180]
+
+
+def _log(angle: int, hours_ago: float, labels: list[str], trigger: str = "monitor") -> dict:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "timestamp": now - datetime.timedelta(hours=hours_ago),
+        "motor_angle": angle,
+        "search_labels": labels,
+        "environment": {"trigger": trigger},
+    }
+
+
+def test_unchanged_recent_angles_are_skipped_and_changing_ones_come_first() -> None:
+    history = []
+    for angle in ANGLES:
+        # Every angle was analyzed an hour ago; 90 changes on every sweep.
+        for hours_ago in (5, 3, 1):
+            labels = ["sofa", "lamp"] if angle != 90 else [f"cup_{hours_ago}"]
+            history.append(_log(angle, hours_ago, labels))
+    planner = SweepPlanner(history_loader=lambda since: history, min_revisit_seconds=6 * 3600)
+
+    planned = planner.plan(ANGLES)
+
+    assert planned == [90]
+    assert 0 in planner.get_last_plan()["skipped"]
+
+
+def test_unseen_and_queried_angles_are_kept() -> None:
+    history = [_log(angle, 1, ["sofa"]) for angle in ANGLES if angle != 180]
+    history += [_log(30, 1, ["sofa"]), _log(30, 0.5, ["sofa"], trigger="query")]
+    planner = SweepPlanner(history_loader=lambda since: history)
+
+    planned = planner.plan(ANGLES)
+
+    assert planned[0] == 180
+    assert 30 in planned
+
+
+def test_history_failure_visits_every_angle() -> None:
+    def _broken(since):
+        raise RuntimeError("firestore down")
+
+    assert SweepPlanner(history_loader=_broken).plan(ANGLES) == ANGLES
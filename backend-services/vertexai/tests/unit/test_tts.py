@@ -0,0 +1,132 @@
+import datetime
+
+import httpx
+import pytest
+
+from app.app_utils.tts import TTSClient
+
+
+class _FakeCredentials:
+    """Access token that expires `lifetime` after each refresh."""
+
+    def __init__(self, lifetime: datetime.timedelta):
+        self.lifetime = lifetime
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request) -> None:
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + self.lifetime
+
+
+def _client(credentials, requests_seen: list) -> TTSClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        return httpx.Response(200, json={"audioContent": "QUJD"})
+
+    return TTSClient(
+        url="https://tts.test/v1beta1/text:synthesize",
+        credentials=credentials,
+        project="demo-coco",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_once_and_reused() -> None:
+    credentials = _FakeCredentials(datetime.timedelta(hours=1))
+    seen: list = []
+    client = _client(credentials, seen)
+
+    assert await client.synthesize_async("こんにちは") == "QUJD"
+    assert await client.synthesize_async("監視を再開しました。") == "QUJD"
+
+    assert credentials.refreshes == 1
+    assert [r.headers["authorization"] for r in seen] == ["Bearer token-1", "Bearer token-1"]
+    assert seen[0].headers["x-goog-user-project"] == "demo-coco"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_close_to_expiry_is_refreshed() -> None:
+    # Each token lives shorter than the refresh margin, so every call refreshes
+    credentials = _FakeCredentials(datetime.timedelta(seconds=60))
+    seen: list = []
+    client = _client(credentials, seen)
+
+    await client.synthesize_async("one")
+    await client.synthesize_async("two")
+
+    assert credentials.refreshes == 2
+    assert seen[-1].headers["authorization"] == "Bearer token-2"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cached_phrase_skips_the_api(tmp_path) -> None:
+    from app.services.tts_cache import LocalDiskTier, TTSCache
+
+    seen: list = []
+    client = _client(_FakeCredentials(datetime.timedelta(hours=1)), seen)
+    client.cache = TTSCache(tiers=[LocalDiskTier(str(tmp_path))])
+
+    assert await client.synthesize_async("監視を再開しました。") == "QUJD"
+    assert await client.synthesize_async("監視を再開しました。") == "QUJD"
+
+    assert len(seen) == 1
+    await client.aclose()
+
+
+def test_negotiate_encoding_prefers_the_first_supported_entry() -> None:
+    from app.app_utils.tts import negotiate_encoding
+
+    assert negotiate_encoding("OGG_OPUS,MP3") == "OGG_OPUS"
+    assert negotiate_encoding("audio/ogg; codecs=opus, audio/mpeg") == "OGG_OPUS"
+    assert negotiate_encoding("audio/flac, audio/mp3") == "MP3"
+    assert negotiate_encoding(None, default="LINEAR16") == "LINEAR16"
+
+
+def test_excluded_encoding_is_never_negotiated() -> None:
+    from app.app_utils.tts import negotiate_encoding
+
+    assert negotiate_encoding("audio/wav, audio/mpeg", excluded=("LINEAR16",)) == "MP3"
+    assert negotiate_encoding("LINEAR16", default="OGG_OPUS", excluded=("LINEAR16",)) == "OGG_OPUS"
+
+
+@pytest.mark.asyncio
+async def test_requested_encoding_is_sent_and_cached_separately() -> None:
+    import json
+
+    from app.services.tts_cache import TTSCache
+
+    seen: list = []
+    client = _client(_FakeCredentials(datetime.timedelta(hours=1)), seen)
+    client.cache = TTSCache()
+
+    await client.synthesize_async("こんにちは", encoding="OGG_OPUS")
+    await client.synthesize_async("こんにちは")
+
+    assert [json.loads(r.content)["audioConfig"]["audioEncoding"] for r in seen] == ["OGG_OPUS", "MP3"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_from_a_previous_loop_is_closed() -> None:
+    import asyncio
+    import threading
+
+    client = _client(_FakeCredentials(datetime.timedelta(hours=1)), [])
+    # A loop that has finished by the time the client is used again
+    thread = threading.Thread(target=lambda: asyncio.run(client.synthesize_async("one")))
+    thread.start()
+    thread.join()
+    stale = client._async_client
+
+    await client.synthesize_async("two")
+    await asyncio.sleep(0)
+
+    assert client._async_client is not stale
+    assert stale.is_closed
+    await client.aclose()
@@ -0,0 +1,41 @@
+from app.services.tts_cache import LocalDiskTier, TTSCache, tts_cache_key
+
+
+def test_key_depends_on_every_synthesis_parameter() -> None:
+    base = tts_cache_key("監視を再開しました。", "Leda", "gemini-2.5-pro-tts", "prompt", "LINEAR16", "ja-jp")
+    assert base == tts_cache_key("監視を再開しました。", "Leda", "gemini-2.5-pro-tts", "prompt", "LINEAR16", "ja-JP")
+    assert base != tts_cache_key("監視を再開しました。", "Leda", "gemini-2.5-pro-tts", "prompt", "MP3", "ja-jp")
+    assert base != tts_cache_key("監視を再開しました。", "Puck", "gemini-2.5-pro-tts", "prompt", "LINEAR16", "ja-jp")
+
+
+def test_lru_evicts_and_disk_tier_refills_memory(tmp_path) -> None:
+    cache = TTSCache(max_entries=1, tiers=[LocalDiskTier(str(tmp_path))])
+    cache.put("a", "QUFB")
+    cache.put("b", "QkJC")
+
+    # "a" was evicted from memory but is still on disk
+    assert cache.get("a") == "QUFB"
+    assert cache.get("a") == "QUFB"
+    assert cache.get("missing") is None
+
+    status = cache.get_status()
+    assert status["hits"] == {"memory": 1, "disk": 1}
+    assert status["misses"] == 1
+    # A new process (empty memory) reads the same directory
+    assert TTSCache(tiers=[LocalDiskTier(str(tmp_path))]).get("b") == "QkJC"
+
+
+def test_disk_tier_evicts_least_recently_used_files_over_the_byte_cap(tmp_path) -> None:
+    tier = LocalDiskTier(str(tmp_path), max_bytes=8)
+    tier.put("a", "QUFB")
+    tier.put("b", "QkJC")
+    assert tier.get("a") == "QUFB"
+
+    tier.put("c", "Q0ND")
+
+    # "b" was the least recently used entry
+    assert tier.get("b") is None
+    assert tier.get("a") == "QUFB"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.b64", "c.b64"]
+    # A restarted process applies the cap to the files already on disk
+    assert LocalDiskTier(str(tmp_path), max_bytes=4).get_status() == {"entries": 1, "bytes": 4, "max_bytes": 4}
@@ -18,10 +18,77 @@ const client = new ReasoningEngineExecutionServiceClient(clientOptions);
 // Timeout for long-running queries (300 seconds = 5 minutes)
 const CALL_TIMEOUT_MS = 300000;
 
+// Forwards the stream_chat operation as newline-delimited JSON:
+// {"session_id", "output", "audio_encoding", "audio_mime_type"}, then one
+// {"index", "text", "audio_content", "audio_bytes"} line per sentence, in order.
+function streamChat(name: string, sessionId: string, input: object): Response {
+  const encoder = new TextEncoder();
+  const body = new ReadableStream({
+    start(controller) {
+      const call = client.streamQueryReasoningEngine(
+        { name, classMethod: 'stream_chat', input } as any,
+        { timeout: CALL_TIMEOUT_MS }
+      );
+      // Each message is an HttpBody whose data holds one or more JSON objects (one per line)
+      let pending = '';
+      let first = true;
+      let closed = false;
+      const close = () => {
+        if (!closed) {
+          closed = true;
+          controller.close();
+        }
+      };
+      const forward = (line: string) => {
+        let message: any;
+        try {
+          message = JSON.parse(line);
+        } catch (e) {
+          console.error('Unparsable stream_chat chunk:', line.slice(0, 200));
+          return;
+        }
+        if (first) {
+          message = { session_id: sessionId, ...message };
+          first = false;
+        }
+        controller.enqueue(encoder.encode(JSON.stringify(message) + '\n'));
+      };
+      call.on('data', (chunk: any) => {
+        pending += Buffer.from(chunk.data || []).toString('utf-8');
+        const lines = pending.split('\n');
+        pending = lines.pop() || '';
+        lines.filter((line) => line.trim()).forEach(forward);
+        // A chunk without a trailing newline may still be a complete object
+        if (pending.trim()) {
+          try {
+            JSON.parse(pending);
+            forward(pending);
+            pending = '';
+          } catch (e) {
+            // incomplete; wait for the rest
+          }
+        }
+      });
+      call.on('error', (error: Error) => {
+        console.error('Error streaming from Reasoning Engine:', error);
+        if (!closed) controller.enqueue(encoder.encode(JSON.stringify({ error: error.message }) + '\n'));
+        close();
+      });
+      call.on('end', () => {
+        if (pending.trim()) forward(pending);
+        close();
+      });
+    },
+  });
+  return new Response(body, {
+    headers: { 'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-store' },
+  });
+}
+
 export async function POST(req: NextRequest) {
   try {
     const body = await req.json();
-    const { query } = body;
+    const { query, audio_encoding, stream } = body;
     let { session_id } = body;
 
     // Fully qualified resource name
@@ -64,16 +131,24 @@ export async function POST(req: NextRequest) {
       return NextResponse.json({ session_id });
     }
 
+    const input = {
+      fields: {
+        session_id: { stringValue: session_id },
+        user_input: { stringValue: query },
+        user_id: { stringValue: 'default-user' },
+        ...(audio_encoding ? { audio_encoding: { stringValue: audio_encoding } } : {})
+      }
+    };
+
+    // 2a. Streamed reply (stream_chat): each sentence's audio is forwarded as soon as it is synthesized
+    if (stream) {
+      return streamChat(name, session_id, input);
+    }
+
     const queryRequest = {
       name: name,
       classMethod: 'chat',
-      input: {
-        fields: {
-          session_id: { stringValue: session_id },
-          user_input: { stringValue: query },
-          user_id: { stringValue: 'default-user' }
-        }
-      }
+      input,
     };
 
     const [queryResponse] = await client.queryReasoningEngine(queryRequest as any, {
@@ -97,11 +172,21 @@ export async function POST(req: NextRequest) {
       responseText = JSON.stringify(out);
     }
 
-    // Extract audio_content from response
+    // Extract audio_content (first sentence) and audio_chunks (every sentence, in order)
     let audioContent: string | null = null;
+    let audioChunks: string[] = [];
     if (out && out.structValue && out.structValue.fields && out.structValue.fields.audio_content) {
       audioContent = out.structValue.fields.audio_content.stringValue || null;
     }
+    if (out && out.structValue && out.structValue.fields && out.structValue.fields.audio_chunks) {
+      const values = out.structValue.fields.audio_chunks.listValue?.values || [];
+      audioChunks = values.map((v: any) => v.stringValue || "").filter((chunk: string) => chunk);
+    }
+    const audioMimeType = out?.structValue?.fields?.audio_mime_type?.stringValue || 'audio/mpeg';
+    const audioBytes = out?.structValue?.fields?.audio_bytes?.numberValue;
+    if (audioBytes !== undefined) {
+      console.log(`Reply audio: ${audioChunks.length} chunks, ${audioBytes} bytes (${audioMimeType})`);
+    }
 
     // Cleanup quotes if JSON.stringify added them to a simple string
     if (responseText.startsWith('"') && responseText.endsWith('"')) {
@@ -116,7 +201,9 @@ export async function POST(req: NextRequest) {
     return NextResponse.json({
       session_id,
       text: responseText,
-      audio_content: audioContent
+      audio_content: audioContent,
+      audio_chunks: audioChunks,
+      audio_mime_type: audioMimeType
     });
 
   } catch (error) {
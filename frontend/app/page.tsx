@@ -13,6 +13,9 @@ const CAPTURE_INTERVAL_MS = 10000; // 10 seconds
 const DIFF_THRESHOLD_PERCENT = 10;
 const ANALYSIS_WIDTH = 320;
 
+// Plays reply audio chunks in order as they are pushed
+type AudioPlayer = { push: (chunk: string) => void; finish: () => void };
+
 export default function Home() {
   const [isMonitoring, setIsMonitoring] = useState(false);
   const [statusMessage, setStatusMessage] = useState("Standby");
@@ -36,38 +39,73 @@ export default function Home() {
   // Persistent Audio Object for Mobile Compatibility
   const audioRef = useRef<HTMLAudioElement | null>(null);
 
-  // Audio helper
-  const playAudio = useCallback((base64Audio: string) => {
-    try {
-      // Use existing audio object if initialized (unlocked), otherwise create new
-      const audio = audioRef.current || new Audio();
-      if (!audioRef.current) {
-        audioRef.current = audio;
-      }
+  // Audio encodings this browser can play, most compact first (sent with each query)
+  const acceptedAudioEncodings = useCallback(() => {
+    const probe = typeof document !== 'undefined' ? document.createElement('audio') : null;
+    const canPlayOpus = !!probe && probe.canPlayType('audio/ogg; codecs=opus') !== '';
+    return canPlayOpus ? 'OGG_OPUS,MP3' : 'MP3';
+  }, []);
 
-      const audioSrc = `data:audio/mp3;base64,${base64Audio}`;
-      audio.src = audioSrc;
-      audio.volume = 1.0; // Ensure volume is up
+  const resumeListening = useCallback(() => {
+    startListening();
+    setStatusMessage("Listening...");
+    setAvatarHeadState('Listening');
+    setAvatarBodyAction('Waving');
+  }, [startListening]);
 
-      audio.onended = () => {
-        console.log("Audio ended. Resuming listening...");
-        startListening();
-        setStatusMessage("Listening...");
-        setAvatarHeadState('Listening');
-        setAvatarBodyAction('Waving');
-      };
+  // Audio helper: plays reply sentences one after another, as they arrive
+  const createAudioPlayer = useCallback((mimeType: string = 'audio/mpeg'): AudioPlayer => {
+    // Use existing audio object if initialized (unlocked), otherwise create new
+    const audio = audioRef.current || new Audio();
+    if (!audioRef.current) {
+      audioRef.current = audio;
+    }
 
+    const queue: string[] = [];
+    let playing = false;
+    let finished = false;
+    let played = 0;
+
+    const playNext = () => {
+      const next = queue.shift();
+      if (!next) {
+        // Wait for the next sentence unless the reply is complete
+        playing = false;
+        if (finished) {
+          console.log("Audio ended. Resuming listening...");
+          resumeListening();
+        }
+        return;
+      }
+      playing = true;
+      played += 1;
+      audio.src = `data:${mimeType};base64,${next}`;
+      audio.volume = 1.0; // Ensure volume is up
       audio.play().catch(e => {
         console.error("Audio play error", e);
         setStatusMessage("Audio Play Blocked (Tap screen)");
       });
-
       setStatusMessage("Speaking...");
-    } catch (e) {
-      console.error("Audio setup error", e);
-      setStatusMessage("Audio Error");
-    }
-  }, [startListening]);
+    };
+    audio.onended = playNext;
+
+    return {
+      push: (chunk: string) => {
+        queue.push(chunk);
+        if (!playing) playNext();
+      },
+      finish: () => {
+        finished = true;
+        if (playing) return;
+        if (played) {
+          resumeListening();
+        } else {
+          // If no audio, just go back to listening after a moment
+          setTimeout(resumeListening, 2000);
+        }
+      },
+    };
+  }, [resumeListening]);
 
   // Handle Agent Interaction
   const handleAgentQuery = useCallback(async (text: string) => {
@@ -79,37 +117,54 @@ export default function Home() {
     stopListening(); // Stop listening while processing
 
     try {
+      // stream: each sentence's audio arrives (and plays) as soon as it is synthesized
       const res = await fetch('/api/agent', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query: text, session_id: sessionId }),
+        body: JSON.stringify({ query: text, session_id: sessionId, audio_encoding: acceptedAudioEncodings(), stream: true }),
       });
 
-      if (!res.ok) throw new Error("Agent API failed");
-
-      const data = await res.json();
-      console.log("Agent response:", data);
+      if (!res.ok || !res.body) throw new Error("Agent API failed");
+
+      // Newline-delimited JSON: the reply text first, then one line per sentence of audio
+      // (asserted so TypeScript does not narrow it to null; handleLine assigns it)
+      let player = null as AudioPlayer | null;
+      const handleLine = (line: string) => {
+        const data = JSON.parse(line);
+        if (data.error) throw new Error(data.error);
+        if (!player) {
+          console.log("Agent response:", data);
+          // Save session_id for future messages
+          if (data.session_id) {
+            setSessionId(data.session_id);
+          }
+          const responseText = data.output || "";
+          setStatusMessage(responseText.substring(0, 20) + "...");
+          player = createAudioPlayer(data.audio_mime_type || 'audio/mpeg');
+          return;
+        }
+        if (data.audio_content) {
+          player.push(data.audio_content);
+        }
+      };
 
-      // Save session_id for future messages
-      if (data.session_id) {
-        setSessionId(data.session_id);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || "";
+        lines.filter(line => line.trim()).forEach(handleLine);
       }
+      if (buffer.trim()) handleLine(buffer);
 
-      const responseText = data.text || "";
-      const audioContent = data.audio_content;
-
-      setStatusMessage(responseText.substring(0, 20) + "...");
-
-      if (audioContent) {
-        playAudio(audioContent);
+      if (player) {
+        player.finish();
       } else {
-        // If no audio, just go back to listening after a moment
-        setTimeout(() => {
-          startListening();
-          setStatusMessage("Listening...");
-          setAvatarHeadState('Listening');
-          setAvatarBodyAction('Waving');
-        }, 2000);
+        resumeListening();
       }
 
     } catch (e) {
@@ -117,7 +172,7 @@ export default function Home() {
       setStatusMessage("Error");
       startListening(); // Resume listening on error
     }
-  }, [playAudio, startListening, stopListening, sessionId]);
+  }, [createAudioPlayer, acceptedAudioEncodings, resumeListening, startListening, stopListening, sessionId]);
 
   // Effect: Handle Transcript (User finished speaking)
   useEffect(() => {